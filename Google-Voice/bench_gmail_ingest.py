@@ -0,0 +1,101 @@
+"""Per-poll latency of Gmail ingestion as the mailbox grows.
+
+Usage:
+    python bench_gmail_ingest.py [--sizes 1000 10000 50000] [--new 5] [--latency 0.005]
+
+Runs against fake_gmail.FakeGmailService, where every API round trip costs
+``--latency`` seconds, and compares two ways of finding new texts:
+
+    scan     page through the inbox with messages.list (500 IDs per page)
+             and fetch each unseen message with its own messages.get
+    history  GmailIngestor: history.list since the last history ID plus one
+             batched fetch of the new messages
+
+Each poll answers ``--new`` freshly delivered texts from distinct senders.
+"""
+
+import argparse
+import time
+from typing import Any, List, Set
+
+from fake_gmail import FakeGmailService
+from gmail_ingest import GmailIngestor
+
+
+def _reply(sender: str, text: str, images: List[Any]) -> str:
+    return f"echo: {text}"
+
+
+def _scan_poll(service: FakeGmailService, seen: Set[str], ingestor: GmailIngestor) -> int:
+    message_ids: List[str] = []
+    page_token = None
+    while True:
+        response = service.users().messages().list(
+            userId="me", q="in:inbox", maxResults=500, pageToken=page_token
+        ).execute()
+        message_ids.extend(message["id"] for message in response.get("messages", []))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+
+    replies = 0
+    for message_id in message_ids:
+        if message_id in seen:
+            continue
+        seen.add(message_id)
+        incoming = ingestor.parse_message(service.users().messages().get(userId="me", id=message_id).execute())
+        if incoming is not None:
+            ingestor.send_reply(incoming, _reply(incoming.sender, incoming.text, []))
+            replies += 1
+    return replies
+
+
+def _mailbox(size: int, latency: float) -> FakeGmailService:
+    service = FakeGmailService()
+    for index in range(size):
+        service.deliver_text(f"+1555{index % 9000 + 1000:07d}", f"old text {index}", unread=False)
+    service.latency = latency
+    return service
+
+
+def _deliver(service: FakeGmailService, count: int, round_number: int) -> None:
+    for index in range(count):
+        service.deliver_text(f"+1666{round_number:03d}{index:04d}", f"new text {index}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--new", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--polls", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.new} new texts per poll, {args.latency * 1000:.1f} ms per round trip")
+    print(f"{'mailbox':>8}  {'strategy':<8}{'poll ms':>9}{'round trips':>13}")
+    for size in args.sizes:
+        for strategy in ("scan", "history"):
+            service = _mailbox(size, args.latency)
+            ingestor = GmailIngestor(service, _reply, state_path="", workers=4)
+            seen = set(service._inbox)
+            ingestor.poll_once()
+
+            elapsed = 0.0
+            round_trips = 0
+            for round_number in range(args.polls):
+                _deliver(service, args.new, round_number)
+                before = service.round_trips
+                started_at = time.perf_counter()
+                replies = _scan_poll(service, seen, ingestor) if strategy == "scan" else ingestor.poll_once()
+                elapsed += time.perf_counter() - started_at
+                round_trips += service.round_trips - before
+                assert replies == args.new, (strategy, replies)
+            ingestor.stop()
+            print(
+                f"{size:>8}  {strategy:<8}{elapsed / args.polls * 1000:>9.1f}"
+                f"{round_trips / args.polls:>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
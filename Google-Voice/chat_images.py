@@ -0,0 +1,103 @@
+import hashlib
+import io
+import os
+import threading
+from typing import Any, Dict
+
+from PIL import Image
+from google.genai.types import Part
+
+# ----------------- Configuration -----------------
+
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1536"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+CHAT_HISTORY_KEEP_IMAGES = os.getenv("CHAT_HISTORY_KEEP_IMAGES", "false").strip().lower() == "true"
+
+# Formats Gemini accepts as-is, so the carrier's encoded bytes can be sent
+# without decoding.
+PASSTHROUGH_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+_stats_lock = threading.Lock()
+_stats = {
+    "images": 0,
+    "passthrough": 0,
+    "reencoded": 0,
+    "bytes_in": 0,
+    "bytes_sent": 0,
+    "released_images": 0,
+    "released_bytes": 0,
+}
+
+
+def compact_image_part(content: bytes) -> Part:
+    """Turns downloaded media into an encoded image part for Gemini.
+
+    Images already in a supported format and within ``IMAGE_MAX_DIMENSION``
+    are passed through untouched; only the header is parsed. Anything else
+    is decoded once, downscaled and re-encoded as JPEG. Handing the chat a
+    decoded PIL image instead would make the SDK re-encode it as PNG, which
+    for photos is several times larger than the original JPEG, and keep
+    that in history.
+    """
+    with Image.open(io.BytesIO(content)) as image:
+        mime_type = PASSTHROUGH_FORMATS.get(image.format or "")
+        if mime_type and max(image.size) <= IMAGE_MAX_DIMENSION:
+            data = content
+        else:
+            image.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION))
+            converted = image if image.mode in ("RGB", "L") else image.convert("RGB")
+            buffer = io.BytesIO()
+            converted.save(buffer, "JPEG", quality=IMAGE_JPEG_QUALITY)
+            data, mime_type = buffer.getvalue(), "image/jpeg"
+
+    with _stats_lock:
+        _stats["images"] += 1
+        _stats["passthrough" if data is content else "reencoded"] += 1
+        _stats["bytes_in"] += len(content)
+        _stats["bytes_sent"] += len(data)
+    return Part.from_bytes(data=data, mime_type=mime_type)
+
+
+def _placeholder(data: bytes, mime_type: str) -> str:
+    digest = hashlib.sha1(data).hexdigest()[:10]
+    return (
+        f"[The user sent an image here ({mime_type}, {len(data) // 1024} KB, ref {digest}). "
+        "It was answered above and is no longer attached.]"
+    )
+
+
+def release_history_images(chat: Any) -> int:
+    """Replaces image parts in a chat's history with short text references.
+
+    Meant to run once a turn has been answered: the model's reply already
+    describes the image, so later turns keep the context without carrying
+    the bytes. Returns the number of bytes released.
+    """
+    if CHAT_HISTORY_KEEP_IMAGES:
+        return 0
+
+    released_images = 0
+    released_bytes = 0
+    # The curated history shares Content objects with the comprehensive one,
+    # but it is walked too in case a version of the SDK copies them.
+    for curated in (False, True):
+        for content in chat.get_history(curated=curated):
+            parts = getattr(content, "parts", None) or []
+            for index, part in enumerate(parts):
+                blob = getattr(part, "inline_data", None)
+                if blob is None or not blob.data or not (blob.mime_type or "").startswith("image/"):
+                    continue
+                parts[index] = Part(text=_placeholder(blob.data, blob.mime_type))
+                released_images += 1
+                released_bytes += len(blob.data)
+
+    if released_images:
+        with _stats_lock:
+            _stats["released_images"] += released_images
+            _stats["released_bytes"] += released_bytes
+    return released_bytes
+
+
+def get_image_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
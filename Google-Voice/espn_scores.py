@@ -0,0 +1,718 @@
+import difflib
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import requests
+
+from hedging import Hedger
+from http_client import http_get
+from ngrams import iter_ngrams, normalize_text
+from scores_archive import get_scores_archive, is_final_event
+
+ESPN_TIMEOUT = float(os.getenv("ESPN_TIMEOUT", "15"))
+ESPN_HEDGING = os.getenv("ESPN_HEDGING", "false").strip().lower() == "true"
+ESPN_HEDGE_INITIAL_DELAY = float(os.getenv("ESPN_HEDGE_INITIAL_DELAY", "2"))
+ESPN_CONDITIONAL_FETCH = os.getenv("ESPN_CONDITIONAL_FETCH", "true").strip().lower() != "false"
+ESPN_FORMAT_CACHE_SIZE = int(os.getenv("ESPN_FORMAT_CACHE_SIZE", "64"))
+# ESPN dates its scoreboards in US Eastern time.
+ESPN_TIMEZONE = ZoneInfo(os.getenv("ESPN_TIMEZONE", "America/New_York"))
+ESPN_MAX_RANGE_DAYS = int(os.getenv("ESPN_MAX_RANGE_DAYS", "14"))
+
+espn_hedger = Hedger("espn", initial_delay=ESPN_HEDGE_INITIAL_DELAY)
+
+LEAGUE_CONFIG: Dict[str, Dict[str, str]] = {
+    "mlb": {"sport": "baseball", "league": "mlb", "label": "MLB"},
+    "nhl": {"sport": "hockey", "league": "nhl", "label": "NHL"},
+    "nba": {"sport": "basketball", "league": "nba", "label": "NBA"},
+    "nfl": {"sport": "football", "league": "nfl", "label": "NFL"},
+}
+
+LEAGUE_ALIASES = {
+    "baseball": "mlb",
+    "hockey": "nhl",
+    "basketball": "nba",
+    "football": "nfl",
+}
+
+LEAGUE_TEAM_NAMES: Dict[str, List[str]] = {
+    "mlb": [
+        "diamondbacks", "braves", "orioles", "red sox", "cubs", "white sox",
+        "reds", "guardians", "rockies", "tigers", "astros", "royals", "angels",
+        "dodgers", "marlins", "brewers", "twins", "mets", "yankees", "athletics",
+        "phillies", "pirates", "padres", "giants", "mariners", "cardinals",
+        "rays", "rangers", "blue jays", "nationals",
+    ],
+    "nhl": [
+        "ducks", "utah hockey club", "bruins", "sabres", "flames", "hurricanes",
+        "blackhawks", "avalanche", "blue jackets", "stars", "red wings", "oilers",
+        "panthers", "kings", "wild", "canadiens", "predators", "devils",
+        "islanders", "rangers", "senators", "flyers", "penguins", "kraken",
+        "sharks", "blues", "lightning", "maple leafs", "canucks", "golden knights",
+        "capitals", "jets",
+    ],
+    "nba": [
+        "hawks", "celtics", "nets", "hornets", "bulls", "cavaliers", "mavericks",
+        "nuggets", "pistons", "warriors", "rockets", "pacers", "clippers",
+        "lakers", "grizzlies", "heat", "bucks", "timberwolves", "pelicans",
+        "knicks", "thunder", "magic", "sixers", "76ers", "suns", "trail blazers",
+        "blazers", "kings", "spurs", "raptors", "jazz", "wizards",
+    ],
+    "nfl": [
+        "cardinals", "falcons", "ravens", "bills", "panthers", "bears", "bengals",
+        "browns", "cowboys", "broncos", "lions", "packers", "texans", "colts",
+        "jaguars", "chiefs", "raiders", "chargers", "rams", "dolphins",
+        "vikings", "patriots", "saints", "giants", "jets", "eagles", "steelers",
+        "49ers", "niners", "seahawks", "buccaneers", "bucs", "titans",
+        "commanders",
+    ],
+}
+
+TEAM_QUERY_STOPWORDS = {
+    "mlb", "nhl", "nba", "nfl", "sports", "sport", "score", "scores", "game",
+    "games", "today", "tonight", "yesterday", "tomorrow", "live", "latest", "current",
+    "show", "me", "the", "a", "an", "for", "and", "or", "of", "in", "on", "with",
+    "who", "is", "are", "was", "were", "did", "does", "do", "what", "whats", "update",
+    "updates", "standings", "schedule", "matchup", "matchups", "play", "playing",
+    "baseball", "hockey", "basketball", "football",
+    "last", "night", "this", "next", "week", "weekend", "past", "days", "before",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+}
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# Dashes and a plausible year are required so order numbers and other
+# 8-digit runs are not read as dates.
+_ISO_DATE = r"((?:19|20)\d{2})-(\d{2})-(\d{2})"
+ISO_DATE_RANGE_PATTERN = re.compile(rf"\b{_ISO_DATE}(?:\s*(?:\.\.|-|to|through)\s*{_ISO_DATE})?\b")
+_US_MONTH_DAY = r"(1[0-2]|0?[1-9])/(3[01]|[12]\d|0?[1-9])"
+# "3/4" alone is as likely a fraction or a score as a date, so a US date
+# needs a year or a cue word in front of it ("on 5/1", "Sunday 5/12").
+US_DATE_WITH_YEAR_PATTERN = re.compile(rf"\b{_US_MONTH_DAY}/((?:19|20)?\d{{2}})\b")
+US_DATE_CUED_PATTERN = re.compile(
+    rf"\b(?:on|from|since|until|through|thru|{'|'.join(WEEKDAYS)}),?\s+{_US_MONTH_DAY}\b(?!/)",
+    re.IGNORECASE,
+)
+LAST_DAYS_PATTERN = re.compile(r"\b(?:last|past) (\d{1,2}) days\b")
+WEEKDAY_PATTERN = re.compile(rf"\b(?:(last|next|this) )?({'|'.join(WEEKDAYS)})\b")
+
+
+def normalize_leagues(leagues: str) -> List[str]:
+    raw_value = normalize_text(leagues or "all")
+    if raw_value in {"all", "*"}:
+        return list(LEAGUE_CONFIG.keys())
+
+    requested: List[str] = []
+    # Normalizing already turned the "," and ";" separators into spaces.
+    tokens = raw_value.split()
+
+    for token in tokens:
+        if token in LEAGUE_CONFIG:
+            requested.append(token)
+            continue
+        alias_target = LEAGUE_ALIASES.get(token)
+        if alias_target:
+            requested.append(alias_target)
+            continue
+
+        candidates = list(LEAGUE_CONFIG.keys()) + list(LEAGUE_ALIASES.keys())
+        match = difflib.get_close_matches(token, candidates, n=1, cutoff=0.8)
+        if not match:
+            continue
+
+        matched = match[0]
+        requested.append(LEAGUE_ALIASES.get(matched, matched))
+
+    unique_requested: List[str] = []
+    seen = set()
+    for item in requested:
+        if item not in seen:
+            seen.add(item)
+            unique_requested.append(item)
+
+    return unique_requested
+
+
+
+def build_scoreboard_url(league_key: str, start: Optional[date] = None, end: Optional[date] = None) -> str:
+    config = LEAGUE_CONFIG[league_key]
+    url = (
+        "https://site.api.espn.com/apis/site/v2/sports/"
+        f"{config['sport']}/{config['league']}/scoreboard"
+    )
+    if start is None:
+        return url
+    dates = f"{start:%Y%m%d}" if end is None or end == start else f"{start:%Y%m%d}-{end:%Y%m%d}"
+    return f"{url}?dates={dates}&limit=1000"
+
+
+
+def scoreboard_today() -> date:
+    return datetime.now(ESPN_TIMEZONE).date()
+
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+
+def resolve_date_range(text: str, today: Optional[date] = None) -> Optional[Tuple[date, date]]:
+    """Inclusive scoreboard date range mentioned in ``text``, or None.
+
+    Understands ISO dates and ranges (``2024-05-01``,
+    ``2024-05-01..2024-05-07``), US dates with a year or a cue word
+    (``5/1/24``, ``on 5/1``, ``sunday 5/12``), and phrases such as
+    yesterday, last night, tomorrow, last week, this weekend, last 3 days
+    and weekday names (a bare weekday means the most recent one). Ranges
+    are clamped to the last ``ESPN_MAX_RANGE_DAYS`` days of the range.
+    """
+    today = today or scoreboard_today()
+    date_range: Optional[Tuple[date, date]] = None
+
+    iso_match = ISO_DATE_RANGE_PATTERN.search(text or "")
+    us_match = US_DATE_WITH_YEAR_PATTERN.search(text or "") or US_DATE_CUED_PATTERN.search(text or "")
+    if iso_match:
+        start = _safe_date(*(int(value) for value in iso_match.group(1, 2, 3)))
+        end = _safe_date(*(int(value) for value in iso_match.group(4, 5, 6))) if iso_match.group(4) else start
+        if start and end:
+            date_range = (start, end)
+    elif us_match:
+        year = int(us_match.group(3)) if us_match.re is US_DATE_WITH_YEAR_PATTERN else today.year
+        year += 2000 if year < 100 else 0
+        day = _safe_date(year, int(us_match.group(1)), int(us_match.group(2)))
+        if day:
+            date_range = (day, day)
+
+    if date_range is None:
+        normalized = f" {normalize_text(text or '')} "
+        monday = today - timedelta(days=today.weekday())
+        last_days = LAST_DAYS_PATTERN.search(normalized)
+        weekday = WEEKDAY_PATTERN.search(normalized)
+        if " day before yesterday " in normalized:
+            date_range = (today - timedelta(days=2),) * 2
+        elif " yesterday " in normalized or " last night " in normalized:
+            date_range = (today - timedelta(days=1),) * 2
+        elif " tomorrow " in normalized:
+            date_range = (today + timedelta(days=1),) * 2
+        elif last_days:
+            date_range = (today - timedelta(days=max(1, int(last_days.group(1))) - 1), today)
+        elif " last weekend " in normalized:
+            date_range = (monday - timedelta(days=2), monday - timedelta(days=1))
+        elif " this weekend " in normalized:
+            date_range = (monday + timedelta(days=5), monday + timedelta(days=6))
+        elif " last week " in normalized:
+            date_range = (today - timedelta(days=7), today - timedelta(days=1))
+        elif " this week " in normalized:
+            date_range = (monday, monday + timedelta(days=6))
+        elif " next week " in normalized:
+            date_range = (monday + timedelta(days=7), monday + timedelta(days=13))
+        elif weekday:
+            qualifier, name = weekday.group(1, 2)
+            offset = (WEEKDAYS.index(name) - today.weekday()) % 7
+            if qualifier == "next":
+                day = today + timedelta(days=offset or 7)
+            elif qualifier == "this":
+                day = today + timedelta(days=offset)
+            elif qualifier == "last":
+                day = today - timedelta(days=(7 - offset) % 7 or 7)
+            else:
+                day = today - timedelta(days=(7 - offset) % 7)
+            date_range = (day, day)
+        elif " today " in normalized or " tonight " in normalized:
+            date_range = (today, today)
+
+    if date_range is None:
+        return None
+    start, end = sorted(date_range)
+    if (end - start).days >= ESPN_MAX_RANGE_DAYS:
+        start = end - timedelta(days=ESPN_MAX_RANGE_DAYS - 1)
+    return start, end
+
+
+
+def describe_date_range(start: date, end: date, today: Optional[date] = None) -> str:
+    today = today or scoreboard_today()
+    if start == end:
+        relative = {0: "today", -1: "yesterday", 1: "tomorrow"}.get((start - today).days)
+        return relative or f"{start:%a %b} {start.day}"
+    return f"{start:%a %b} {start.day} to {end:%a %b} {end.day}"
+
+
+
+def format_event(event: dict) -> str:
+    competitions = event.get("competitions", [])
+    if not competitions:
+        return ""
+
+    competition = competitions[0]
+    competitors = competition.get("competitors", [])
+    home = None
+    away = None
+
+    for competitor in competitors:
+        team_name = competitor.get("team", {}).get("shortDisplayName", "Unknown")
+        score = competitor.get("score", "0")
+        side = competitor.get("homeAway")
+        if side == "home":
+            home = {"name": team_name, "score": score}
+        elif side == "away":
+            away = {"name": team_name, "score": score}
+
+    if not home or not away:
+        return ""
+
+    status = (
+        competition.get("status", {}).get("type", {}).get("shortDetail")
+        or event.get("status", {}).get("type", {}).get("shortDetail")
+        or "Status unavailable"
+    )
+
+    return (
+        f"{away['name']} {away['score']} - "
+        f"{home['name']} {home['score']} ({status})"
+    )
+
+
+
+def build_team_query_ngrams(query: str) -> List[str]:
+    return list(iter_ngrams(query, max_words=3, stopwords=TEAM_QUERY_STOPWORDS, min_token_length=3))
+
+
+
+def extract_event_team_terms(event: dict) -> List[str]:
+    competitions = event.get("competitions", [])
+    if not competitions:
+        return []
+
+    competition = competitions[0]
+    competitors = competition.get("competitors", [])
+    team_terms: List[str] = []
+
+    for competitor in competitors:
+        team = competitor.get("team", {})
+        for field in ("shortDisplayName", "displayName", "name", "abbreviation"):
+            value = team.get(field)
+            if isinstance(value, str) and value.strip():
+                normalized = normalize_text(value)
+                if normalized:
+                    team_terms.append(normalized)
+
+    unique_terms: List[str] = []
+    seen = set()
+    for term in team_terms:
+        if term not in seen:
+            seen.add(term)
+            unique_terms.append(term)
+
+    return unique_terms
+
+
+
+def event_matches_team_query(event: dict, query_ngrams: Sequence[str]) -> bool:
+    if not query_ngrams:
+        return True
+
+    team_terms = extract_event_team_terms(event)
+    if not team_terms:
+        return False
+
+    for query_term in query_ngrams:
+        for team_term in team_terms:
+            if query_term == team_term or query_term in team_term or team_term in query_term:
+                return True
+            if difflib.SequenceMatcher(None, query_term, team_term).ratio() >= 0.82:
+                return True
+
+    return False
+
+
+
+class ScoreboardSnapshot(NamedTuple):
+    payload: Dict[str, Any]
+    # Content hash of the raw body; equal digests mean identical scoreboards.
+    digest: str
+
+
+class _ScoreboardEntry:
+    def __init__(self, snapshot: ScoreboardSnapshot, etag: str, last_modified: str) -> None:
+        self.snapshot = snapshot
+        self.etag = etag
+        self.last_modified = last_modified
+        # Formatted event lines keyed by the team query's n-grams, so
+        # rephrasings of the same team question share one entry.
+        self.formatted: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+_scoreboard_lock = threading.Lock()
+_scoreboards: Dict[str, _ScoreboardEntry] = {}
+_fetch_stats = {
+    "fetches": 0,
+    "not_modified": 0,
+    "unchanged_body": 0,
+    "parsed": 0,
+    "wire_bytes": 0,
+    "body_bytes": 0,
+    "parse_ms": 0.0,
+    "format_cache_hits": 0,
+    "format_cache_misses": 0,
+}
+
+
+def _record_fetch(**increments: float) -> None:
+    with _scoreboard_lock:
+        for field, amount in increments.items():
+            _fetch_stats[field] += amount
+
+
+def _wire_bytes(response: requests.Response) -> int:
+    # Compressed size as transferred; the raw stream counts bytes read
+    # before decoding, Content-Length is the fallback.
+    try:
+        transferred = response.raw.tell()
+        if transferred:
+            return int(transferred)
+    except (AttributeError, OSError, ValueError):
+        pass
+    try:
+        return int(response.headers.get("Content-Length", ""))
+    except ValueError:
+        return len(response.content)
+
+
+def _fetch_scoreboard_once(league_key: str) -> ScoreboardSnapshot:
+    with _scoreboard_lock:
+        entry = _scoreboards.get(league_key)
+
+    headers = {"Accept-Encoding": "gzip, deflate"}
+    if ESPN_CONDITIONAL_FETCH and entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+    response = http_get(build_scoreboard_url(league_key), timeout=ESPN_TIMEOUT, headers=headers)
+    if response.status_code == 304 and entry is not None:
+        _record_fetch(fetches=1, not_modified=1, wire_bytes=_wire_bytes(response))
+        return entry.snapshot
+    response.raise_for_status()
+
+    body = response.content
+    digest = hashlib.sha1(body).hexdigest()
+    _record_fetch(fetches=1, wire_bytes=_wire_bytes(response), body_bytes=len(body))
+    if entry is not None and entry.snapshot.digest == digest:
+        _record_fetch(unchanged_body=1)
+        snapshot = entry.snapshot
+    else:
+        started_at = time.perf_counter()
+        payload = json.loads(body)
+        _record_fetch(parsed=1, parse_ms=(time.perf_counter() - started_at) * 1000.0)
+        snapshot = ScoreboardSnapshot(payload=payload, digest=digest)
+        _archive_live_board(league_key, payload)
+
+    updated = _ScoreboardEntry(snapshot, response.headers.get("ETag", ""), response.headers.get("Last-Modified", ""))
+    if entry is not None and entry.snapshot is snapshot:
+        updated.formatted = entry.formatted
+    with _scoreboard_lock:
+        _scoreboards[league_key] = updated
+    return snapshot
+
+
+def fetch_scoreboard_snapshot(league_key: str) -> ScoreboardSnapshot:
+    """Current scoreboard, revalidated against ESPN with stored validators.
+
+    A 304, or a 200 whose body hashes the same as last time, returns the
+    previously parsed snapshot without parsing JSON again.
+    """
+    if ESPN_HEDGING:
+        return espn_hedger.run(lambda: _fetch_scoreboard_once(league_key))
+    return _fetch_scoreboard_once(league_key)
+
+
+def fetch_scoreboard(league_key: str) -> Dict[str, Any]:
+    return fetch_scoreboard_snapshot(league_key).payload
+
+
+def format_scoreboard(league_key: str, snapshot: ScoreboardSnapshot, query: str = "") -> str:
+    """format_league_scores, reused while the scoreboard content is unchanged."""
+    # Matching is order-independent, so the sorted n-gram set is the key.
+    query_key = tuple(sorted(set(build_team_query_ngrams(query))))
+    with _scoreboard_lock:
+        entry = _scoreboards.get(league_key)
+        cached: Optional[Tuple[str, ...]] = None
+        if entry is not None and entry.snapshot.digest == snapshot.digest:
+            cached = entry.formatted.get(query_key)
+        _fetch_stats["format_cache_hits" if cached is not None else "format_cache_misses"] += 1
+    if cached is not None:
+        return format_league_scores(league_key, snapshot.payload, query=query, event_lines=cached)
+
+    event_lines = tuple(_format_matching_events(snapshot.payload.get("events", []), query_key))
+    with _scoreboard_lock:
+        entry = _scoreboards.get(league_key)
+        if entry is not None and entry.snapshot.digest == snapshot.digest:
+            if len(entry.formatted) >= ESPN_FORMAT_CACHE_SIZE:
+                entry.formatted.clear()
+            entry.formatted[query_key] = event_lines
+    return format_league_scores(league_key, snapshot.payload, query=query, event_lines=event_lines)
+
+
+def export_scoreboards() -> Dict[str, Any]:
+    with _scoreboard_lock:
+        entries = dict(_scoreboards)
+    return {
+        league_key: {
+            "payload": entry.snapshot.payload,
+            "digest": entry.snapshot.digest,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+        }
+        for league_key, entry in entries.items()
+    }
+
+
+def restore_scoreboards(entries: Dict[str, Any]) -> int:
+    # Restored boards are still revalidated on first use, so the usual
+    # outcome is a 304 instead of a full download and parse.
+    restored = 0
+    with _scoreboard_lock:
+        for league_key, entry in entries.items():
+            if league_key not in LEAGUE_CONFIG or league_key in _scoreboards:
+                continue
+            snapshot = ScoreboardSnapshot(payload=entry["payload"], digest=entry["digest"])
+            _scoreboards[league_key] = _ScoreboardEntry(snapshot, entry.get("etag", ""), entry.get("last_modified", ""))
+            restored += 1
+    return restored
+
+
+def get_espn_fetch_stats() -> Dict[str, Any]:
+    with _scoreboard_lock:
+        stats: Dict[str, Any] = dict(_fetch_stats)
+    stats["parse_ms"] = round(stats["parse_ms"], 2)
+    reused = stats["not_modified"] + stats["unchanged_body"]
+    stats["reuse_rate"] = round(reused / stats["fetches"], 4) if stats["fetches"] else 0.0
+    return stats
+
+
+def _format_matching_events(events: Sequence[Dict[str, Any]], query_ngrams: Sequence[str]) -> List[str]:
+    lines = []
+    for event in events:
+        if query_ngrams and not event_matches_team_query(event, query_ngrams):
+            continue
+
+        formatted_event = format_event(event)
+        if formatted_event:
+            lines.append(f"- {formatted_event}")
+    return lines
+
+
+def format_league_scores(
+    league_key: str,
+    payload: Dict[str, Any],
+    query: str = "",
+    event_lines: Optional[Sequence[str]] = None,
+) -> str:
+    league_label = LEAGUE_CONFIG[league_key]["label"]
+
+    events = payload.get("events", [])
+    if not events:
+        return f"{league_label}: No games scheduled today."
+
+    if event_lines is None:
+        event_lines = _format_matching_events(events, build_team_query_ngrams(query))
+    lines = list(event_lines)
+
+    if not lines and build_team_query_ngrams(query):
+        return f"{league_label}: No matching team games found today for \"{query.strip()}\"."
+    if not lines:
+        return f"{league_label}: No score data is available right now."
+
+    return f"{league_label}:\n" + "\n".join(lines)
+
+
+def _event_day(event: Dict[str, Any], fallback: date) -> date:
+    try:
+        started = datetime.fromisoformat(str(event.get("date", "")).replace("Z", "+00:00"))
+    except ValueError:
+        return fallback
+    if started.tzinfo is None:
+        return started.date()
+    return started.astimezone(ESPN_TIMEZONE).date()
+
+
+
+def _archive_live_board(league_key: str, payload: Dict[str, Any]) -> None:
+    archive = get_scores_archive()
+    if archive is None:
+        return
+    events = payload.get("events", [])
+    board_day = scoreboard_today()
+    try:
+        board_day = date.fromisoformat(str(payload.get("day", {}).get("date", "")))
+    except ValueError:
+        pass
+    day_events = [event for event in events if _event_day(event, board_day) == board_day]
+    # Only a board whose games have all ended settles the day.
+    archive.store_day(league_key, board_day, day_events, complete=all(is_final_event(event) for event in events))
+
+
+
+def _fetch_dated_payload(league_key: str, start: date, end: date) -> Dict[str, Any]:
+    def fetch() -> Dict[str, Any]:
+        response = http_get(
+            build_scoreboard_url(league_key, start, end),
+            timeout=ESPN_TIMEOUT,
+            headers={"Accept-Encoding": "gzip, deflate"},
+        )
+        response.raise_for_status()
+        _record_fetch(fetches=1, wire_bytes=_wire_bytes(response), body_bytes=len(response.content))
+        return response.json()
+
+    if ESPN_HEDGING:
+        return espn_hedger.run(fetch)
+    return fetch()
+
+
+
+def fetch_events_by_day(league_key: str, start: date, end: date) -> List[Tuple[date, List[Dict[str, Any]]]]:
+    """Events for each day of a range, preferring the local archive.
+
+    Settled past days come from the archive. Any other past or future days
+    are fetched from ESPN in one ranged request and past days are archived;
+    today always uses the revalidated live scoreboard.
+    """
+    today = scoreboard_today()
+    archive = get_scores_archive()
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    events_by_day: Dict[date, List[Dict[str, Any]]] = {}
+    missing: List[date] = []
+
+    for day in days:
+        if day == today:
+            events_by_day[day] = fetch_scoreboard_snapshot(league_key).payload.get("events", [])
+            continue
+        archived = archive.load_day(league_key, day) if archive is not None and day < today else None
+        if archived is not None:
+            events_by_day[day] = archived
+        else:
+            missing.append(day)
+
+    if missing:
+        grouped: Dict[date, List[Dict[str, Any]]] = {day: [] for day in missing}
+        for event in _fetch_dated_payload(league_key, missing[0], missing[-1]).get("events", []):
+            event_day = _event_day(event, missing[0])
+            if event_day in grouped:
+                grouped[event_day].append(event)
+        for day in missing:
+            events_by_day[day] = grouped[day]
+            if archive is not None and day < today:
+                archive.store_day(league_key, day, grouped[day], complete=all(map(is_final_event, grouped[day])))
+
+    return [(day, events_by_day[day]) for day in days]
+
+
+
+def format_league_days(
+    league_key: str,
+    days: Sequence[Tuple[date, List[Dict[str, Any]]]],
+    query: str = "",
+) -> str:
+    league_label = LEAGUE_CONFIG[league_key]["label"]
+    query_ngrams = build_team_query_ngrams(query)
+    span = describe_date_range(days[0][0], days[-1][0])
+    multiple_days = len(days) > 1
+
+    lines = []
+    for day, events in days:
+        for event in events:
+            if query_ngrams and not event_matches_team_query(event, query_ngrams):
+                continue
+            formatted_event = format_event(event)
+            if formatted_event:
+                lines.append(f"- {day:%a %m/%d}: {formatted_event}" if multiple_days else f"- {formatted_event}")
+
+    if not any(events for _, events in days):
+        return f"{league_label}: No games scheduled for {span}."
+    if not lines and query_ngrams:
+        return f"{league_label}: No matching team games found for {span} for \"{query.strip()}\"."
+    if not lines:
+        return f"{league_label}: No score data is available for {span}."
+
+    return f"{league_label} ({span}):\n" + "\n".join(lines)
+
+
+
+def fetch_league_scores_for_dates(league_key: str, start: date, end: date, query: str = "") -> str:
+    league_label = LEAGUE_CONFIG[league_key]["label"]
+
+    try:
+        days = fetch_events_by_day(league_key, start, end)
+    except requests.exceptions.RequestException as exc:
+        logging.error("Network error for %s: %s", league_label, exc)
+        return f"{league_label}: Unable to retrieve scores due to a network error."
+    except ValueError as exc:
+        logging.error("Invalid JSON for %s: %s", league_label, exc)
+        return f"{league_label}: ESPN returned an invalid response."
+
+    return format_league_days(league_key, days, query=query)
+
+
+
+def fetch_league_scores(league_key: str, query: str = "") -> str:
+    league_label = LEAGUE_CONFIG[league_key]["label"]
+
+    try:
+        snapshot = fetch_scoreboard_snapshot(league_key)
+    except requests.exceptions.RequestException as exc:
+        logging.error("Network error for %s: %s", league_label, exc)
+        return f"{league_label}: Unable to retrieve scores due to a network error."
+    except ValueError as exc:
+        logging.error("Invalid JSON for %s: %s", league_label, exc)
+        return f"{league_label}: ESPN returned an invalid response."
+
+    return format_scoreboard(league_key, snapshot, query=query)
+
+
+def get_live_scores_text(leagues: str = "all", query: str = "", strict: bool = False, dates: str = "") -> str:
+    """Scoreboard text for the requested leagues.
+
+    ``dates`` selects other days than today, in any form resolve_date_range
+    accepts. With ``strict`` a failed ESPN fetch raises instead of being
+    folded into the text, so callers that can fail over to another source
+    can tell a real answer from an error message.
+    """
+    league_keys = normalize_leagues(leagues)
+    if not league_keys:
+        return "No supported leagues requested. Use one or more of: mlb, nhl, nba, nfl."
+
+    date_range = resolve_date_range(dates) if dates.strip() else None
+    if dates.strip() and date_range is None:
+        return f"Unrecognized dates \"{dates.strip()}\". Use e.g. yesterday, 2024-05-01 or 2024-05-01..2024-05-07."
+    if date_range is not None and date_range != (scoreboard_today(),) * 2:
+        start, end = date_range
+        if not strict:
+            return "\n\n".join(
+                fetch_league_scores_for_dates(league_key, start, end, query=query) for league_key in league_keys
+            )
+        return "\n\n".join(
+            format_league_days(league_key, fetch_events_by_day(league_key, start, end), query=query)
+            for league_key in league_keys
+        )
+
+    if not strict:
+        return "\n\n".join(fetch_league_scores(league_key, query=query) for league_key in league_keys)
+
+    blocks = [
+        format_scoreboard(league_key, fetch_scoreboard_snapshot(league_key), query=query)
+        for league_key in league_keys
+    ]
+    return "\n\n".join(blocks)
@@ -0,0 +1,295 @@
+"""In-memory stand-in for the parts of the Gmail API that gmail_ingest uses.
+
+Mirrors googleapiclient's shape (``service.users().messages().get(...)
+.execute()``, ``new_batch_http_request``) so GmailIngestor runs against it
+unchanged, e.g. for local runs and bench_gmail_ingest.py:
+
+    service = FakeGmailService()
+    service.deliver_text("+15551234567", "knicks score?")
+    GmailIngestor(service, handle=lambda sender, text, images: "...").poll_once()
+    service.sent  # replies, parsed
+
+Every ``execute()`` counts as one round trip (a whole batch is one) and
+sleeps ``latency`` seconds, so timings reflect how many requests a client
+makes rather than how the fake stores mail.
+"""
+
+import base64
+import bisect
+import email
+import itertools
+import threading
+import time
+from collections import Counter
+from email import policy
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+VOICE_DOMAIN = "txt.voice.google.com"
+VOICE_FOOTER = (
+    "\n\nTo respond to this text message, reply to this email or visit Google Voice.\n"
+    "YOUR ACCOUNT <https://voice.google.com> HELP CENTER <https://support.google.com/voice#topic=1707989>\n"
+)
+
+
+def _encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+class FakeHttpError(Exception):
+    def __init__(self, status: int, reason: str = "") -> None:
+        super().__init__(f"<HttpError {status}: {reason}>")
+        self.resp = type("Response", (), {"status": status})()
+
+
+class _Request:
+    def __init__(self, service: "FakeGmailService", method: str, call: Callable[[], Any]) -> None:
+        self.service = service
+        self.method = method
+        self.call = call
+
+    def execute(self) -> Any:
+        self.service._round_trip(self.method)
+        return self.call()
+
+
+class _BatchRequest:
+    def __init__(self, service: "FakeGmailService", callback: Callable[[str, Any, Optional[Exception]], None]) -> None:
+        self.service = service
+        self.callback = callback
+        self.requests: List[Tuple[str, _Request]] = []
+
+    def add(self, request: _Request, request_id: Optional[str] = None) -> None:
+        self.requests.append((request_id or str(len(self.requests)), request))
+
+    def execute(self) -> None:
+        self.service._round_trip("batch")
+        for request_id, request in self.requests:
+            self.service.calls[request.method] += 1
+            try:
+                response, exception = request.call(), None
+            except Exception as exc:
+                response, exception = None, exc
+            self.callback(request_id, response, exception)
+
+
+class _Resource:
+    def __init__(self, service: "FakeGmailService") -> None:
+        self.service = service
+
+
+class _Attachments(_Resource):
+    def get(self, userId: str, messageId: str, id: str) -> _Request:
+        return _Request(self.service, "attachments.get", lambda: {"data": self.service._attachments[id]})
+
+
+class _Messages(_Resource):
+    def get(self, userId: str, id: str, format: str = "full") -> _Request:
+        return _Request(self.service, "messages.get", lambda: self.service._message(id))
+
+    def list(self, userId: str, q: str = "", maxResults: int = 100, pageToken: Optional[str] = None) -> _Request:
+        return _Request(self.service, "messages.list", lambda: self.service._list_messages(q, maxResults, pageToken))
+
+    def send(self, userId: str, body: Dict[str, Any]) -> _Request:
+        return _Request(self.service, "messages.send", lambda: self.service._send(body))
+
+    def batchModify(self, userId: str, body: Dict[str, Any]) -> _Request:
+        return _Request(self.service, "messages.batchModify", lambda: self.service._modify(body))
+
+    def attachments(self) -> _Attachments:
+        return _Attachments(self.service)
+
+
+class _History(_Resource):
+    def list(
+        self,
+        userId: str,
+        startHistoryId: str,
+        historyTypes: Optional[List[str]] = None,
+        labelId: Optional[str] = None,
+        pageToken: Optional[str] = None,
+        maxResults: int = 100,
+    ) -> _Request:
+        return _Request(
+            self.service,
+            "history.list",
+            lambda: self.service._list_history(int(startHistoryId), labelId, pageToken, maxResults),
+        )
+
+
+class _Users(_Resource):
+    def getProfile(self, userId: str) -> _Request:
+        return _Request(self.service, "getProfile", lambda: {"historyId": str(self.service.history_id)})
+
+    def history(self) -> _History:
+        return _History(self.service)
+
+    def messages(self) -> _Messages:
+        return _Messages(self.service)
+
+
+class FakeGmailService:
+    def __init__(self, latency: float = 0.0, address: str = "bot@example.com") -> None:
+        self.latency = latency
+        self.address = address
+        self.history_id = 1000
+        self.calls: Counter = Counter()
+        self.round_trips = 0
+        self.sent: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._messages: Dict[str, Dict[str, Any]] = {}
+        self._attachments: Dict[str, str] = {}
+        # Oldest first; messages.list pages through it newest first.
+        self._inbox: List[str] = []
+        self._history_ids: List[int] = []
+        self._history: List[Dict[str, Any]] = []
+        self._oldest_history_id = self.history_id
+
+    # ----------------- Test controls -----------------
+
+    def deliver_text(
+        self,
+        phone: str,
+        text: str,
+        image: Optional[Tuple[bytes, str]] = None,
+        unread: bool = True,
+    ) -> str:
+        """Adds a forwarded Google Voice text and returns its message ID."""
+        digits = "".join(character for character in phone if character.isdigit())
+        sender = f"{digits}.voice@{VOICE_DOMAIN}"
+        with self._lock:
+            message_id = f"{next(self._ids):016x}"
+            parts: List[Dict[str, Any]] = [
+                {"mimeType": "text/plain", "body": {"data": _encode((text + VOICE_FOOTER).encode("utf-8"))}}
+            ]
+            if image is not None:
+                attachment_id = f"att-{message_id}"
+                self._attachments[attachment_id] = _encode(image[0])
+                parts.append({"mimeType": image[1], "filename": "image", "body": {"attachmentId": attachment_id}})
+            self._messages[message_id] = {
+                "id": message_id,
+                "threadId": f"thread-{digits}",
+                "labelIds": ["INBOX", "UNREAD"] if unread else ["INBOX"],
+                "internalDate": str(int(time.time() * 1000) + len(self._messages)),
+                "payload": {
+                    "mimeType": "multipart/mixed",
+                    "headers": [
+                        {"name": "From", "value": f'"({digits[-10:-7]}) {digits[-7:-4]}-{digits[-4:]}" <{sender}>'},
+                        {"name": "To", "value": self.address},
+                        {"name": "Subject", "value": f"New text message from {phone}"},
+                        {"name": "Message-ID", "value": f"<{message_id}@{VOICE_DOMAIN}>"},
+                    ],
+                    "parts": parts,
+                },
+            }
+            self._inbox.append(message_id)
+            self._add_history_locked(message_id)
+        return message_id
+
+    def expire_history(self) -> None:
+        """Makes every earlier history ID too old, as after a week offline."""
+        with self._lock:
+            self._oldest_history_id = self.history_id
+            self._history_ids.clear()
+            self._history.clear()
+
+    # ----------------- API surface -----------------
+
+    def users(self) -> _Users:
+        return _Users(self)
+
+    def new_batch_http_request(self, callback: Callable[[str, Any, Optional[Exception]], None]) -> _BatchRequest:
+        return _BatchRequest(self, callback)
+
+    def _round_trip(self, method: str) -> None:
+        with self._lock:
+            self.round_trips += 1
+            self.calls[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _add_history_locked(self, message_id: str) -> None:
+        self.history_id += 1
+        message = self._messages[message_id]
+        self._history_ids.append(self.history_id)
+        self._history.append(
+            {
+                "id": str(self.history_id),
+                "messagesAdded": [
+                    {"message": {"id": message_id, "threadId": message["threadId"], "labelIds": list(message["labelIds"])}}
+                ],
+            }
+        )
+
+    def _message(self, message_id: str) -> Dict[str, Any]:
+        with self._lock:
+            message = self._messages.get(message_id)
+            if message is None:
+                raise FakeHttpError(404, "Requested entity was not found.")
+            return {**message, "labelIds": list(message["labelIds"])}
+
+    def _list_messages(self, query: str, max_results: int, page_token: Optional[str]) -> Dict[str, Any]:
+        with self._lock:
+            ids = self._inbox
+            if "is:unread" in query:
+                ids = [message_id for message_id in ids if "UNREAD" in self._messages[message_id]["labelIds"]]
+            start = int(page_token or 0)
+            page = ids[max(0, len(ids) - start - max_results):max(0, len(ids) - start)][::-1]
+            response: Dict[str, Any] = {
+                "messages": [{"id": message_id, "threadId": self._messages[message_id]["threadId"]} for message_id in page]
+            }
+            if start + max_results < len(ids):
+                response["nextPageToken"] = str(start + max_results)
+            return response
+
+    def _list_history(self, start: int, label_id: Optional[str], page_token: Optional[str], max_results: int) -> Dict[str, Any]:
+        with self._lock:
+            if start < self._oldest_history_id:
+                raise FakeHttpError(404, "Requested entity was not found.")
+            index = int(page_token) if page_token else bisect.bisect_right(self._history_ids, start)
+            records = self._history[index:index + max_results]
+            if label_id:
+                records = [
+                    record for record in records
+                    if all(label_id in added["message"]["labelIds"] for added in record["messagesAdded"])
+                ]
+            response: Dict[str, Any] = {"historyId": str(self.history_id)}
+            if records:
+                response["history"] = records
+            if index + max_results < len(self._history):
+                response["nextPageToken"] = str(index + max_results)
+            return response
+
+    def _send(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        parsed = email.message_from_bytes(base64.urlsafe_b64decode(body["raw"]), policy=policy.default)
+        with self._lock:
+            message_id = f"{next(self._ids):016x}"
+            thread_id = body.get("threadId") or message_id
+            self._messages[message_id] = {
+                "id": message_id,
+                "threadId": thread_id,
+                "labelIds": ["SENT"],
+                "internalDate": str(int(time.time() * 1000)),
+                "payload": {"mimeType": "text/plain", "headers": [{"name": name, "value": value} for name, value in parsed.items()]},
+            }
+            self._add_history_locked(message_id)
+            self.sent.append(
+                {
+                    "id": message_id,
+                    "threadId": thread_id,
+                    "to": parsed["To"],
+                    "subject": parsed["Subject"],
+                    "in_reply_to": parsed["In-Reply-To"],
+                    "text": parsed.get_content().strip(),
+                }
+            )
+        return {"id": message_id, "threadId": thread_id, "labelIds": ["SENT"]}
+
+    def _modify(self, body: Dict[str, Any]) -> None:
+        with self._lock:
+            for message_id in body.get("ids", []):
+                message = self._messages.get(message_id)
+                if message is None:
+                    continue
+                labels = [label for label in message["labelIds"] if label not in body.get("removeLabelIds", [])]
+                message["labelIds"] = labels + [label for label in body.get("addLabelIds", []) if label not in labels]
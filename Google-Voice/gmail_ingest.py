@@ -0,0 +1,456 @@
+import base64
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# ----------------- Configuration -----------------
+
+GMAIL_USER_ID = os.getenv("GMAIL_USER_ID", "me")
+GMAIL_CREDENTIALS_PATH = os.getenv("GMAIL_CREDENTIALS_PATH", "credentials.json")
+GMAIL_TOKEN_PATH = os.getenv("GMAIL_TOKEN_PATH", "token.json")
+# Remembers the last synced history ID across restarts; empty keeps it in memory.
+GMAIL_STATE_PATH = os.getenv("GMAIL_STATE_PATH", "gmail_state.json").strip()
+GMAIL_POLL_INTERVAL = float(os.getenv("GMAIL_POLL_INTERVAL", "5"))
+# Gmail accepts up to 100 calls per batch but throttles large ones; 50 is its advice.
+GMAIL_BATCH_SIZE = max(1, min(100, int(os.getenv("GMAIL_BATCH_SIZE", "50"))))
+GMAIL_WORKERS = int(os.getenv("GMAIL_WORKERS", "4"))
+GMAIL_FETCH_RETRIES = int(os.getenv("GMAIL_FETCH_RETRIES", "2"))
+GMAIL_RESYNC_MAX = int(os.getenv("GMAIL_RESYNC_MAX", "50"))
+# Only mail from this domain is treated as a forwarded text; empty accepts any sender.
+GMAIL_SENDER_DOMAIN = os.getenv("GMAIL_SENDER_DOMAIN", "txt.voice.google.com").strip().lower()
+GMAIL_MARK_READ = os.getenv("GMAIL_MARK_READ", "true").strip().lower() != "false"
+
+GMAIL_SCOPES = ["https://www.googleapis.com/auth/gmail.modify"]
+
+# Google Voice appends account links below the text; anything from these
+# lines on is not part of the message.
+FOOTER_PATTERN = re.compile(
+    r"^\s*(?:To respond to this text message|YOUR ACCOUNT|<https://voice\.google\.com|"
+    r"On .+ wrote:$|--\s*$)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+HANDLED_MEMORY = 5000
+
+# (sender address, text, images) -> reply text, or "" for no reply
+MessageHandler = Callable[[str, str, List[Any]], str]
+ImageDecoder = Callable[[bytes], Any]
+
+
+class IncomingText:
+    def __init__(
+        self,
+        message_id: str,
+        thread_id: str,
+        internal_date: int,
+        sender: str,
+        reply_to: str,
+        subject: str,
+        message_id_header: str,
+        text: str,
+        images: List[Any],
+    ) -> None:
+        self.message_id = message_id
+        self.thread_id = thread_id
+        self.internal_date = internal_date
+        self.sender = sender
+        self.reply_to = reply_to
+        self.subject = subject
+        self.message_id_header = message_id_header
+        self.text = text
+        self.images = images
+
+
+def _http_status(exc: Exception) -> Optional[int]:
+    # googleapiclient's HttpError keeps the response as ``resp``.
+    status = getattr(getattr(exc, "resp", None), "status", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _decode_body(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _headers(payload: Dict[str, Any]) -> Dict[str, str]:
+    return {header["name"].lower(): header["value"] for header in payload.get("headers", [])}
+
+
+def _address(value: str) -> str:
+    match = re.search(r"<([^>]+)>", value)
+    return (match.group(1) if match else value).strip().lower()
+
+
+def extract_text(body: str) -> str:
+    footer = FOOTER_PATTERN.search(body)
+    if footer:
+        body = body[:footer.start()]
+    return body.strip()
+
+
+def _walk_parts(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    parts = [payload]
+    index = 0
+    while index < len(parts):
+        parts.extend(parts[index].get("parts", []) or [])
+        index += 1
+    return parts
+
+
+def build_gmail_service(credentials_path: str = GMAIL_CREDENTIALS_PATH, token_path: str = GMAIL_TOKEN_PATH) -> Any:
+    """Authorized Gmail API client, running the OAuth consent flow on first use."""
+    try:
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from googleapiclient.discovery import build
+    except ImportError as exc:
+        raise RuntimeError(
+            "Gmail ingestion needs google-api-python-client and google-auth-oauthlib installed."
+        ) from exc
+
+    credentials = None
+    if os.path.exists(token_path):
+        credentials = Credentials.from_authorized_user_file(token_path, GMAIL_SCOPES)
+    if not credentials or not credentials.valid:
+        if credentials and credentials.expired and credentials.refresh_token:
+            credentials.refresh(Request())
+        else:
+            credentials = InstalledAppFlow.from_client_secrets_file(credentials_path, GMAIL_SCOPES).run_local_server(port=0)
+        with open(token_path, "w", encoding="utf-8") as token_file:
+            token_file.write(credentials.to_json())
+    return build("gmail", "v1", credentials=credentials, cache_discovery=False)
+
+
+class GmailIngestor:
+    """Turns texts forwarded to Gmail by Google Voice into bot replies.
+
+    Each poll asks the History API only for messages added since the last
+    synced history ID, so its cost follows the new mail rather than the
+    size of the mailbox. New messages are fetched in batch requests, grouped
+    by thread, and threads are handled concurrently while the messages of
+    one thread are answered in order. Replies are sent into the same thread,
+    which Google Voice relays back as a text. The checkpoint only advances
+    once every new message was fetched, and recently handled IDs are
+    remembered, so a failed fetch is retried without answering twice.
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        handle: MessageHandler,
+        decode_image: Optional[ImageDecoder] = None,
+        user_id: str = GMAIL_USER_ID,
+        state_path: str = GMAIL_STATE_PATH,
+        batch_size: int = GMAIL_BATCH_SIZE,
+        workers: int = GMAIL_WORKERS,
+        sender_domain: str = GMAIL_SENDER_DOMAIN,
+    ) -> None:
+        self.service = service
+        self.handle = handle
+        self.decode_image = decode_image
+        self.user_id = user_id
+        self.state_path = state_path
+        self.batch_size = batch_size
+        self.sender_domain = sender_domain
+        self.history_id: Optional[str] = None
+        self._lock = threading.Lock()
+        self._handled: "OrderedDict[str, None]" = OrderedDict()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="gmail-thread")
+        self._stop = threading.Event()
+        self._stats: Dict[str, Any] = {
+            "polls": 0,
+            "history_pages": 0,
+            "resyncs": 0,
+            "batches": 0,
+            "fetched": 0,
+            "fetch_failures": 0,
+            "ignored": 0,
+            "handled": 0,
+            "replies": 0,
+            "errors": 0,
+            "last_poll_ms": 0.0,
+            "max_poll_ms": 0.0,
+        }
+        self._load_state()
+
+    # ----------------- Checkpoint -----------------
+
+    def _load_state(self) -> None:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as state_file:
+                self.history_id = json.load(state_file).get("history_id") or None
+        except (OSError, ValueError) as exc:
+            logging.error("Could not load Gmail sync state from %s: %s", self.state_path, exc)
+
+    def _save_state(self) -> None:
+        if not self.state_path:
+            return
+        temp_path = f"{self.state_path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as state_file:
+                json.dump({"history_id": self.history_id}, state_file)
+            os.replace(temp_path, self.state_path)
+        except OSError as exc:
+            logging.error("Could not save Gmail sync state to %s: %s", self.state_path, exc)
+
+    def _record(self, **increments: float) -> None:
+        with self._lock:
+            for field, amount in increments.items():
+                self._stats[field] += amount
+
+    # ----------------- Sync -----------------
+
+    def _current_history_id(self) -> str:
+        return str(self.service.users().getProfile(userId=self.user_id).execute()["historyId"])
+
+    def _list_history(self, start_history_id: str) -> Tuple[List[str], str]:
+        message_ids: List[str] = []
+        latest = start_history_id
+        page_token = None
+        while True:
+            response = self.service.users().history().list(
+                userId=self.user_id,
+                startHistoryId=start_history_id,
+                historyTypes=["messageAdded"],
+                labelId="INBOX",
+                pageToken=page_token,
+            ).execute()
+            self._record(history_pages=1)
+            for record in response.get("history", []):
+                for added in record.get("messagesAdded", []):
+                    message = added.get("message", {})
+                    if "SENT" not in message.get("labelIds", []):
+                        message_ids.append(message["id"])
+            latest = str(response.get("historyId", latest))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return list(dict.fromkeys(message_ids)), latest
+
+    def _resync(self) -> Tuple[List[str], str]:
+        # The stored history ID expired (Gmail keeps roughly a week); pick up
+        # whatever is still unread and continue from the current ID.
+        self._record(resyncs=1)
+        latest = self._current_history_id()
+        response = self.service.users().messages().list(
+            userId=self.user_id,
+            q="in:inbox is:unread",
+            maxResults=GMAIL_RESYNC_MAX,
+        ).execute()
+        return [message["id"] for message in response.get("messages", [])], latest
+
+    def _new_message_ids(self) -> Tuple[List[str], str]:
+        if self.history_id is None:
+            # First run: start from now instead of answering old mail.
+            return [], self._current_history_id()
+        try:
+            return self._list_history(self.history_id)
+        except Exception as exc:
+            if _http_status(exc) != 404:
+                raise
+            logging.warning("Gmail history %s expired; resyncing unread mail", self.history_id)
+            return self._resync()
+
+    def _fetch_messages(self, message_ids: Sequence[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        fetched: Dict[str, Dict[str, Any]] = {}
+        pending = list(message_ids)
+        delay = 1.0
+        for attempt in range(GMAIL_FETCH_RETRIES + 1):
+            failed: List[str] = []
+            for start in range(0, len(pending), self.batch_size):
+                chunk = pending[start:start + self.batch_size]
+
+                def collect(request_id: str, response: Any, exception: Optional[Exception]) -> None:
+                    if exception is None:
+                        fetched[request_id] = response
+                    elif _http_status(exception) == 404:
+                        # Deleted before we got to it.
+                        fetched[request_id] = {}
+                    else:
+                        failed.append(request_id)
+
+                batch = self.service.new_batch_http_request(callback=collect)
+                for message_id in chunk:
+                    batch.add(
+                        self.service.users().messages().get(userId=self.user_id, id=message_id, format="full"),
+                        request_id=message_id,
+                    )
+                batch.execute()
+                self._record(batches=1)
+            if not failed:
+                break
+            self._record(fetch_failures=len(failed))
+            pending = failed
+            if attempt < GMAIL_FETCH_RETRIES:
+                time.sleep(delay)
+                delay *= 2
+        else:
+            return fetched, pending
+        return fetched, []
+
+    def _attachment(self, message_id: str, attachment_id: str) -> bytes:
+        response = self.service.users().messages().attachments().get(
+            userId=self.user_id,
+            messageId=message_id,
+            id=attachment_id,
+        ).execute()
+        return _decode_body(response.get("data", ""))
+
+    def parse_message(self, message: Dict[str, Any]) -> Optional[IncomingText]:
+        payload = message.get("payload") or {}
+        headers = _headers(payload)
+        sender = _address(headers.get("from", ""))
+        if not sender or (self.sender_domain and not sender.endswith(f"@{self.sender_domain}")):
+            return None
+
+        text_chunks: List[str] = []
+        images: List[Any] = []
+        for part in _walk_parts(payload):
+            mime_type = part.get("mimeType", "")
+            body = part.get("body") or {}
+            if mime_type == "text/plain" and body.get("data"):
+                text_chunks.append(_decode_body(body["data"]).decode("utf-8", "replace"))
+            elif mime_type.startswith("image/") and self.decode_image is not None:
+                try:
+                    data = _decode_body(body["data"]) if body.get("data") else self._attachment(
+                        message["id"], body["attachmentId"]
+                    )
+                    images.append(self.decode_image(data))
+                except Exception as exc:
+                    logging.error("Failed to read image from Gmail message %s: %s", message.get("id"), exc)
+
+        return IncomingText(
+            message_id=message["id"],
+            thread_id=message.get("threadId", message["id"]),
+            internal_date=int(message.get("internalDate", 0)),
+            sender=sender,
+            reply_to=_address(headers.get("reply-to", "")) or sender,
+            subject=headers.get("subject", ""),
+            message_id_header=headers.get("message-id", ""),
+            text=extract_text("\n".join(text_chunks)),
+            images=images,
+        )
+
+    # ----------------- Replies -----------------
+
+    def send_reply(self, incoming: IncomingText, text: str) -> None:
+        reply = EmailMessage()
+        reply["To"] = incoming.reply_to
+        subject = incoming.subject or "Text message"
+        reply["Subject"] = subject if subject.lower().startswith("re:") else f"Re: {subject}"
+        if incoming.message_id_header:
+            reply["In-Reply-To"] = incoming.message_id_header
+            reply["References"] = incoming.message_id_header
+        reply.set_content(text)
+        raw = base64.urlsafe_b64encode(reply.as_bytes()).decode("ascii")
+        self.service.users().messages().send(
+            userId=self.user_id,
+            body={"raw": raw, "threadId": incoming.thread_id},
+        ).execute()
+
+    def _process_thread(self, messages: Sequence[IncomingText]) -> int:
+        replies = 0
+        for incoming in messages:
+            try:
+                if not incoming.text and not incoming.images:
+                    continue
+                reply_text = self.handle(incoming.sender, incoming.text, incoming.images)
+                if reply_text:
+                    self.send_reply(incoming, reply_text)
+                    replies += 1
+            except Exception as exc:
+                self._record(errors=1)
+                logging.exception("Failed to answer Gmail message %s: %s", incoming.message_id, exc)
+            finally:
+                self._record(handled=1)
+        return replies
+
+    # ----------------- Polling -----------------
+
+    def poll_once(self) -> int:
+        """Syncs new mail, answers it and returns the number of replies sent."""
+        started_at = time.perf_counter()
+        message_ids, latest = self._new_message_ids()
+        with self._lock:
+            message_ids = [message_id for message_id in message_ids if message_id not in self._handled]
+
+        fetched, unfetched = self._fetch_messages(message_ids) if message_ids else ({}, [])
+        threads: Dict[str, List[IncomingText]] = {}
+        for message_id in message_ids:
+            message = fetched.get(message_id)
+            if message is None:
+                continue
+            incoming = self.parse_message(message) if message else None
+            if incoming is None:
+                self._record(ignored=1)
+            else:
+                threads.setdefault(incoming.thread_id, []).append(incoming)
+
+        replies = 0
+        futures = [
+            self._pool.submit(self._process_thread, sorted(messages, key=lambda item: item.internal_date))
+            for messages in threads.values()
+        ]
+        for future in futures:
+            replies += future.result()
+
+        handled_ids = [message_id for message_id in message_ids if message_id in fetched]
+        if GMAIL_MARK_READ and handled_ids:
+            try:
+                self.service.users().messages().batchModify(
+                    userId=self.user_id,
+                    body={"ids": handled_ids, "removeLabelIds": ["UNREAD"]},
+                ).execute()
+            except Exception as exc:
+                logging.warning("Could not mark Gmail messages read: %s", exc)
+
+        with self._lock:
+            for message_id in handled_ids:
+                self._handled[message_id] = None
+            while len(self._handled) > HANDLED_MEMORY:
+                self._handled.popitem(last=False)
+        if unfetched:
+            logging.warning("Could not fetch %s Gmail message(s); retrying next poll", len(unfetched))
+        elif latest != self.history_id:
+            self.history_id = latest
+            self._save_state()
+
+        elapsed_ms = (time.perf_counter() - started_at) * 1000.0
+        with self._lock:
+            self._stats["polls"] += 1
+            self._stats["fetched"] += len(fetched)
+            self._stats["replies"] += replies
+            self._stats["last_poll_ms"] = round(elapsed_ms, 2)
+            self._stats["max_poll_ms"] = round(max(self._stats["max_poll_ms"], elapsed_ms), 2)
+        return replies
+
+    def run_forever(self, poll_interval: float = GMAIL_POLL_INTERVAL) -> None:
+        logging.info("Polling Gmail every %ss from history ID %s", poll_interval, self.history_id or "now")
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as exc:
+                self._record(errors=1)
+                logging.exception("Gmail poll failed: %s", exc)
+            self._stop.wait(poll_interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._pool.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["history_id"] = self.history_id
+        return stats
@@ -0,0 +1,149 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional
+
+# ----------------- Configuration -----------------
+
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_MAX_FRACTION = float(os.getenv("HEDGE_MAX_FRACTION", "0.05"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "200"))
+HEDGE_MAX_WORKERS = int(os.getenv("HEDGE_MAX_WORKERS", "8"))
+
+_executor_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="hedge")
+    return _executor
+
+
+class Hedger:
+    """Fires a backup request when the primary is slower than usual.
+
+    The hedge delay is the ``percentile`` of recent primary latencies (or
+    ``initial_delay`` until ``HEDGE_MIN_SAMPLES`` are known). Hedges are
+    paid for from a budget that grows by ``max_fraction`` per call, so at
+    most that share of traffic is ever duplicated; ``should_hedge`` can also
+    veto a hedge when it is due, e.g. while an upstream quota is saturated.
+    Whichever request answers first wins; the other is cancelled if it has
+    not started and otherwise left to finish with its result discarded.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_delay: float,
+        percentile: float = HEDGE_PERCENTILE,
+        max_fraction: float = HEDGE_MAX_FRACTION,
+        window: int = HEDGE_WINDOW,
+    ) -> None:
+        self.name = name
+        self.initial_delay = initial_delay
+        self.percentile = percentile
+        self.max_fraction = max_fraction
+        self._samples: Deque[float] = deque(maxlen=max(1, window))
+        self._budget = 1.0
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "primary_wins": 0,
+            "skipped_no_budget": 0,
+            "skipped_by_caller": 0,
+        }
+
+    def hedge_delay(self) -> float:
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return self.initial_delay
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return ordered[index]
+
+    def _record_sample(self, started_at: float) -> Callable[[Future], None]:
+        def record(future: Future) -> None:
+            if future.cancelled() or future.exception() is not None:
+                return
+            with self._lock:
+                self._samples.append(time.monotonic() - started_at)
+
+        return record
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self._budget >= 1.0:
+                self._budget -= 1.0
+                self._stats["hedged"] += 1
+                return True
+            self._stats["skipped_no_budget"] += 1
+            return False
+
+    def run(
+        self,
+        primary: Callable[[], Any],
+        hedge: Optional[Callable[[], Any]] = None,
+        should_hedge: Optional[Callable[[], bool]] = None,
+    ) -> Any:
+        with self._lock:
+            self._stats["calls"] += 1
+            self._budget = min(5.0, self._budget + self.max_fraction)
+
+        executor = _get_executor()
+        started_at = time.monotonic()
+        primary_future = executor.submit(primary)
+        primary_future.add_done_callback(self._record_sample(started_at))
+
+        done, _ = wait([primary_future], timeout=self.hedge_delay())
+        if done:
+            return primary_future.result()
+        if should_hedge is not None and not should_hedge():
+            with self._lock:
+                self._stats["skipped_by_caller"] += 1
+            return primary_future.result()
+        if not self._take_budget():
+            return primary_future.result()
+
+        logging.info("Hedging slow %s request after %.2fs", self.name, time.monotonic() - started_at)
+        hedge_future = executor.submit(hedge or primary)
+        pending = {primary_future, hedge_future}
+        first_error: Optional[BaseException] = None
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is not None:
+                    if future is primary_future or first_error is None:
+                        first_error = error
+                    continue
+
+                for loser in pending:
+                    loser.cancel()
+                with self._lock:
+                    self._stats["hedge_wins" if future is hedge_future else "primary_wins"] += 1
+                return future.result()
+
+        assert first_error is not None
+        raise first_error
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            sample_count = len(self._samples)
+        hedged = stats["hedged"]
+        stats["hedge_rate"] = round(hedged / stats["calls"], 4) if stats["calls"] else 0.0
+        stats["hedge_win_rate"] = round(stats["hedge_wins"] / hedged, 4) if hedged else 0.0
+        stats["hedge_delay_s"] = round(self.hedge_delay(), 3)
+        stats["samples"] = sample_count
+        return stats
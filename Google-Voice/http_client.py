@@ -0,0 +1,200 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# ----------------- Configuration -----------------
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "8"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_REDIRECT_CACHE_TTL = float(os.getenv("HTTP_REDIRECT_CACHE_TTL", "300"))
+HTTP_REDIRECT_CACHE_SIZE = int(os.getenv("HTTP_REDIRECT_CACHE_SIZE", "256"))
+
+_stats_lock = threading.Lock()
+_host_stats: Dict[str, Dict[str, int]] = {}
+
+_session_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+
+_redirect_lock = threading.Lock()
+_redirect_cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+
+def _host_counters(host: str) -> Dict[str, int]:
+    counters = _host_stats.get(host)
+    if counters is None:
+        counters = {"requests": 0, "new_connections": 0, "redirect_cache_hits": 0}
+        _host_stats[host] = counters
+    return counters
+
+
+def _record(host: str, field: str) -> None:
+    with _stats_lock:
+        _host_counters(host)[field] += 1
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        _record(self.host or "", "new_connections")
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    # Every new HTTPS connection costs a TCP + TLS handshake, so counting
+    # them next to request totals shows how much keep-alive is saving.
+    def _new_conn(self):
+        _record(self.host or "", "new_connections")
+        return super()._new_conn()
+
+
+class _PooledAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+def _create_session() -> requests.Session:
+    session = requests.Session()
+    adapter = _PooledAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=0,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_http_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+    return _session
+
+
+def _cached_redirect(url: str) -> Optional[str]:
+    with _redirect_lock:
+        entry = _redirect_cache.get(url)
+        if entry is None:
+            return None
+        target, expires_at = entry
+        if expires_at < time.monotonic():
+            del _redirect_cache[url]
+            return None
+        _redirect_cache.move_to_end(url)
+        return target
+
+
+def _store_redirect(url: str, target: str) -> None:
+    if HTTP_REDIRECT_CACHE_SIZE <= 0 or HTTP_REDIRECT_CACHE_TTL <= 0:
+        return
+    with _redirect_lock:
+        _redirect_cache[url] = (target, time.monotonic() + HTTP_REDIRECT_CACHE_TTL)
+        _redirect_cache.move_to_end(url)
+        while len(_redirect_cache) > HTTP_REDIRECT_CACHE_SIZE:
+            _redirect_cache.popitem(last=False)
+
+
+def _forget_redirect(url: str) -> None:
+    with _redirect_lock:
+        _redirect_cache.pop(url, None)
+
+
+def export_redirect_cache() -> Dict[str, Dict[str, Any]]:
+    # Monotonic deadlines mean nothing to another process; store wall time.
+    offset = time.time() - time.monotonic()
+    with _redirect_lock:
+        return {url: {"target": target, "expires_at": expires_at + offset} for url, (target, expires_at) in _redirect_cache.items()}
+
+
+def restore_redirect_cache(entries: Dict[str, Dict[str, Any]]) -> int:
+    offset = time.time() - time.monotonic()
+    now = time.monotonic()
+    restored = 0
+    with _redirect_lock:
+        for url, entry in entries.items():
+            expires_at = float(entry["expires_at"]) - offset
+            if expires_at > now and url not in _redirect_cache:
+                _redirect_cache[url] = (entry["target"], expires_at)
+                restored += 1
+        while len(_redirect_cache) > HTTP_REDIRECT_CACHE_SIZE:
+            _redirect_cache.popitem(last=False)
+    return restored
+
+
+def http_get(
+    url: str,
+    timeout: float,
+    auth: Optional[Tuple[str, str]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    cache_redirects: bool = False,
+) -> requests.Response:
+    """GET through the shared keep-alive session.
+
+    With ``cache_redirects`` the final URL of a redirect chain is remembered
+    for ``HTTP_REDIRECT_CACHE_TTL`` seconds and requested directly next
+    time; a failing cached target is dropped and the original URL retried.
+    """
+    session = get_http_session()
+    request_timeout = (HTTP_CONNECT_TIMEOUT, timeout)
+
+    if cache_redirects:
+        target = _cached_redirect(url)
+        if target is not None:
+            _record(urlparse(target).hostname or "", "redirect_cache_hits")
+            _record(urlparse(target).hostname or "", "requests")
+            try:
+                response = session.get(target, headers=headers, timeout=request_timeout)
+                if response.ok:
+                    return response
+            except requests.exceptions.RequestException as exc:
+                logging.info("Cached redirect target failed for %s: %s", url, exc)
+            _forget_redirect(url)
+
+    _record(urlparse(url).hostname or "", "requests")
+    response = session.get(url, auth=auth, headers=headers, timeout=request_timeout)
+    for hop in [*response.history[1:], response] if response.history else []:
+        _record(urlparse(hop.url).hostname or "", "requests")
+    if cache_redirects and response.history and response.ok:
+        _store_redirect(url, response.url)
+    return response
+
+
+def http_post(
+    url: str,
+    timeout: float,
+    data: Optional[Dict[str, str]] = None,
+    auth: Optional[Tuple[str, str]] = None,
+) -> requests.Response:
+    _record(urlparse(url).hostname or "", "requests")
+    return get_http_session().post(url, data=data, auth=auth, timeout=(HTTP_CONNECT_TIMEOUT, timeout))
+
+
+def get_http_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        hosts = {host: dict(counters) for host, counters in _host_stats.items()}
+    with _redirect_lock:
+        redirect_entries = len(_redirect_cache)
+
+    total_requests = sum(counters["requests"] for counters in hosts.values())
+    total_connections = sum(counters["new_connections"] for counters in hosts.values())
+    return {
+        "requests": total_requests,
+        "handshakes": total_connections,
+        "reused_connections": max(0, total_requests - total_connections),
+        "redirect_cache_entries": redirect_entries,
+        "hosts": hosts,
+    }
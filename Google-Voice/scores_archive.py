@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+# ----------------- Configuration -----------------
+
+# Empty keeps the archive in memory for this process only; set a file path
+# to keep finished games across restarts and share them with the MCP server.
+SCORES_ARCHIVE_PATH = os.getenv("SCORES_ARCHIVE_PATH", "").strip()
+SCORES_ARCHIVE_ENABLED = os.getenv("SCORES_ARCHIVE_ENABLED", "true").strip().lower() != "false"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    league TEXT NOT NULL,
+    game_date TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    PRIMARY KEY (league, event_id)
+);
+CREATE INDEX IF NOT EXISTS games_by_day ON games (league, game_date);
+CREATE TABLE IF NOT EXISTS days (
+    league TEXT NOT NULL,
+    game_date TEXT NOT NULL,
+    games INTEGER NOT NULL,
+    archived_at REAL NOT NULL,
+    PRIMARY KEY (league, game_date)
+);
+"""
+
+
+def is_final_event(event: Dict[str, Any]) -> bool:
+    """True once a game can no longer change: finished, postponed or canceled."""
+    competitions = event.get("competitions") or [{}]
+    status_type = competitions[0].get("status", {}).get("type", {}) or event.get("status", {}).get("type", {})
+    return status_type.get("state") == "post" or bool(status_type.get("completed"))
+
+
+class ScoresArchive:
+    """Finished games indexed by league and date in SQLite.
+
+    A day is only served from the archive once every game on it was final
+    when stored, so a partly played day is always fetched again. Days with
+    no games are recorded too, which keeps off-days from hitting ESPN.
+    """
+
+    def __init__(self, path: str = SCORES_ARCHIVE_PATH) -> None:
+        self.path = path or ":memory:"
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+        if self.path != ":memory:":
+            # Several workers and the MCP server may share one file.
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+        self._stats = {"day_hits": 0, "day_misses": 0, "days_stored": 0, "games_stored": 0, "lookup_ms": 0.0}
+
+    def load_day(self, league: str, day: date) -> Optional[List[Dict[str, Any]]]:
+        """Events of a fully archived day, or None if it must be fetched."""
+        started_at = time.perf_counter()
+        with self._lock:
+            known = self._connection.execute(
+                "SELECT games FROM days WHERE league = ? AND game_date = ?",
+                (league, day.isoformat()),
+            ).fetchone()
+            rows = []
+            if known is not None and known[0]:
+                rows = self._connection.execute(
+                    "SELECT event FROM games WHERE league = ? AND game_date = ? ORDER BY rowid",
+                    (league, day.isoformat()),
+                ).fetchall()
+            self._stats["day_hits" if known is not None else "day_misses"] += 1
+            self._stats["lookup_ms"] += (time.perf_counter() - started_at) * 1000.0
+        if known is None:
+            return None
+        return [json.loads(row[0]) for row in rows]
+
+    def store_day(self, league: str, day: date, events: Sequence[Dict[str, Any]], complete: bool) -> int:
+        """Stores the day's final games; ``complete`` marks the whole day as settled."""
+        final_events = [event for event in events if event.get("id") and is_final_event(event)]
+        with self._lock:
+            try:
+                with self._connection:
+                    self._connection.executemany(
+                        "INSERT OR REPLACE INTO games (league, game_date, event_id, event) VALUES (?, ?, ?, ?)",
+                        [
+                            (league, day.isoformat(), str(event["id"]), json.dumps(event, separators=(",", ":")))
+                            for event in final_events
+                        ],
+                    )
+                    if complete:
+                        self._connection.execute(
+                            "INSERT OR REPLACE INTO days (league, game_date, games, archived_at) VALUES (?, ?, ?, ?)",
+                            (league, day.isoformat(), len(final_events), time.time()),
+                        )
+            except sqlite3.Error as exc:
+                logging.error("Failed to archive %s games for %s: %s", league, day, exc)
+                return 0
+            self._stats["games_stored"] += len(final_events)
+            self._stats["days_stored"] += int(complete)
+        return len(final_events)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["archived_days"], stats["archived_games"] = self._connection.execute(
+                "SELECT (SELECT COUNT(*) FROM days), (SELECT COUNT(*) FROM games)"
+            ).fetchone()
+        stats["lookup_ms"] = round(stats["lookup_ms"], 2)
+        stats["path"] = self.path
+        return stats
+
+
+_archive: Optional[ScoresArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_scores_archive() -> Optional[ScoresArchive]:
+    global _archive
+    if not SCORES_ARCHIVE_ENABLED:
+        return None
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = ScoresArchive()
+    return _archive
+
+
+def get_scores_archive_stats() -> Dict[str, Any]:
+    archive = get_scores_archive()
+    return {"enabled": archive is not None, **(archive.stats() if archive is not None else {})}
@@ -1,37 +1,19 @@
-import asyncio
-import io
 import logging
 import os
-import sys
 import time
-from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-import requests
 from flask import Flask, Response, request
-from PIL import Image
 from twilio.twiml.messaging_response import MessagingResponse
 
 from google import genai
-from google.genai.types import GenerateContentConfig, GoogleSearch, Tool
+from google.genai.types import GenerateContentConfig, GoogleSearch, Part, Tool
 
-MCP_AVAILABLE = False
-ClientSession: Any = None
-StdioServerParameters: Any = None
-stdio_client: Any = None
-
-try:
-    from mcp import ClientSession
-    from mcp.client.stdio import stdio_client
-
-    try:
-        from mcp import StdioServerParameters
-    except Exception:
-        from mcp.client.stdio import StdioServerParameters
-
-    MCP_AVAILABLE = True
-except Exception:  # pragma: no cover - runtime fallback if mcp isn't installed
-    MCP_AVAILABLE = False
+from chat_images import compact_image_part, release_history_images
+from espn_scores import LEAGUE_TEAM_NAMES
+from http_client import get_http_stats, http_get
+from ngrams import iter_ngrams, normalize_text
+from sports_provider import build_sports_provider
 
 logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 
@@ -43,12 +25,11 @@ MODEL_ID = os.getenv("GEMINI_MODEL_ID", "gemini-3-flash-preview")
 
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
-SPORTS_MCP_SERVER_PATH = os.getenv(
-    "SPORTS_MCP_SERVER_PATH",
-    str(Path(__file__).resolve().with_name("sports_mcp_server.py")),
-)
-SPORTS_MCP_PYTHON = os.getenv("SPORTS_MCP_PYTHON", sys.executable)
 SPORTS_SOURCE = os.getenv("SPORTS_SOURCE", "mcp").strip().lower()
+SPORTS_BACKENDS = os.getenv("SPORTS_BACKENDS", "direct" if SPORTS_SOURCE == "direct" else "mcp,direct")
+TWILIO_MEDIA_TIMEOUT = float(os.getenv("TWILIO_MEDIA_TIMEOUT", "20"))
+# "webhook" serves /sms; "gmail" answers texts Google Voice forwards to Gmail.
+INGEST_MODE = os.getenv("INGEST_MODE", "webhook").strip().lower()
 
 LEAGUE_KEYWORDS: Dict[str, List[str]] = {
     "mlb": ["mlb", "baseball"],
@@ -56,11 +37,8 @@ LEAGUE_KEYWORDS: Dict[str, List[str]] = {
     "nba": ["nba", "basketball"],
     "nfl": ["nfl", "football"],
 }
-LEAGUE_ENDPOINTS: Dict[str, Dict[str, str]] = {
-    "mlb": {"sport": "baseball", "league": "mlb", "label": "MLB"},
-    "nhl": {"sport": "hockey", "league": "nhl", "label": "NHL"},
-    "nba": {"sport": "basketball", "league": "nba", "label": "NBA"},
-    "nfl": {"sport": "football", "league": "nfl", "label": "NFL"},
+_LEAGUE_TEAM_TERMS = {
+    league: frozenset(normalize_text(team) for team in teams) for league, teams in LEAGUE_TEAM_NAMES.items()
 }
 GENERIC_SPORTS_KEYWORDS = [
     "sports scores",
@@ -77,6 +55,8 @@ if not api_key:
 client = genai.Client(api_key=api_key)
 google_search_tool = Tool(google_search=GoogleSearch())
 
+sports_provider = build_sports_provider(SPORTS_BACKENDS)
+
 chat_sessions: Dict[str, Any] = {}
 app = Flask(__name__)
 
@@ -116,168 +96,33 @@ def normalize_response(text: str) -> str:
     return " ".join(cleaned.split())
 
 
-def detect_requested_leagues(text: str) -> List[str]:
+def detect_requested_leagues(text: str) -> Tuple[List[str], bool]:
+    """Returns the leagues a message asks about and whether it names a team."""
     lowered = text.lower()
+    ngrams = set(iter_ngrams(text, max_words=3))
     requested = []
+    team_intent = False
 
     for league, keywords in LEAGUE_KEYWORDS.items():
-        if any(keyword in lowered for keyword in keywords):
+        names_team = not _LEAGUE_TEAM_TERMS[league].isdisjoint(ngrams)
+        if names_team or any(keyword in lowered for keyword in keywords):
             requested.append(league)
+        team_intent = team_intent or names_team
 
     if requested:
-        return requested
+        return requested, team_intent
 
     if any(keyword in lowered for keyword in GENERIC_SPORTS_KEYWORDS):
-        return list(LEAGUE_KEYWORDS.keys())
-
-    return []
-
-
-def _format_espn_event(event: Dict[str, Any]) -> str:
-    competitions = event.get("competitions", [])
-    if not competitions:
-        return ""
-
-    competition = competitions[0]
-    competitors = competition.get("competitors", [])
-    home = None
-    away = None
-
-    for competitor in competitors:
-        team_name = competitor.get("team", {}).get("shortDisplayName", "Unknown")
-        score = competitor.get("score", "0")
-        side = competitor.get("homeAway")
-        if side == "home":
-            home = {"name": team_name, "score": score}
-        elif side == "away":
-            away = {"name": team_name, "score": score}
-
-    if not home or not away:
-        return ""
-
-    status = (
-        competition.get("status", {}).get("type", {}).get("shortDetail")
-        or event.get("status", {}).get("type", {}).get("shortDetail")
-        or "Status unavailable"
-    )
-
-    return (
-        f"{away['name']} {away['score']} - "
-        f"{home['name']} {home['score']} ({status})"
-    )
-
-
-def _fetch_league_scores_direct(league_key: str) -> str:
-    config = LEAGUE_ENDPOINTS[league_key]
-    league_label = config["label"]
-    url = (
-        "https://site.api.espn.com/apis/site/v2/sports/"
-        f"{config['sport']}/{config['league']}/scoreboard"
-    )
-
-    try:
-        response = requests.get(url, timeout=15)
-        response.raise_for_status()
-        payload = response.json()
-    except requests.exceptions.RequestException as exc:
-        logging.error("Network error fetching %s scores: %s", league_label, exc)
-        return f"{league_label}: Unable to retrieve scores due to a network error."
-    except ValueError as exc:
-        logging.error("Invalid JSON for %s scores: %s", league_label, exc)
-        return f"{league_label}: ESPN returned an invalid response."
-
-    events = payload.get("events", [])
-    if not events:
-        return f"{league_label}: No games scheduled today."
-
-    lines: List[str] = []
-    for event in events:
-        event_line = _format_espn_event(event)
-        if event_line:
-            lines.append(f"- {event_line}")
-
-    if not lines:
-        return f"{league_label}: No score data is available right now."
-
-    return f"{league_label}:\n" + "\n".join(lines)
-
+        return list(LEAGUE_KEYWORDS.keys()), False
 
-def get_live_sports_scores_direct(leagues: Sequence[str]) -> str:
-    league_keys = [league for league in leagues if league in LEAGUE_ENDPOINTS]
-    if not league_keys:
-        return "No supported leagues requested. Use one or more of: mlb, nhl, nba, nfl."
+    return [], False
 
-    return "\n\n".join(_fetch_league_scores_direct(league_key) for league_key in league_keys)
 
+def get_live_sports_scores(leagues: Sequence[str], query: str = "") -> str:
+    return sports_provider.get_scores(leagues, query=query)
 
-def _extract_mcp_text(tool_result: Any) -> str:
-    if getattr(tool_result, "isError", False):
-        return "The sports MCP server reported an error."
 
-    text_chunks: List[str] = []
-    for item in getattr(tool_result, "content", []) or []:
-        text = getattr(item, "text", None)
-        if text is None and isinstance(item, dict):
-            text = item.get("text")
-        if text:
-            text_chunks.append(str(text))
-
-    if not text_chunks:
-        return "No score data was returned by the sports MCP server."
-
-    return "\n".join(text_chunks).strip()
-
-
-async def _get_live_sports_scores_from_mcp_async(leagues: Sequence[str]) -> str:
-    if (
-        not MCP_AVAILABLE
-        or ClientSession is None
-        or StdioServerParameters is None
-        or stdio_client is None
-    ):
-        raise RuntimeError("Sports MCP support is unavailable because the `mcp` package is not installed.")
-
-    if not os.path.isfile(SPORTS_MCP_SERVER_PATH):
-        raise FileNotFoundError(f"Sports MCP server not found: {SPORTS_MCP_SERVER_PATH}")
-
-    server_parameters = StdioServerParameters(
-        command=SPORTS_MCP_PYTHON,
-        args=[SPORTS_MCP_SERVER_PATH],
-    )
-
-    leagues_arg = ",".join(leagues) if leagues else "all"
-
-    async with stdio_client(server_parameters) as (read_stream, write_stream):
-        async with ClientSession(read_stream, write_stream) as session:
-            await session.initialize()
-            tool_result = await session.call_tool(
-                "get_live_scores",
-                {"leagues": leagues_arg},
-            )
-
-    return _extract_mcp_text(tool_result)
-
-
-def get_live_sports_scores_from_mcp(leagues: Sequence[str]) -> str:
-    try:
-        return asyncio.run(_get_live_sports_scores_from_mcp_async(leagues))
-    except Exception as exc:
-        logging.error("Failed to fetch sports scores from MCP: %s", exc)
-        raise
-
-
-def get_live_sports_scores(leagues: Sequence[str]) -> str:
-    if SPORTS_SOURCE == "direct":
-        return get_live_sports_scores_direct(leagues)
-
-    try:
-        return get_live_sports_scores_from_mcp(leagues)
-    except Exception:
-        logging.info("Falling back to direct ESPN scores because MCP is unavailable.")
-        return get_live_sports_scores_direct(leagues)
-
-
-def fetch_twilio_image(media_url: str) -> Optional[Image.Image]:
+def fetch_twilio_image(media_url: str) -> Optional[Part]:
     if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN:
         logging.warning(
             "TWILIO_ACCOUNT_SID or TWILIO_AUTH_TOKEN not set; skipping media download"
@@ -285,23 +130,22 @@ def fetch_twilio_image(media_url: str) -> Optional[Image.Image]:
         return None
 
     try:
-        response = requests.get(
+        response = http_get(
             media_url,
+            timeout=TWILIO_MEDIA_TIMEOUT,
             auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
-            timeout=20,
+            cache_redirects=True,
         )
         response.raise_for_status()
 
-        image = Image.open(io.BytesIO(response.content))
-        image.load()  # Detach from the underlying byte stream.
-        return image
+        return compact_image_part(response.content)
     except Exception as exc:
         logging.error("Failed to download media from Twilio URL %s: %s", media_url, exc)
         return None
 
 
-def extract_images_from_twilio(form) -> List[Image.Image]:
-    images: List[Image.Image] = []
+def extract_images_from_twilio(form) -> List[Part]:
+    images: List[Part] = []
 
     try:
         num_media = int(form.get("NumMedia", "0"))
@@ -325,7 +169,7 @@ def extract_images_from_twilio(form) -> List[Image.Image]:
     return images
 
 
-def generate_response(sender: str, incoming_text: str, images: List[Image.Image]) -> str:
+def generate_response(sender: str, incoming_text: str, images: List[Part]) -> str:
     delay = INITIAL_RETRY_DELAY
 
     if incoming_text.strip().lower() == "/new":
@@ -340,9 +184,11 @@ def generate_response(sender: str, incoming_text: str, images: List[Image.Image]
             "Describe what you see and provide a helpful response."
         )
 
-    requested_leagues = detect_requested_leagues(prompt)
+    requested_leagues, has_team_intent = detect_requested_leagues(prompt)
     if requested_leagues:
-        live_scores = get_live_sports_scores(requested_leagues)
+        # Like the Twilio app, a named team narrows the scores to its games.
+        team_query = prompt if has_team_intent else ""
+        live_scores = get_live_sports_scores(requested_leagues, query=team_query)
         requested_league_labels = ", ".join(league.upper() for league in requested_leagues)
         prompt += (
             f"\n\nHere are the current {requested_league_labels} scores "
@@ -357,6 +203,11 @@ def generate_response(sender: str, incoming_text: str, images: List[Image.Image]
             model_response = chat.send_message(message_contents)
             response_text = (model_response.text or "").strip()
 
+            # The turn is in history whether or not the reply has text;
+            # either way the image bytes must not stay there.
+            if images:
+                release_history_images(chat)
+
             if not response_text:
                 return "I could not generate a response right now. Please try again."
 
@@ -390,6 +241,14 @@ def health_check():
     return {"status": "ok"}, 200
 
 
+@app.route("/stats", methods=["GET"])
+def stats():
+    return {
+        "http": get_http_stats(),
+        "sports_provider": sports_provider.stats(),
+    }, 200
+
+
 @app.route("/sms", methods=["POST"])
 def twilio_sms_webhook():
     sender = request.form.get("From", "unknown")
@@ -410,6 +269,11 @@ def twilio_sms_webhook():
 # ----------------- Entrypoint -----------------
 
 if __name__ == "__main__":
-    host = os.getenv("HOST", "0.0.0.0")
-    port = int(os.getenv("PORT", "5000"))
-    app.run(host=host, port=port)
+    if INGEST_MODE == "gmail":
+        from gmail_ingest import GmailIngestor, build_gmail_service
+
+        GmailIngestor(build_gmail_service(), handle=generate_response, decode_image=compact_image_part).run_forever()
+    else:
+        host = os.getenv("HOST", "0.0.0.0")
+        port = int(os.getenv("PORT", "5000"))
+        app.run(host=host, port=port)
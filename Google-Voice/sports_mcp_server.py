@@ -0,0 +1,26 @@
+import logging
+import os
+
+from mcp.server.fastmcp import FastMCP
+
+from espn_scores import get_live_scores_text
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
+mcp = FastMCP("espn-sports-scores")
+
+
+@mcp.tool()
+def get_live_scores(leagues: str = "all", query: str = "", strict: bool = False, dates: str = "") -> str:
+    """Get live ESPN scoreboard data for mlb, nhl, nba, and nfl.
+
+    dates picks other days than today, e.g. "yesterday", "last week",
+    "2024-05-01" or "2024-05-01..2024-05-07"; finished games are served from
+    the local archive. With strict=true an ESPN failure is reported as a
+    tool error instead of an explanatory line in the text.
+    """
+    return get_live_scores_text(leagues, query=query, strict=strict, dates=dates)
+
+
+if __name__ == "__main__":
+    mcp.run()
@@ -0,0 +1,501 @@
+import abc
+import asyncio
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from espn_scores import get_live_scores_text
+
+MCP_AVAILABLE = False
+ClientSession: Any = None
+StdioServerParameters: Any = None
+stdio_client: Any = None
+
+try:
+    from mcp import ClientSession
+    from mcp.client.stdio import stdio_client
+
+    try:
+        from mcp import StdioServerParameters
+    except Exception:
+        from mcp.client.stdio import StdioServerParameters
+
+    MCP_AVAILABLE = True
+except Exception:  # pragma: no cover - runtime fallback if mcp isn't installed
+    MCP_AVAILABLE = False
+
+# ----------------- Configuration -----------------
+
+SPORTS_MCP_SERVER_PATH = os.getenv(
+    "SPORTS_MCP_SERVER_PATH",
+    str(Path(__file__).resolve().with_name("sports_mcp_server.py")),
+)
+SPORTS_MCP_PYTHON = os.getenv("SPORTS_MCP_PYTHON", sys.executable)
+SPORTS_MCP_POOL_SIZE = int(os.getenv("SPORTS_MCP_POOL_SIZE", "1"))
+SPORTS_MCP_CALL_TIMEOUT = float(os.getenv("SPORTS_MCP_CALL_TIMEOUT", "20"))
+
+# Comma-separated backend order used until latency data says otherwise.
+SPORTS_BACKENDS = os.getenv("SPORTS_BACKENDS", "mcp,direct")
+SPORTS_LATENCY_BUDGET = float(os.getenv("SPORTS_LATENCY_BUDGET", "8"))
+SPORTS_HEDGE_DELAY = float(os.getenv("SPORTS_HEDGE_DELAY", "1.5"))
+SPORTS_CACHE_TTL = float(os.getenv("SPORTS_CACHE_TTL", "30"))
+SPORTS_CACHE_STALE_TTL = float(os.getenv("SPORTS_CACHE_STALE_TTL", "600"))
+SPORTS_UNHEALTHY_AFTER = int(os.getenv("SPORTS_UNHEALTHY_AFTER", "3"))
+SPORTS_UNHEALTHY_COOLDOWN = float(os.getenv("SPORTS_UNHEALTHY_COOLDOWN", "60"))
+
+SCORES_UNAVAILABLE_MESSAGE = "Unable to retrieve live scores right now. Please try again shortly."
+
+
+class SportsBackendError(RuntimeError):
+    pass
+
+
+class SportsBackend(abc.ABC):
+    """Source of formatted scoreboard text for the provider.
+
+    ``fetch`` returns the text or raises, typically ``SportsBackendError``.
+    """
+
+    name = "backend"
+
+    @abc.abstractmethod
+    def fetch(self, leagues: Sequence[str], query: str = "", dates: str = "") -> str:
+        ...
+
+
+class DirectBackend(SportsBackend):
+    """Fetches ESPN scoreboards in-process through the pooled HTTP client."""
+
+    name = "direct"
+
+    def fetch(self, leagues: Sequence[str], query: str = "", dates: str = "") -> str:
+        return get_live_scores_text(",".join(leagues) or "all", query=query, strict=True, dates=dates)
+
+
+def _extract_mcp_text(tool_result: Any) -> str:
+    if getattr(tool_result, "isError", False):
+        raise SportsBackendError("The sports MCP server reported an error.")
+
+    text_chunks: List[str] = []
+    for item in getattr(tool_result, "content", []) or []:
+        text = getattr(item, "text", None)
+        if text is None and isinstance(item, dict):
+            text = item.get("text")
+        if text:
+            text_chunks.append(str(text))
+
+    if not text_chunks:
+        raise SportsBackendError("No score data was returned by the sports MCP server.")
+
+    return "\n".join(text_chunks).strip()
+
+
+class _McpConnection:
+    def __init__(self) -> None:
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class McpBackend(SportsBackend):
+    """Keeps long-lived stdio sessions to the sports MCP server.
+
+    Each pool slot is a task on a private event loop thread that owns one
+    server subprocess and session and serves tool calls from a queue, so the
+    server is spawned once per slot instead of once per text. A failed call
+    tears the slot's session down and the next call on it reconnects.
+    """
+
+    name = "mcp"
+
+    def __init__(self, pool_size: int = SPORTS_MCP_POOL_SIZE) -> None:
+        self._connections = [_McpConnection() for _ in range(max(1, pool_size))]
+        self._next_slot = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self.connects = 0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="sports-mcp", daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    async def _serve(self, queue: asyncio.Queue) -> None:
+        server_parameters = StdioServerParameters(
+            command=SPORTS_MCP_PYTHON,
+            args=[SPORTS_MCP_SERVER_PATH],
+        )
+        try:
+            async with stdio_client(server_parameters) as (read_stream, write_stream):
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    self.connects += 1
+                    while True:
+                        item = await queue.get()
+                        if item is None:
+                            return
+                        arguments, result_future = item
+                        try:
+                            tool_result = await asyncio.wait_for(
+                                session.call_tool("get_live_scores", arguments),
+                                timeout=SPORTS_MCP_CALL_TIMEOUT,
+                            )
+                        except Exception as exc:
+                            if not result_future.done():
+                                result_future.set_exception(exc)
+                            return
+                        if not result_future.done():
+                            result_future.set_result(tool_result)
+        except Exception as exc:
+            logging.warning("Sports MCP connection closed: %s", exc)
+        finally:
+            while not queue.empty():
+                item = queue.get_nowait()
+                if item is not None and not item[1].done():
+                    item[1].set_exception(SportsBackendError("Sports MCP connection closed."))
+
+    async def _call(self, connection: _McpConnection, arguments: Dict[str, Any]) -> str:
+        if connection.task is None or connection.task.done():
+            connection.queue = asyncio.Queue()
+            connection.task = asyncio.get_running_loop().create_task(self._serve(connection.queue))
+
+        result_future = asyncio.get_running_loop().create_future()
+        await connection.queue.put((arguments, result_future))
+        return _extract_mcp_text(await result_future)
+
+    def fetch(self, leagues: Sequence[str], query: str = "", dates: str = "") -> str:
+        if (
+            not MCP_AVAILABLE
+            or ClientSession is None
+            or StdioServerParameters is None
+            or stdio_client is None
+        ):
+            raise SportsBackendError("Sports MCP support is unavailable because the `mcp` package is not installed.")
+
+        if not os.path.isfile(SPORTS_MCP_SERVER_PATH):
+            raise SportsBackendError(f"Sports MCP server not found: {SPORTS_MCP_SERVER_PATH}")
+
+        connection = self._connections[next(self._next_slot) % len(self._connections)]
+        arguments = {
+            "leagues": ",".join(leagues) if leagues else "all",
+            "query": query,
+            "strict": True,
+        }
+        if dates:
+            arguments["dates"] = dates
+        future = asyncio.run_coroutine_threadsafe(
+            self._call(connection, arguments),
+            self._ensure_loop(),
+        )
+        try:
+            return future.result(timeout=SPORTS_MCP_CALL_TIMEOUT)
+        except Exception:
+            future.cancel()
+            raise
+
+    async def _close_all(self) -> None:
+        tasks = []
+        for connection in self._connections:
+            if connection.task is not None and not connection.task.done() and connection.queue is not None:
+                await connection.queue.put(None)
+                tasks.append(connection.task)
+        if tasks:
+            await asyncio.wait(tasks, timeout=5)
+
+    def close(self) -> None:
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_all(), loop).result(timeout=10)
+        except Exception as exc:
+            logging.info("Failed to close sports MCP connections: %s", exc)
+
+
+class CachedBackend(SportsBackend):
+    """TTL cache of formatted scoreboard text keyed by leagues and query.
+
+    Entries older than ``ttl`` are not served on the fast path but are kept
+    until ``stale_ttl`` so the provider can still answer when every live
+    backend is failing. ``fetch`` serves fresh entries only and raises on a
+    miss, so the cache can also stand in as an ordinary backend.
+    """
+
+    name = "cache"
+
+    def __init__(self, ttl: float = SPORTS_CACHE_TTL, stale_ttl: float = SPORTS_CACHE_STALE_TTL) -> None:
+        self.ttl = ttl
+        self.stale_ttl = max(ttl, stale_ttl)
+        self._entries: Dict[Tuple[str, str, str], Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(leagues: Sequence[str], query: str, dates: str) -> Tuple[str, str, str]:
+        return ",".join(sorted(leagues)), query.strip().lower(), dates
+
+    def get(
+        self,
+        leagues: Sequence[str],
+        query: str = "",
+        allow_stale: bool = False,
+        dates: str = "",
+    ) -> Optional[str]:
+        max_age = self.stale_ttl if allow_stale else self.ttl
+        with self._lock:
+            entry = self._entries.get(self._key(leagues, query, dates))
+        if entry is None:
+            return None
+        text, stored_at = entry
+        if time.monotonic() - stored_at > max_age:
+            return None
+        return text
+
+    def fetch(self, leagues: Sequence[str], query: str = "", dates: str = "") -> str:
+        text = self.get(leagues, query, dates=dates)
+        if text is None:
+            raise SportsBackendError("No cached scoreboard for this request.")
+        return text
+
+    def put(self, leagues: Sequence[str], text: str, query: str = "", dates: str = "") -> None:
+        if self.ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._entries[self._key(leagues, query, dates)] = (text, now)
+            if len(self._entries) > 512:
+                for key in [key for key, (_, stored_at) in self._entries.items() if now - stored_at > self.stale_ttl]:
+                    del self._entries[key]
+
+    def export(self) -> List[Dict[str, Any]]:
+        offset = time.time() - time.monotonic()
+        with self._lock:
+            return [
+                {"leagues": leagues, "query": query, "dates": dates, "text": text, "stored_at": stored_at + offset}
+                for (leagues, query, dates), (text, stored_at) in self._entries.items()
+            ]
+
+    def restore(self, entries: List[Dict[str, Any]]) -> int:
+        offset = time.time() - time.monotonic()
+        now = time.monotonic()
+        restored = 0
+        with self._lock:
+            for entry in entries:
+                stored_at = float(entry["stored_at"]) - offset
+                key = (entry["leagues"], entry["query"], entry.get("dates", ""))
+                # Older entries can still serve as the stale fallback.
+                if now - stored_at <= self.stale_ttl and key not in self._entries:
+                    self._entries[key] = (entry["text"], stored_at)
+                    restored += 1
+        return restored
+
+
+class _BackendHealth:
+    def __init__(self, order: int) -> None:
+        self.order = order
+        self.ewma_ms: Optional[float] = None
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.wins = 0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+    def record_success(self, elapsed_ms: float) -> None:
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.ewma_ms = elapsed_ms if self.ewma_ms is None else 0.8 * self.ewma_ms + 0.2 * elapsed_ms
+
+    def record_failure(self, now: float) -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= SPORTS_UNHEALTHY_AFTER:
+            self.unhealthy_until = now + SPORTS_UNHEALTHY_COOLDOWN
+
+
+class SportsProvider:
+    """Scoreboard lookups across the cache and every configured backend.
+
+    A fresh cache hit is returned immediately. Otherwise healthy backends
+    are tried fastest-first: the next one is hedged in whenever the current
+    leaders have not answered within ``hedge_delay``, and the first success
+    inside ``latency_budget`` wins. Backends that keep failing are benched
+    for a cooldown, and a stale cache entry is the last resort.
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[SportsBackend],
+        cache: Optional[CachedBackend] = None,
+        latency_budget: float = SPORTS_LATENCY_BUDGET,
+        hedge_delay: float = SPORTS_HEDGE_DELAY,
+    ) -> None:
+        self.backends = list(backends)
+        self.cache = cache
+        self.latency_budget = latency_budget
+        self.hedge_delay = hedge_delay
+        self._health = {backend.name: _BackendHealth(order) for order, backend in enumerate(self.backends)}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(2, 2 * len(self.backends)),
+            thread_name_prefix="sports-provider",
+        )
+        self._stats = {"cache_hits": 0, "stale_hits": 0, "hedged": 0, "failures": 0}
+
+    def _ranked_backends(self) -> List[SportsBackend]:
+        now = time.monotonic()
+        with self._lock:
+            healthy = [backend for backend in self.backends if self._health[backend.name].healthy(now)]
+            # With everything benched, still try in configured order rather than fail fast.
+            candidates = healthy or list(self.backends)
+
+            def sort_key(backend: SportsBackend) -> Tuple[float, int]:
+                health = self._health[backend.name]
+                latency = health.ewma_ms if health.ewma_ms is not None else float("inf")
+                return latency, health.order
+
+            if all(self._health[backend.name].ewma_ms is None for backend in candidates):
+                return candidates
+            return sorted(candidates, key=sort_key)
+
+    def _run_backend(self, backend: SportsBackend, leagues: Sequence[str], query: str, dates: str) -> str:
+        started_at = time.perf_counter()
+        try:
+            text = backend.fetch(leagues, query=query, dates=dates)
+        except Exception:
+            with self._lock:
+                self._health[backend.name].record_failure(time.monotonic())
+            raise
+        with self._lock:
+            self._health[backend.name].record_success((time.perf_counter() - started_at) * 1000.0)
+        return text
+
+    def get_scores(self, leagues: Sequence[str], query: str = "", dates: str = "") -> str:
+        if self.cache is not None:
+            cached = self.cache.get(leagues, query, dates=dates)
+            if cached is not None:
+                with self._lock:
+                    self._stats["cache_hits"] += 1
+                return cached
+
+        deadline = time.monotonic() + self.latency_budget
+        pending: Dict[Future, SportsBackend] = {}
+        remaining_backends = self._ranked_backends()
+        next_launch_at = time.monotonic()
+
+        while remaining_backends or pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+
+            if remaining_backends and (now >= next_launch_at or not pending):
+                backend = remaining_backends.pop(0)
+                if pending:
+                    with self._lock:
+                        self._stats["hedged"] += 1
+                pending[self._executor.submit(self._run_backend, backend, leagues, query, dates)] = backend
+                next_launch_at = now + self.hedge_delay
+
+            timeout = deadline - now
+            if remaining_backends:
+                timeout = min(timeout, max(0.0, next_launch_at - now))
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    text = future.result()
+                except Exception as exc:
+                    logging.warning("Sports backend %s failed: %s", backend.name, exc)
+                    next_launch_at = time.monotonic()
+                    continue
+
+                for loser in pending:
+                    loser.cancel()
+                with self._lock:
+                    self._health[backend.name].wins += 1
+                if self.cache is not None:
+                    self.cache.put(leagues, text, query=query, dates=dates)
+                return text
+
+        for loser in pending:
+            loser.cancel()
+
+        with self._lock:
+            self._stats["failures"] += 1
+        if self.cache is not None:
+            stale = self.cache.get(leagues, query, allow_stale=True, dates=dates)
+            if stale is not None:
+                with self._lock:
+                    self._stats["stale_hits"] += 1
+                logging.info("Serving stale scoreboard data because every sports backend failed.")
+                return stale
+        return SCORES_UNAVAILABLE_MESSAGE
+
+    def close(self) -> None:
+        for backend in self.backends:
+            close = getattr(backend, "close", None)
+            if close is not None:
+                close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["backends"] = {
+                name: {
+                    "healthy": health.healthy(now),
+                    "ewma_ms": round(health.ewma_ms, 1) if health.ewma_ms is not None else None,
+                    "successes": health.successes,
+                    "failures": health.failures,
+                    "wins": health.wins,
+                }
+                for name, health in self._health.items()
+            }
+        return stats
+
+
+_BACKEND_FACTORIES = {
+    "direct": DirectBackend,
+    "mcp": McpBackend,
+}
+
+_default_provider: Optional[SportsProvider] = None
+_default_lock = threading.Lock()
+
+
+def build_sports_provider(backend_names: str = SPORTS_BACKENDS) -> SportsProvider:
+    backends: List[SportsBackend] = []
+    for name in (part.strip().lower() for part in backend_names.split(",")):
+        factory = _BACKEND_FACTORIES.get(name)
+        if factory is None:
+            if name:
+                logging.warning("Ignoring unknown sports backend %r", name)
+            continue
+        backends.append(factory())
+
+    if not backends:
+        backends.append(DirectBackend())
+
+    return SportsProvider(backends, cache=CachedBackend())
+
+
+def get_sports_provider() -> SportsProvider:
+    global _default_provider
+    if _default_provider is None:
+        with _default_lock:
+            if _default_provider is None:
+                _default_provider = build_sports_provider()
+    return _default_provider
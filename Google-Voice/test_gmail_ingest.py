@@ -0,0 +1,140 @@
+import json
+from typing import Any, List, Tuple
+
+import pytest
+
+import gmail_ingest
+from fake_gmail import FakeGmailService, FakeHttpError
+from gmail_ingest import GmailIngestor
+
+
+class RecordingHandler:
+    def __init__(self) -> None:
+        self.calls: List[Tuple[str, str]] = []
+
+    def __call__(self, sender: str, text: str, images: List[Any]) -> str:
+        self.calls.append((sender, text))
+        return f"echo: {text}"
+
+
+@pytest.fixture
+def service():
+    return FakeGmailService()
+
+
+@pytest.fixture
+def handler():
+    return RecordingHandler()
+
+
+@pytest.fixture
+def make_ingestor(service, handler):
+    ingestors: List[GmailIngestor] = []
+
+    def make(**kwargs: Any) -> GmailIngestor:
+        kwargs.setdefault("state_path", "")
+        ingestor = GmailIngestor(service, handle=handler, **kwargs)
+        ingestors.append(ingestor)
+        return ingestor
+
+    yield make
+    for ingestor in ingestors:
+        ingestor.stop()
+
+
+def test_incremental_sync_resumes_from_stored_history_id(service, handler, make_ingestor, tmp_path):
+    service.deliver_text("+15550000001", "already answered")
+    state_path = tmp_path / "gmail_state.json"
+    state_path.write_text(json.dumps({"history_id": str(service.history_id)}), encoding="utf-8")
+    service.deliver_text("+15550000002", "knicks score?")
+    latest = str(service.history_id)
+
+    ingestor = make_ingestor(state_path=str(state_path))
+    assert ingestor.poll_once() == 1
+
+    assert handler.calls == [("15550000002.voice@txt.voice.google.com", "knicks score?")]
+    assert service.calls["history.list"] == 1
+    assert service.calls["messages.list"] == 0
+    assert json.loads(state_path.read_text(encoding="utf-8"))["history_id"] == latest
+
+    # Nothing new: the next poll is a single history call and no replies.
+    assert ingestor.poll_once() == 0
+    assert len(service.sent) == 1
+
+
+def test_first_run_starts_from_now(service, handler, make_ingestor):
+    service.deliver_text("+15550000001", "old mail")
+
+    ingestor = make_ingestor()
+    assert ingestor.poll_once() == 0
+    assert ingestor.history_id == str(service.history_id)
+    assert handler.calls == []
+
+
+def test_failed_batch_keeps_checkpoint_and_retries_without_double_replies(
+    service, handler, make_ingestor, monkeypatch
+):
+    monkeypatch.setattr(gmail_ingest, "GMAIL_FETCH_RETRIES", 0)
+    ingestor = make_ingestor()
+    ingestor.poll_once()
+    checkpoint = ingestor.history_id
+
+    service.deliver_text("+15550000001", "first")
+    flaky_id = service.deliver_text("+15550000002", "second")
+    fetch_message = service._message
+
+    def failing_fetch(message_id: str):
+        if message_id == flaky_id:
+            raise FakeHttpError(500, "Backend Error")
+        return fetch_message(message_id)
+
+    monkeypatch.setattr(service, "_message", failing_fetch)
+    assert ingestor.poll_once() == 1
+    assert ingestor.history_id == checkpoint
+    assert ingestor.stats()["fetch_failures"] == 1
+
+    monkeypatch.setattr(service, "_message", fetch_message)
+    latest = str(service.history_id)
+    assert ingestor.poll_once() == 1
+    assert ingestor.history_id == latest
+
+    assert [text for _, text in handler.calls] == ["first", "second"]
+    assert sorted(reply["text"] for reply in service.sent) == ["echo: first", "echo: second"]
+
+
+def test_replies_follow_thread_order_and_thread_headers(service, handler, make_ingestor):
+    ingestor = make_ingestor(workers=4)
+    ingestor.poll_once()
+
+    message_ids = [service.deliver_text("+15550000001", f"text {index}") for index in range(3)]
+    service.deliver_text("+15550000002", "other thread")
+    assert ingestor.poll_once() == 4
+
+    same_thread = [reply for reply in service.sent if reply["threadId"] == "thread-15550000001"]
+    assert [reply["text"] for reply in same_thread] == ["echo: text 0", "echo: text 1", "echo: text 2"]
+    assert [reply["in_reply_to"] for reply in same_thread] == [
+        f"<{message_id}@txt.voice.google.com>" for message_id in message_ids
+    ]
+    for reply in same_thread:
+        assert reply["to"] == "15550000001.voice@txt.voice.google.com"
+        assert reply["subject"] == "Re: New text message from +15550000001"
+
+
+def test_expired_history_resyncs_unread_mail(service, handler, make_ingestor):
+    ingestor = make_ingestor()
+    ingestor.poll_once()
+
+    service.deliver_text("+15550000001", "read elsewhere", unread=False)
+    service.deliver_text("+15550000002", "still unread")
+    service.expire_history()
+    latest = str(service.history_id)
+
+    assert ingestor.poll_once() == 1
+    assert handler.calls == [("15550000002.voice@txt.voice.google.com", "still unread")]
+    assert ingestor.stats()["resyncs"] == 1
+    assert ingestor.history_id == latest
+
+    # Back on incremental sync from the fresh history ID.
+    service.deliver_text("+15550000003", "after resync")
+    assert ingestor.poll_once() == 1
+    assert ingestor.stats()["resyncs"] == 1
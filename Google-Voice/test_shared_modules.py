@@ -0,0 +1,25 @@
+from pathlib import Path
+
+import pytest
+
+HERE = Path(__file__).resolve().parent
+TWILIO_DIR = HERE.parent / "Twilio"
+
+SHARED_MODULES = [
+    "chat_images.py",
+    "espn_scores.py",
+    "hedging.py",
+    "http_client.py",
+    "ngrams.py",
+    "scores_archive.py",
+    "sports_mcp_server.py",
+    "sports_provider.py",
+]
+
+
+@pytest.mark.skipif(not TWILIO_DIR.is_dir(), reason="Twilio folder not deployed alongside")
+@pytest.mark.parametrize("name", SHARED_MODULES)
+def test_shared_module_matches_twilio_copy(name):
+    assert (HERE / name).read_bytes() == (TWILIO_DIR / name).read_bytes(), (
+        f"{name} differs from Twilio/{name}; copy the changed version to both folders"
+    )
@@ -0,0 +1,80 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("API_KEY", "test")
+
+import chat_images  # noqa: E402
+import sms_gemini  # noqa: E402
+from chat_images import get_image_stats  # noqa: E402
+
+
+class RecordingProvider:
+    def __init__(self):
+        self.calls = []
+
+    def get_scores(self, leagues, query=""):
+        self.calls.append((list(leagues), query))
+        return "NBA:\n- Knicks 101 - Celtics 99"
+
+
+class EchoChat:
+    def send_message(self, message):
+        return SimpleNamespace(text="ok")
+
+
+class EmptyReplyChat:
+    def __init__(self):
+        self.history = []
+
+    def get_history(self, curated=False):
+        return self.history
+
+    def send_message(self, message):
+        self.history.append(SimpleNamespace(role="user", parts=list(message)))
+        return SimpleNamespace(text="")
+
+
+@pytest.mark.parametrize(
+    "text, leagues, team_intent",
+    [
+        ("knicks score?", ["nba"], True),
+        ("did the red sox win", ["mlb"], True),
+        ("nba scores", ["nba"], False),
+        ("live scores", ["mlb", "nhl", "nba", "nfl"], False),
+        ("what's for dinner", [], False),
+    ],
+)
+def test_detect_requested_leagues(text, leagues, team_intent):
+    assert sms_gemini.detect_requested_leagues(text) == (leagues, team_intent)
+
+
+@pytest.mark.parametrize(
+    "text, query",
+    [
+        ("knicks score?", "knicks score?"),
+        ("nba scores", ""),
+    ],
+)
+def test_team_prompt_is_passed_to_sports_provider(monkeypatch, text, query):
+    provider = RecordingProvider()
+    monkeypatch.setattr(sms_gemini, "sports_provider", provider)
+    monkeypatch.setattr(sms_gemini, "get_or_create_chat", lambda sender: EchoChat())
+
+    assert sms_gemini.generate_response("+15550000001", text, []) == "ok"
+    assert provider.calls == [(["nba"], query)]
+
+
+def test_empty_reply_still_releases_image_bytes(monkeypatch):
+    chat = EmptyReplyChat()
+    monkeypatch.setattr(sms_gemini, "get_or_create_chat", lambda sender: chat)
+    monkeypatch.setattr(chat_images, "Part", lambda text: SimpleNamespace(text=text, inline_data=None))
+    image = SimpleNamespace(inline_data=SimpleNamespace(data=b"\xff\xd8" + b"\x00" * 2048, mime_type="image/jpeg"))
+    released_before = get_image_stats()["released_images"]
+
+    reply = sms_gemini.generate_response("+15551230000", "what is this?", [image])
+
+    assert reply.startswith("I could not generate a response")
+    assert chat.history[0].parts[0].inline_data is None
+    assert get_image_stats()["released_images"] == released_before + 1
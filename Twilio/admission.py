@@ -0,0 +1,243 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# ----------------- Configuration -----------------
+
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "3"))
+ADMISSION_MAX_QUEUE_WAIT = float(os.getenv("ADMISSION_MAX_QUEUE_WAIT", "1"))
+ADMISSION_GLOBAL_RATE = float(os.getenv("ADMISSION_GLOBAL_RATE", "5"))
+ADMISSION_GLOBAL_BURST = float(os.getenv("ADMISSION_GLOBAL_BURST", "20"))
+ADMISSION_SENDER_RATE = float(os.getenv("ADMISSION_SENDER_RATE", "0.2"))
+ADMISSION_SENDER_BURST = float(os.getenv("ADMISSION_SENDER_BURST", "5"))
+ADMISSION_BUSY_MESSAGE = os.getenv(
+    "ADMISSION_BUSY_MESSAGE",
+    "I'm a little busy right now. Please try again shortly.",
+)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        # A non-positive rate disables the limit rather than blocking forever.
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return True
+            return False
+
+    def refund(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + amount)
+
+    def charge(self, amount: float) -> None:
+        # Unlike try_acquire this may drive the balance negative, which is how
+        # usage that turned out larger than estimated is paid back over time.
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.burst, self.tokens - amount)
+
+    def time_until_available(self, amount: float = 1.0) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = min(amount, self.burst) - self.tokens
+            return max(0.0, missing / self.rate)
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def is_full(self) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.tokens >= self.burst
+
+
+class Admission:
+    def __init__(
+        self,
+        controller: "AdmissionController",
+        admitted: bool,
+        reason: str,
+        holds_slot: bool = True,
+    ) -> None:
+        self.controller = controller
+        self.admitted = admitted
+        self.reason = reason
+        self.holds_slot = holds_slot
+
+    def __enter__(self) -> "Admission":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self.admitted:
+            self.controller.release(self.holds_slot)
+
+
+class AdmissionController:
+    """Decides per webhook whether to do the expensive work or shed it.
+
+    A request must pass the global and per-sender token buckets and then
+    get one of ``max_in_flight`` slots within ``max_queue_wait`` seconds;
+    anything else is shed so Twilio gets a fast reply instead of timing out
+    and retrying into an already saturated worker.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+        max_queue_wait: float = ADMISSION_MAX_QUEUE_WAIT,
+        global_rate: float = ADMISSION_GLOBAL_RATE,
+        global_burst: float = ADMISSION_GLOBAL_BURST,
+        sender_rate: float = ADMISSION_SENDER_RATE,
+        sender_burst: float = ADMISSION_SENDER_BURST,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue_wait = max_queue_wait
+        self.sender_rate = sender_rate
+        self.sender_burst = sender_burst
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self._slots = threading.BoundedSemaphore(max(1, max_in_flight))
+        self._lock = threading.Lock()
+        self._sender_buckets: Dict[str, TokenBucket] = {}
+        self._in_flight = 0
+        self._draining = False
+        self._stats = {
+            "admitted": 0,
+            "shed_draining": 0,
+            "shed_global_rate": 0,
+            "shed_sender_rate": 0,
+            "shed_capacity": 0,
+            "queue_wait_total_ms": 0.0,
+            "queue_wait_max_ms": 0.0,
+        }
+
+    def _sender_bucket(self, sender: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._sender_buckets.get(sender)
+            if bucket is None:
+                if len(self._sender_buckets) >= 10000:
+                    self._prune_sender_buckets()
+                bucket = TokenBucket(self.sender_rate, self.sender_burst)
+                self._sender_buckets[sender] = bucket
+            return bucket
+
+    def _prune_sender_buckets(self) -> None:
+        # Full buckets carry no state worth keeping; drop them to bound memory.
+        for sender in [key for key, bucket in self._sender_buckets.items() if bucket.is_full()]:
+            del self._sender_buckets[sender]
+
+    def _shed(self, reason: str) -> Admission:
+        with self._lock:
+            self._stats[f"shed_{reason}"] += 1
+        logging.warning("Shedding inbound message (%s)", reason)
+        return Admission(self, False, reason)
+
+    def admit(self, sender: str) -> Admission:
+        if self._draining:
+            return self._shed("draining")
+        sender_bucket = self._sender_bucket(sender)
+        if not sender_bucket.try_acquire():
+            return self._shed("sender_rate")
+        if not self.global_bucket.try_acquire():
+            sender_bucket.refund()
+            return self._shed("global_rate")
+
+        started_at = time.monotonic()
+        if not self._slots.acquire(timeout=max(0.0, self.max_queue_wait)):
+            # The request did no work, so it should not count against either rate.
+            sender_bucket.refund()
+            self.global_bucket.refund()
+            return self._shed("capacity")
+
+        waited_ms = (time.monotonic() - started_at) * 1000.0
+        with self._lock:
+            self._in_flight += 1
+            self._stats["admitted"] += 1
+            self._stats["queue_wait_total_ms"] += waited_ms
+            self._stats["queue_wait_max_ms"] = max(self._stats["queue_wait_max_ms"], waited_ms)
+        return Admission(self, True, "admitted")
+
+    def track(self) -> Admission:
+        """Counts a request as in flight without rate limits or slots.
+
+        Used when admission control is off, so shutdown can still drain.
+        """
+        with self._lock:
+            draining = self._draining
+            if not draining:
+                self._in_flight += 1
+        if draining:
+            return self._shed("draining")
+        return Admission(self, True, "tracked", holds_slot=False)
+
+    def release(self, holds_slot: bool = True) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        if holds_slot:
+            self._slots.release()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return self._in_flight
+
+    def begin_drain(self) -> None:
+        """Sheds every later request, e.g. while the worker shuts down."""
+        with self._lock:
+            self._draining = True
+
+    def wait_for_drain(self, timeout: float) -> bool:
+        """Waits up to ``timeout`` seconds for admitted requests to finish."""
+        deadline = time.monotonic() + timeout
+        while self.in_flight() > 0:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["in_flight"] = self._in_flight
+            stats["draining"] = self._draining
+            stats["tracked_senders"] = len(self._sender_buckets)
+        admitted = stats["admitted"]
+        stats["queue_wait_avg_ms"] = stats["queue_wait_total_ms"] / admitted if admitted else 0.0
+        stats["shed_total"] = (
+            stats["shed_global_rate"] + stats["shed_sender_rate"] + stats["shed_capacity"] + stats["shed_draining"]
+        )
+        stats["max_in_flight"] = self.max_in_flight
+        return stats
+
+
+_default_controller: Optional[AdmissionController] = None
+_default_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    global _default_controller
+    if _default_controller is None:
+        with _default_lock:
+            if _default_controller is None:
+                _default_controller = AdmissionController()
+    return _default_controller
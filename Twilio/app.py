@@ -11,3 +11,5 @@ module = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(module)
 
 app = module.app
+startup = module.startup
+shutdown = module.shutdown
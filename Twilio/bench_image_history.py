@@ -0,0 +1,126 @@
+"""Memory benchmark for images kept in chat history.
+
+Usage:
+    python bench_image_history.py [--sessions 5] [--turns 10] [--width 1600 --height 1200]
+
+Simulates sessions whose every turn carries one MMS photo and reports the
+worker RSS growth and the image bytes left in history for three strategies:
+
+    legacy        decoded PIL image handed to the chat (the SDK re-encodes it
+                  as PNG and keeps that in history for the session's life)
+    compact-keep  carrier JPEG bytes passed through, kept in history
+    compact       carrier JPEG bytes passed through, released after the turn
+
+Each strategy runs in a fresh interpreter so RSS numbers do not interfere.
+No network access is needed: turns are recorded without calling Gemini.
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict
+
+STRATEGIES = ("legacy", "compact-keep", "compact")
+
+
+def _photo_bytes(width: int, height: int, seed: int) -> bytes:
+    from PIL import Image, ImageFilter
+
+    # Smooth gradients plus fine noise compress roughly like a phone photo.
+    base = Image.merge(
+        "RGB",
+        (
+            Image.linear_gradient("L").resize((width, height)),
+            Image.radial_gradient("L").resize((width, height)),
+            Image.effect_noise((width, height), 40 + seed % 20).filter(ImageFilter.GaussianBlur(1)),
+        ),
+    )
+    buffer = io.BytesIO()
+    base.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def run_strategy(strategy: str, sessions: int, turns: int, width: int, height: int) -> Dict[str, Any]:
+    os.environ["CHAT_HISTORY_KEEP_IMAGES"] = "true" if strategy == "compact-keep" else "false"
+
+    from google import genai
+    from google.genai import types
+    from PIL import Image
+
+    from chat_images import compact_image_part, release_history_images
+    from memory_profile import history_footprint, rss_bytes
+
+    client = genai.Client(api_key="bench")
+    photos = [_photo_bytes(width, height, seed) for seed in range(4)]
+    gc.collect()
+    rss_before = rss_bytes()
+
+    chats = []
+    for _ in range(sessions):
+        chat = client.chats.create(model="gemini-bench")
+        for turn in range(turns):
+            content = photos[turn % len(photos)]
+            if strategy == "legacy":
+                image = Image.open(io.BytesIO(content))
+                image.load()
+                user_input = types.UserContent(parts=[image, "What is in this photo?"])
+            else:
+                user_input = types.UserContent(parts=[compact_image_part(content), "What is in this photo?"])
+            reply = types.ModelContent(parts=[types.Part(text="It looks like a colourful abstract gradient.")])
+            chat.record_history(user_input=user_input, model_output=[reply], is_valid=True)
+            if strategy == "compact":
+                release_history_images(chat)
+        chats.append(chat)
+
+    gc.collect()
+    rss_after = rss_bytes()
+    image_bytes = sum(history_footprint(chat)["image_bytes"] for chat in chats)
+    return {
+        "strategy": strategy,
+        "rss_growth_mb": round((rss_after - rss_before) / (1024 * 1024), 1),
+        "per_session_mb": round((rss_after - rss_before) / (1024 * 1024) / max(1, sessions), 2),
+        "history_image_mb": round(image_bytes / (1024 * 1024), 2),
+        "photo_kb": round(sum(len(photo) for photo in photos) / len(photos) / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--width", type=int, default=1600)
+    parser.add_argument("--height", type=int, default=1200)
+    parser.add_argument("--child", choices=STRATEGIES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_strategy(args.child, args.sessions, args.turns, args.width, args.height)))
+        return
+
+    print(f"{args.sessions} sessions x {args.turns} image turns, {args.width}x{args.height} photos")
+    print(f"{'strategy':<14}{'RSS growth MB':>15}{'per session MB':>16}{'history images MB':>19}")
+    for strategy in STRATEGIES:
+        output = subprocess.run(
+            [
+                sys.executable, __file__, "--child", strategy,
+                "--sessions", str(args.sessions), "--turns", str(args.turns),
+                "--width", str(args.width), "--height", str(args.height),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{strategy:<14}{result['rss_growth_mb']:>15.1f}{result['per_session_mb']:>16.2f}"
+            f"{result['history_image_mb']:>19.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Micro-benchmark for n-gram generation used by intent and team matching.
+
+Usage:
+    python bench_ngrams.py [--iterations 20000]
+
+Compares the previous implementation (two regex passes, a token list and a
+" ".join per n-gram) with the shared streaming iter_ngrams, for plain
+message n-grams and for stopword-filtered team query n-grams, reporting
+time per message and peak traced allocation per call. The shared version's
+peak is measured while streaming (consuming n-grams without keeping them),
+which is how early-exit matchers use it; legacy always builds the full list.
+"""
+
+import argparse
+import re
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Sequence
+
+from espn_scores import TEAM_QUERY_STOPWORDS
+from ngrams import iter_ngrams
+
+SAMPLES: Dict[str, str] = {
+    "short": "knicks score?",
+    "typical": "Hey, did the Yankees win last night? And what's the Knicks game tonight?",
+    "long": (
+        "So I was talking with my brother about whether the New York Giants can still make "
+        "the playoffs this year, and he thinks the Eagles and Cowboys are too strong. Can you "
+        "check the latest NFL scores and tell me how the Giants did on Sunday, plus whether the "
+        "Jets are playing tonight? Also what's the weather going to be like for the game? "
+    ) * 2,
+}
+
+
+def legacy_normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9\s]", " ", text.lower())).strip()
+
+
+def legacy_build_ngrams(tokens: Sequence[str], max_words: int = 3) -> List[str]:
+    ngrams: List[str] = []
+    for n in range(1, max_words + 1):
+        for start in range(0, max(0, len(tokens) - n + 1)):
+            ngram = " ".join(tokens[start:start + n]).strip()
+            if len(ngram) >= 3:
+                ngrams.append(ngram)
+    return ngrams
+
+
+def legacy_message_ngrams(text: str) -> List[str]:
+    return legacy_build_ngrams([token for token in legacy_normalize(text).split() if token])
+
+
+def legacy_team_ngrams(text: str) -> List[str]:
+    tokens = [
+        token
+        for token in legacy_normalize(text).split()
+        if token and token not in TEAM_QUERY_STOPWORDS and (len(token) >= 3 or token.isdigit())
+    ]
+    return legacy_build_ngrams(tokens) if tokens else []
+
+
+def message_ngrams(text: str) -> List[str]:
+    return list(iter_ngrams(text))
+
+
+def team_ngrams(text: str) -> List[str]:
+    return list(iter_ngrams(text, stopwords=TEAM_QUERY_STOPWORDS, min_token_length=3))
+
+
+def _streamed(function: Callable[[str], List[str]]) -> Callable[[str], None]:
+    keyword_args = {} if function is message_ngrams else {"stopwords": TEAM_QUERY_STOPWORDS, "min_token_length": 3}
+
+    def consume(text: str) -> None:
+        for _ in iter_ngrams(text, **keyword_args):
+            pass
+
+    return consume
+
+
+def _time_per_call(function: Callable[[str], object], text: str, iterations: int) -> float:
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        function(text)
+    return (time.perf_counter() - started_at) / iterations * 1_000_000
+
+
+def _peak_bytes(function: Callable[[str], object], text: str) -> int:
+    tracemalloc.start()
+    function(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    cases = (
+        ("message", legacy_message_ngrams, message_ngrams),
+        ("team query", legacy_team_ngrams, team_ngrams),
+    )
+    print(f"{'case':<12}{'sample':<9}{'ngrams':>7}{'legacy us':>11}{'shared us':>11}{'legacy B':>10}{'shared B':>10}")
+    for case, legacy, shared in cases:
+        for name, text in SAMPLES.items():
+            assert legacy(text) == shared(text)
+            iterations = max(1, args.iterations // (10 if name == "long" else 1))
+            print(
+                f"{case:<12}{name:<9}{len(shared(text)):>7}"
+                f"{_time_per_call(legacy, text, iterations):>11.2f}{_time_per_call(shared, text, iterations):>11.2f}"
+                f"{_peak_bytes(legacy, text):>10}{_peak_bytes(_streamed(shared), text):>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Micro-benchmark for the SMS output encoder.
+
+Usage:
+    python bench_sms_encoding.py [--iterations 2000]
+
+Compares the old normalize_response (asterisk swap + whitespace collapse)
+with encode_sms on typical and long model replies, reporting time per reply
+and the Twilio segments each version would be billed for.
+"""
+
+import argparse
+import time
+from typing import Callable, Dict
+
+from sms_encoding import count_segments, encode_sms
+
+SAMPLES: Dict[str, str] = {
+    "short": "The Knicks beat the Celtics 112-104 last night. Brunson had 34!",
+    "smart_quotes": (
+        "Here’s what I found: the “best” time to visit is late spring — mild weather, "
+        "fewer crowds… and cheaper flights. 🌸✈️"
+    ),
+    "long_markdown": (
+        "**Tonight's NBA scores:**\n"
+        "* Knicks 112 – Celtics 104 (Final)\n"
+        "* Lakers 98 – Warriors 101 (Final/OT)\n"
+        "* Heat 87 – Bucks 90 (4th 2:13)\n\n"
+        "It’s been a wild night — three games came down to the final minute. 🏀🔥 "
+    ) * 6,
+    "long_plain": ("The quick brown fox jumps over the lazy dog near the riverbank. " * 40),
+}
+
+
+def legacy_normalize(text: str) -> str:
+    cleaned = text.replace("*", "-").strip()
+    return " ".join(cleaned.split())
+
+
+def _time_per_call(function: Callable[[str], object], text: str, iterations: int) -> float:
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        function(text)
+    return (time.perf_counter() - started_at) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'sample':<15}{'legacy us':>11}{'encoder us':>12}{'legacy seg':>12}{'encoder seg':>13}  encoding")
+    for name, text in SAMPLES.items():
+        legacy_us = _time_per_call(legacy_normalize, text, args.iterations)
+        encoder_us = _time_per_call(encode_sms, text, args.iterations)
+        encoded = encode_sms(text)
+        print(
+            f"{name:<15}{legacy_us:>11.1f}{encoder_us:>12.1f}"
+            f"{count_segments(legacy_normalize(text)):>12}{encoded.segments:>13}  {encoded.encoding}"
+            f"{' (truncated)' if encoded.truncated else ''}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from google.genai.types import CreateCachedContentConfig, UpdateCachedContentConfig
+
+# ----------------- Configuration -----------------
+
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "false").strip().lower() == "true"
+GEMINI_CACHE_TTL = int(os.getenv("GEMINI_CACHE_TTL", "3600"))
+GEMINI_CACHE_REFRESH_MARGIN = int(os.getenv("GEMINI_CACHE_REFRESH_MARGIN", "300"))
+GEMINI_CACHE_RETRY_AFTER = float(os.getenv("GEMINI_CACHE_RETRY_AFTER", "600"))
+
+_registry_lock = threading.Lock()
+_caches: Dict[str, "ContextCache"] = {}
+
+
+def is_cache_missing_error(exc: BaseException) -> bool:
+    message = str(exc).lower()
+    return "cachedcontent" in message.replace(" ", "").replace("_", "") and (
+        "not found" in message or "not_found" in message or "expired" in message or "404" in message
+    )
+
+
+class ContextCache:
+    """Explicit Gemini context cache for a tenant's stable prompt prefix.
+
+    The system instruction (plus an optional glossary) and tool definitions
+    are uploaded once; chats then refer to the cache by name instead of
+    resending them every turn. The TTL is extended whenever the cache is
+    used within ``refresh_margin`` of expiring, and a cache that expired
+    anyway is simply recreated. If creation fails (for example because the
+    prefix is below the model's minimum cacheable size) callers fall back to
+    inline configuration and creation is retried after ``retry_after``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        client: Any,
+        model_id: str,
+        system_instruction: str,
+        tools: List[Any],
+        ttl: int = GEMINI_CACHE_TTL,
+        refresh_margin: int = GEMINI_CACHE_REFRESH_MARGIN,
+        retry_after: float = GEMINI_CACHE_RETRY_AFTER,
+    ) -> None:
+        self.name = name
+        self.client = client
+        self.model_id = model_id
+        self.system_instruction = system_instruction
+        self.tools = tools
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._cache_name: Optional[str] = None
+        self._expires_at = 0.0
+        self._retry_at = 0.0
+        self._updating = False
+        self._cached_tokens = 0
+        self._stats = {
+            "created": 0,
+            "refreshed": 0,
+            "create_failures": 0,
+            "invalidated": 0,
+            "turns": 0,
+            "prompt_tokens": 0,
+            "cached_prompt_tokens": 0,
+        }
+
+    def _expiry_from(self, cached_content: Any, now: float) -> float:
+        expire_time = getattr(cached_content, "expire_time", None)
+        if expire_time is not None:
+            try:
+                return expire_time.timestamp()
+            except (AttributeError, OverflowError, ValueError):
+                pass
+        return now + self.ttl
+
+    def _create(self) -> Optional[Any]:
+        try:
+            return self.client.caches.create(
+                model=self.model_id,
+                config=CreateCachedContentConfig(
+                    display_name=f"sms-gemini-{self.name}",
+                    system_instruction=self.system_instruction,
+                    tools=self.tools or None,
+                    ttl=f"{self.ttl}s",
+                ),
+            )
+        except Exception as exc:
+            logging.warning(
+                "Context cache for %s unavailable, using inline config for %.0fs: %s",
+                self.name,
+                self.retry_after,
+                exc,
+            )
+            return None
+
+    def _refresh(self, cache_name: str) -> Optional[Any]:
+        try:
+            return self.client.caches.update(
+                name=cache_name,
+                config=UpdateCachedContentConfig(ttl=f"{self.ttl}s"),
+            )
+        except Exception as exc:
+            logging.info("Context cache %s could not be refreshed, recreating: %s", cache_name, exc)
+            return None
+
+    def cached_content(self) -> Optional[str]:
+        """Returns the cache name to use, or None to fall back to inline config."""
+        with self._lock:
+            now = time.time()
+            if self._cache_name and now < self._expires_at - self.refresh_margin:
+                return self._cache_name
+            if self._updating:
+                # Another turn is already talking to the API; keep using the
+                # current cache until it actually expires.
+                return self._cache_name if now < self._expires_at else None
+            refresh_name = self._cache_name if self._cache_name and now < self._expires_at else None
+            if refresh_name is None and now < self._retry_at:
+                return None
+            self._updating = True
+
+        # The API calls run without the lock so other turns are not held
+        # behind a slow refresh; the result is swapped in afterwards.
+        refreshed = created = None
+        try:
+            if refresh_name is not None:
+                refreshed = self._refresh(refresh_name)
+            if refreshed is None:
+                created = self._create()
+        except BaseException:
+            with self._lock:
+                self._updating = False
+            raise
+
+        with self._lock:
+            self._updating = False
+            now = time.time()
+            if refreshed is not None:
+                if self._cache_name == refresh_name:
+                    self._expires_at = self._expiry_from(refreshed, now)
+                    self._stats["refreshed"] += 1
+            elif created is not None:
+                self._cache_name = created.name
+                self._expires_at = self._expiry_from(created, now)
+                usage = getattr(created, "usage_metadata", None)
+                self._cached_tokens = getattr(usage, "total_token_count", None) or 0
+                self._stats["created"] += 1
+                logging.info(
+                    "Created context cache %s for %s (%s tokens)", self._cache_name, self.name, self._cached_tokens
+                )
+            else:
+                self._cache_name = None
+                self._expires_at = 0.0
+                self._retry_at = now + self.retry_after
+                self._stats["create_failures"] += 1
+            return self._cache_name
+
+    def invalidate(self, cache_name: Optional[str]) -> None:
+        with self._lock:
+            if cache_name and cache_name == self._cache_name:
+                self._cache_name = None
+                self._expires_at = 0.0
+                self._stats["invalidated"] += 1
+
+    def record_usage(self, response: Any) -> None:
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, "prompt_token_count", None) or 0
+        cached_tokens = getattr(usage, "cached_content_token_count", None) or 0
+        with self._lock:
+            self._stats["turns"] += 1
+            self._stats["prompt_tokens"] += prompt_tokens
+            self._stats["cached_prompt_tokens"] += cached_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["cache_name"] = self._cache_name
+            stats["cached_tokens"] = self._cached_tokens
+            stats["expires_in_s"] = round(max(0.0, self._expires_at - time.time()), 1) if self._cache_name else 0.0
+        prompt_tokens = stats["prompt_tokens"]
+        stats["cached_token_ratio"] = round(stats["cached_prompt_tokens"] / prompt_tokens, 4) if prompt_tokens else 0.0
+        return stats
+
+
+def get_context_cache(
+    key: str,
+    client: Any,
+    model_id: str,
+    system_instruction: str,
+    tools: List[Any],
+) -> Optional[ContextCache]:
+    if not GEMINI_CONTEXT_CACHE:
+        return None
+    with _registry_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = ContextCache(key, client, model_id, system_instruction, tools)
+            _caches[key] = cache
+        return cache
+
+
+def get_context_cache_stats() -> Dict[str, Any]:
+    with _registry_lock:
+        caches = dict(_caches)
+    return {"enabled": GEMINI_CONTEXT_CACHE, "caches": {key: cache.stats() for key, cache in caches.items()}}
@@ -0,0 +1,225 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from admission import TokenBucket
+
+# ----------------- Configuration -----------------
+
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "60"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+GEMINI_MAX_CONCURRENT = int(os.getenv("GEMINI_MAX_CONCURRENT", "4"))
+# Twilio gives up on the /sms webhook after 15s. Admission queueing and the
+# Gemini call itself need most of that, so a quota stall sheds well before.
+GEMINI_MAX_QUEUE_WAIT = float(os.getenv("GEMINI_MAX_QUEUE_WAIT", "5"))
+GEMINI_RATE_LIMIT_COOLDOWN = float(os.getenv("GEMINI_RATE_LIMIT_COOLDOWN", "5"))
+GEMINI_MIN_RPM_FRACTION = float(os.getenv("GEMINI_MIN_RPM_FRACTION", "0.1"))
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+
+_PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_BULK: "bulk",
+}
+
+
+class GeminiBudgetExceeded(RuntimeError):
+    pass
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    message = str(exc).lower()
+    return (
+        getattr(exc, "code", None) == 429
+        or "429" in message
+        or "resource_exhausted" in message
+        or "rate limit" in message
+    )
+
+
+class GeminiDispatcher:
+    """Single gate every Gemini call passes through.
+
+    Calls wait in priority order for a concurrency slot and for room in the
+    requests-per-minute and tokens-per-minute buckets. A 429 halves the
+    request rate and pauses the whole queue for a cooldown, so every waiting
+    thread backs off together instead of retrying on its own schedule; each
+    success then raises the rate again by a small step up to the configured
+    ceiling.
+    """
+
+    def __init__(
+        self,
+        rpm: float = GEMINI_RPM,
+        tpm: float = GEMINI_TPM,
+        max_concurrent: int = GEMINI_MAX_CONCURRENT,
+        max_queue_wait: float = GEMINI_MAX_QUEUE_WAIT,
+        rate_limit_cooldown: float = GEMINI_RATE_LIMIT_COOLDOWN,
+    ) -> None:
+        self.max_rpm = rpm
+        self.min_rpm = max(1.0, rpm * GEMINI_MIN_RPM_FRACTION)
+        self.current_rpm = rpm
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue_wait = max_queue_wait
+        self.rate_limit_cooldown = rate_limit_cooldown
+        self.request_bucket = TokenBucket(rpm / 60.0, max(1.0, rpm / 6.0))
+        self.token_bucket = TokenBucket(tpm / 60.0, tpm)
+        self._cond = threading.Condition()
+        self._waiting: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._paused_until = 0.0
+        self._stats: Dict[str, Any] = {
+            "calls": 0,
+            "rate_limited": 0,
+            "budget_timeouts": 0,
+            "queue_wait_total_ms": 0.0,
+            "estimated_tokens": 0,
+            "actual_tokens": 0,
+            "calls_by_priority": {name: 0 for name in _PRIORITY_NAMES.values()},
+        }
+
+    def _ready_delay(self, estimated_tokens: int) -> Optional[float]:
+        # Returns 0 when the caller at the head of the queue may start now,
+        # a positive delay when a budget will refill, or None to wait for a
+        # notification (slot release or queue change).
+        if self._active >= self.max_concurrent:
+            return None
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            return pause
+        return max(
+            self.request_bucket.time_until_available(1.0),
+            self.token_bucket.time_until_available(float(estimated_tokens)),
+        )
+
+    def _leave_queue(self, ticket: Tuple[int, int]) -> None:
+        self._waiting.remove(ticket)
+        heapq.heapify(self._waiting)
+        self._cond.notify_all()
+
+    def _acquire(self, priority: int, estimated_tokens: int) -> None:
+        ticket = (priority, next(self._sequence))
+        started_at = time.monotonic()
+        deadline = started_at + self.max_queue_wait
+
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            while True:
+                remaining = deadline - time.monotonic()
+                delay: Optional[float] = None
+                if self._waiting[0] == ticket:
+                    delay = self._ready_delay(estimated_tokens)
+                    if delay is not None and delay <= 0:
+                        heapq.heappop(self._waiting)
+                        self.request_bucket.charge(1.0)
+                        self.token_bucket.charge(float(estimated_tokens))
+                        self._active += 1
+                        self._stats["calls"] += 1
+                        self._stats["estimated_tokens"] += estimated_tokens
+                        self._stats["queue_wait_total_ms"] += (time.monotonic() - started_at) * 1000.0
+                        self._stats["calls_by_priority"][_PRIORITY_NAMES.get(priority, "bulk")] += 1
+                        self._cond.notify_all()
+                        return
+
+                if remaining <= 0:
+                    self._stats["budget_timeouts"] += 1
+                    self._leave_queue(ticket)
+                    raise GeminiBudgetExceeded(
+                        f"Gemini call waited more than {self.max_queue_wait:.0f}s for quota"
+                    )
+
+                self._cond.wait(timeout=min(remaining, delay) if delay else remaining)
+
+    def has_headroom(self, estimated_tokens: int = 0) -> bool:
+        """True when a call could start right now without queueing.
+
+        Optional extra calls such as hedges check this first, so they are
+        only sent while nobody is waiting and the budgets have room.
+        """
+        with self._cond:
+            if self._waiting:
+                return False
+            delay = self._ready_delay(estimated_tokens)
+            return delay is not None and delay <= 0
+
+    def _release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def _on_success(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        with self._cond:
+            if actual_tokens is not None:
+                self._stats["actual_tokens"] += actual_tokens
+                self.token_bucket.charge(float(actual_tokens - estimated_tokens))
+            if self.current_rpm < self.max_rpm:
+                self.current_rpm = min(self.max_rpm, self.current_rpm + 1.0)
+                self.request_bucket.set_rate(self.current_rpm / 60.0)
+
+    def _on_rate_limited(self) -> None:
+        with self._cond:
+            self._stats["rate_limited"] += 1
+            self.current_rpm = max(self.min_rpm, self.current_rpm / 2.0)
+            self.request_bucket.set_rate(self.current_rpm / 60.0)
+            self._paused_until = max(
+                self._paused_until,
+                time.monotonic() + self.rate_limit_cooldown,
+            )
+            self._cond.notify_all()
+        logging.warning(
+            "Gemini rate limited; pausing %.1fs and lowering budget to %.1f RPM",
+            self.rate_limit_cooldown,
+            self.current_rpm,
+        )
+
+    def call(
+        self,
+        fn: Callable[[], Any],
+        priority: int = PRIORITY_NORMAL,
+        estimated_tokens: int = 0,
+    ) -> Any:
+        self._acquire(priority, estimated_tokens)
+        try:
+            result = fn()
+        except Exception as exc:
+            if is_rate_limit_error(exc):
+                self._on_rate_limited()
+            raise
+        finally:
+            self._release()
+
+        usage = getattr(result, "usage_metadata", None)
+        actual_tokens = getattr(usage, "total_token_count", None) if usage is not None else None
+        self._on_success(estimated_tokens, actual_tokens if isinstance(actual_tokens, int) else None)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["calls_by_priority"] = dict(self._stats["calls_by_priority"])
+            stats["active"] = self._active
+            stats["waiting"] = len(self._waiting)
+            stats["current_rpm"] = round(self.current_rpm, 2)
+            stats["paused_for_s"] = round(max(0.0, self._paused_until - time.monotonic()), 2)
+        return stats
+
+
+_default_dispatcher: Optional[GeminiDispatcher] = None
+_default_lock = threading.Lock()
+
+
+def get_gemini_dispatcher() -> GeminiDispatcher:
+    global _default_dispatcher
+    if _default_dispatcher is None:
+        with _default_lock:
+            if _default_dispatcher is None:
+                _default_dispatcher = GeminiDispatcher()
+    return _default_dispatcher
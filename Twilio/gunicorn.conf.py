@@ -0,0 +1,40 @@
+import os
+import signal
+import sys
+import threading
+
+# The app drains for DRAIN_TIMEOUT seconds and then snapshots warm state, so
+# the master must wait a little longer than that before killing the worker.
+# Render allows 30 seconds between SIGTERM and SIGKILL by default.
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "0")) or int(float(os.getenv("DRAIN_TIMEOUT", "20"))) + 8
+
+
+def _app_hook(name):
+    return getattr(sys.modules.get("app"), name, None)
+
+
+def post_worker_init(worker):
+    # Warm state is restored here rather than at import, since restoring
+    # chat sessions can call Gemini to bind the context cache.
+    startup = _app_hook("startup")
+    if startup is not None:
+        startup()
+
+    stop_worker = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        # Gunicorn stops accepting connections; the drain runs alongside it so
+        # messages already admitted can finish while new ones are shed.
+        stop_worker(signum, frame)
+        shutdown = _app_hook("shutdown")
+        if shutdown is not None:
+            threading.Thread(target=shutdown, name="graceful-shutdown", daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def worker_exit(server, worker):
+    # Also covers exits that did not start with SIGTERM (e.g. max_requests).
+    shutdown = _app_hook("shutdown")
+    if shutdown is not None:
+        shutdown()
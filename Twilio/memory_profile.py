@@ -0,0 +1,240 @@
+import gc
+import logging
+import os
+import signal
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+# ----------------- Configuration -----------------
+
+MEMORY_TRACEMALLOC = os.getenv("MEMORY_TRACEMALLOC", "false").strip().lower() == "true"
+MEMORY_TRACEMALLOC_FRAMES = int(os.getenv("MEMORY_TRACEMALLOC_FRAMES", "10"))
+MEMORY_TOP_N = int(os.getenv("MEMORY_TOP_N", "15"))
+MEMORY_SNAPSHOT_INTERVAL = float(os.getenv("MEMORY_SNAPSHOT_INTERVAL", "0"))
+MEMORY_REPORT_SIGNAL = os.getenv("MEMORY_REPORT_SIGNAL", "SIGUSR2").strip()
+
+SessionsProvider = Callable[[], Mapping[str, Any]]
+
+_snapshot_lock = threading.Lock()
+_previous_snapshot: Optional[tracemalloc.Snapshot] = None
+_reporter_thread: Optional[threading.Thread] = None
+
+
+def start_tracemalloc() -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(MEMORY_TRACEMALLOC_FRAMES)
+        logging.info("tracemalloc started with %s frames", MEMORY_TRACEMALLOC_FRAMES)
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        # ru_maxrss is the peak, in KiB on Linux; better than nothing.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def child_processes() -> List[Dict[str, Any]]:
+    """Direct children of this worker, e.g. MCP server subprocesses."""
+    children: List[Dict[str, Any]] = []
+    pid = str(os.getpid())
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return children
+
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="utf-8", errors="replace") as stat_file:
+                stat = stat_file.read()
+            with open(f"/proc/{entry}/cmdline", "rb") as cmdline_file:
+                cmdline = cmdline_file.read().replace(b"\0", b" ").decode("utf-8", "replace").strip()
+        except OSError:
+            continue
+        # The command name is parenthesised and may contain spaces.
+        fields = stat[stat.rfind(")") + 2:].split()
+        if len(fields) < 22 or fields[1] != pid:
+            continue
+        children.append(
+            {
+                "pid": int(entry),
+                "state": fields[0],
+                "rss_bytes": int(fields[21]) * os.sysconf("SC_PAGE_SIZE"),
+                "cmdline": cmdline[:200],
+            }
+        )
+    return children
+
+
+def gc_stats() -> Dict[str, Any]:
+    return {
+        "counts": list(gc.get_count()),
+        "thresholds": list(gc.get_threshold()),
+        "generations": gc.get_stats(),
+        "uncollectable": len(gc.garbage),
+    }
+
+
+def _image_bytes(value: Any) -> int:
+    # PIL images still referenced from history count at their decoded size.
+    size = getattr(value, "size", None)
+    mode = getattr(value, "mode", None)
+    if isinstance(size, tuple) and len(size) == 2 and isinstance(mode, str):
+        bands = len(value.getbands()) if hasattr(value, "getbands") else 1
+        return size[0] * size[1] * bands
+    return 0
+
+
+def history_footprint(chat: Any) -> Dict[str, int]:
+    """Counts turns, text characters and image bytes held in a chat's history."""
+    footprint = {"turns": 0, "text_chars": 0, "images": 0, "image_bytes": 0}
+    get_history = getattr(chat, "get_history", None)
+    if get_history is None:
+        return footprint
+    try:
+        history = get_history(curated=False)
+    except Exception:
+        return footprint
+
+    for content in history:
+        footprint["turns"] += 1
+        for part in getattr(content, "parts", None) or []:
+            text = getattr(part, "text", None)
+            if text:
+                footprint["text_chars"] += len(text)
+            inline_data = getattr(part, "inline_data", None)
+            data = getattr(inline_data, "data", None) if inline_data is not None else None
+            if data:
+                footprint["images"] += 1
+                footprint["image_bytes"] += len(data)
+            pil_bytes = _image_bytes(part)
+            if pil_bytes:
+                footprint["images"] += 1
+                footprint["image_bytes"] += pil_bytes
+    return footprint
+
+
+def _mask_key(key: str) -> str:
+    # Enough to tell sessions apart without printing whole phone numbers.
+    return f"...{key[-4:]}" if len(key) > 4 else key
+
+
+def session_report(sessions: Mapping[str, Any], top_n: int = MEMORY_TOP_N) -> Dict[str, Any]:
+    per_session = [(key, history_footprint(chat)) for key, chat in list(sessions.items())]
+    totals = {"sessions": len(per_session), "turns": 0, "text_chars": 0, "images": 0, "image_bytes": 0}
+    for _, footprint in per_session:
+        for field, value in footprint.items():
+            totals[field] += value
+
+    largest = sorted(
+        per_session,
+        key=lambda item: (item[1]["image_bytes"] + item[1]["text_chars"], item[1]["turns"]),
+        reverse=True,
+    )[:top_n]
+    totals["largest"] = [{"session": _mask_key(key), **footprint} for key, footprint in largest]
+    return totals
+
+
+def tracemalloc_report(top_n: int = MEMORY_TOP_N) -> Dict[str, Any]:
+    """Top allocation sites, plus growth since the previous report."""
+    global _previous_snapshot
+    if not tracemalloc.is_tracing():
+        return {"tracing": False, "hint": "set MEMORY_TRACEMALLOC=true to enable"}
+
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        )
+    )
+    current, peak = tracemalloc.get_traced_memory()
+    report: Dict[str, Any] = {
+        "tracing": True,
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "top": [
+            {"site": str(stat.traceback[0]), "bytes": stat.size, "blocks": stat.count}
+            for stat in snapshot.statistics("lineno")[:top_n]
+        ],
+    }
+
+    with _snapshot_lock:
+        previous, _previous_snapshot = _previous_snapshot, snapshot
+    if previous is not None:
+        report["growth"] = [
+            {"site": str(stat.traceback[0]), "bytes_diff": stat.size_diff, "blocks_diff": stat.count_diff}
+            for stat in snapshot.compare_to(previous, "lineno")[:top_n]
+            if stat.size_diff
+        ]
+    return report
+
+
+def memory_report(sessions: Mapping[str, Any], top_n: int = MEMORY_TOP_N) -> Dict[str, Any]:
+    started_at = time.perf_counter()
+    report = {
+        "pid": os.getpid(),
+        "rss_bytes": rss_bytes(),
+        "sessions": session_report(sessions, top_n),
+        "children": child_processes(),
+        "gc": gc_stats(),
+        "threads": threading.active_count(),
+        "tracemalloc": tracemalloc_report(top_n),
+    }
+    report["report_ms"] = round((time.perf_counter() - started_at) * 1000.0, 1)
+    return report
+
+
+def log_memory_summary(sessions: Mapping[str, Any]) -> None:
+    report = memory_report(sessions, top_n=5)
+    session_totals = report["sessions"]
+    logging.info(
+        "Memory: rss=%.1fMiB sessions=%s turns=%s image_bytes=%s children=%s gc_counts=%s",
+        report["rss_bytes"] / (1024 * 1024),
+        session_totals["sessions"],
+        session_totals["turns"],
+        session_totals["image_bytes"],
+        len(report["children"]),
+        report["gc"]["counts"],
+    )
+    for entry in report["tracemalloc"].get("growth", [])[:5]:
+        logging.info("Memory growth: %+d bytes at %s", entry["bytes_diff"], entry["site"])
+
+
+def install_memory_reporting(get_sessions: SessionsProvider) -> None:
+    """Starts tracemalloc, the periodic logger and the report signal as configured."""
+    global _reporter_thread
+    if MEMORY_TRACEMALLOC:
+        start_tracemalloc()
+
+    if MEMORY_REPORT_SIGNAL:
+        signal_number = getattr(signal, MEMORY_REPORT_SIGNAL, None)
+        try:
+            if signal_number is None:
+                raise ValueError(f"unknown signal {MEMORY_REPORT_SIGNAL}")
+            # Python runs the handler in the main thread between bytecodes,
+            # so e.g. `kill -USR2 <worker pid>` logs a summary.
+            signal.signal(signal_number, lambda signum, frame: log_memory_summary(get_sessions()))
+        except ValueError as exc:
+            # Raised off the main thread or for unsupported signals.
+            logging.info("Memory report signal not installed: %s", exc)
+
+    if MEMORY_SNAPSHOT_INTERVAL > 0 and _reporter_thread is None:
+        def run() -> None:
+            while True:
+                time.sleep(MEMORY_SNAPSHOT_INTERVAL)
+                try:
+                    log_memory_summary(get_sessions())
+                except Exception as exc:
+                    logging.error("Memory snapshot failed: %s", exc)
+
+        _reporter_thread = threading.Thread(target=run, name="memory-snapshots", daemon=True)
+        _reporter_thread.start()
@@ -0,0 +1,56 @@
+import re
+from typing import AbstractSet, Iterator
+
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercases and collapses every run of non-alphanumerics to one space."""
+    return _NON_ALPHANUMERIC.sub(" ", text.lower()).strip()
+
+
+def iter_ngrams(
+    text: str,
+    max_words: int = 3,
+    stopwords: AbstractSet[str] = frozenset(),
+    min_token_length: int = 0,
+    min_length: int = 3,
+    normalized: bool = False,
+) -> Iterator[str]:
+    """Yields the 1..max_words-grams of ``text``, shortest first.
+
+    The text is normalized with a single regex pass and split once.
+    Stopwords and short tokens (digits are always kept) are dropped before
+    any n-gram is built, unigrams are the split tokens themselves, and
+    longer n-grams are only length-checked when ``min_length`` could
+    actually reject them. Callers that stop at the first match never build
+    the remaining n-grams.
+    """
+    buffer = text if normalized else normalize_text(text)
+    if not buffer:
+        return
+
+    tokens = buffer.split(" ")
+    if stopwords or min_token_length:
+        tokens = [
+            token
+            for token in tokens
+            if token not in stopwords and (len(token) >= min_token_length or token.isdigit())
+        ]
+
+    for token in tokens:
+        if len(token) >= min_length:
+            yield token
+
+    # An n-gram of non-empty tokens is at least 2n - 1 characters long.
+    for n in range(2, max_words + 1):
+        if n == 2:
+            ngrams: Iterator[str] = (f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+        elif n == 3:
+            ngrams = (f"{first} {second} {third}" for first, second, third in zip(tokens, tokens[1:], tokens[2:]))
+        else:
+            ngrams = (" ".join(tokens[start:start + n]) for start in range(len(tokens) - n + 1))
+
+        if min_length > 2 * n - 1:
+            ngrams = (ngram for ngram in ngrams if len(ngram) >= min_length)
+        yield from ngrams
@@ -0,0 +1,135 @@
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, NamedTuple
+
+# ----------------- Configuration -----------------
+
+GEMINI_ROUTING_ENABLED = os.getenv("GEMINI_ROUTING_ENABLED", "true").strip().lower() != "false"
+ROUTE_SMALL_TALK_MAX_CHARS = int(os.getenv("ROUTE_SMALL_TALK_MAX_CHARS", "40"))
+ROUTE_LOG_EVERY = int(os.getenv("ROUTE_LOG_EVERY", "50"))
+
+TIME_SENSITIVE_PATTERN = re.compile(
+    r"\b("
+    r"today|tonight|tomorrow|yesterday|now|right now|currently|current|latest|recent|recently|"
+    r"this (?:week|weekend|month|year|season)|next (?:week|game|match)|last (?:night|week)|"
+    r"news|headline|headlines|breaking|update|updates|live|"
+    r"weather|forecast|temperature|rain|snow|"
+    r"price|prices|stock|stocks|market|rate|rates|bitcoin|crypto|"
+    r"election|poll|polls|who won|who is winning|released?|release date|open|hours|"
+    r"traffic|flight|delayed|schedule|when is|what time|20\d\d"
+    r")\b",
+    re.IGNORECASE,
+)
+
+# Time-sensitive words an ESPN scoreboard already answers.
+SCOREBOARD_COVERED_TERMS = frozenset(
+    {"today", "tonight", "yesterday", "tomorrow", "now", "right now", "currently", "current", "latest",
+     "live", "update", "updates", "last night", "last week", "this week", "this weekend", "next week",
+     "schedule", "who won", "who is winning"}
+)
+
+SMALL_TALK_PATTERN = re.compile(
+    r"^\s*("
+    r"hi|hii+|hello|hey|heya|yo|sup|thanks|thank you|thx|ty|ok|okay|k|kk|cool|nice|great|"
+    r"awesome|lol|lmao|haha+|good (?:morning|night|evening|afternoon)|gm|gn|bye|goodbye|"
+    r"see ya|yes|yeah|yep|no|nope|sure|got it|how are you|what'?s up|who are you"
+    r")\b(?:[\s,!.]+[\w']+){0,2}[\s!.?,:)(-]*$",
+    re.IGNORECASE,
+)
+
+
+class Route(NamedTuple):
+    name: str
+    use_search: bool
+    light_model: bool
+
+
+ROUTE_GROUNDED = Route("grounded", use_search=True, light_model=False)
+ROUTE_GENERAL = Route("general", use_search=True, light_model=False)
+ROUTE_SCORES = Route("scores", use_search=False, light_model=False)
+ROUTE_VISION = Route("vision", use_search=False, light_model=False)
+ROUTE_LIGHT = Route("light", use_search=False, light_model=True)
+
+
+def classify_prompt(
+    text: str,
+    has_images: bool = False,
+    has_scores: bool = False,
+    exact_sports: bool = False,
+) -> Route:
+    """Picks the cheapest Gemini configuration likely to answer well.
+
+    Search is only dropped for a scoreboard when ``exact_sports`` says a
+    league or team name appeared verbatim and every time-sensitive word is
+    one the scoreboard covers. Sports detection is fuzzy and fires on plain
+    words like "today" or "lost", so a fuzzy hit never counts as sports
+    evidence on its own: "what happened today" stays grounded and "capital
+    of australia" stays general, whatever scoreboard was attached. Images
+    and short small talk skip search, and small talk may also use the light
+    model. Anything else keeps search available and lets the model decide.
+    """
+    if not GEMINI_ROUTING_ENABLED:
+        return ROUTE_GENERAL
+    time_terms = {match.lower() for match in TIME_SENSITIVE_PATTERN.findall(text)}
+    if has_scores and exact_sports and time_terms <= SCOREBOARD_COVERED_TERMS:
+        return ROUTE_SCORES
+    if time_terms:
+        return ROUTE_GROUNDED
+    if has_images:
+        return ROUTE_VISION
+    if len(text) <= ROUTE_SMALL_TALK_MAX_CHARS and SMALL_TALK_PATTERN.match(text):
+        return ROUTE_LIGHT
+    return ROUTE_GENERAL
+
+
+class RouteStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, float]] = {}
+        self._total = 0
+
+    def record(self, route: Route, elapsed_ms: float, response: Any = None) -> None:
+        usage = getattr(response, "usage_metadata", None)
+        tokens = getattr(usage, "total_token_count", None) or 0
+        with self._lock:
+            entry = self._routes.setdefault(
+                route.name,
+                {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "tokens": 0, "search_skipped": 0},
+            )
+            entry["calls"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["tokens"] += tokens
+            if not route.use_search:
+                entry["search_skipped"] += 1
+            self._total += 1
+            should_log = ROUTE_LOG_EVERY > 0 and self._total % ROUTE_LOG_EVERY == 0
+
+        logging.info("Gemini route %s took %.0fms (%s tokens)", route.name, elapsed_ms, tokens)
+        if should_log:
+            logging.info("Gemini route stats: %s", self.stats())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {name: dict(entry) for name, entry in self._routes.items()}
+        for entry in routes.values():
+            calls = entry["calls"]
+            entry["mean_ms"] = round(entry["total_ms"] / calls, 1) if calls else 0.0
+            entry["mean_tokens"] = round(entry["tokens"] / calls, 1) if calls else 0.0
+            entry["total_ms"] = round(entry["total_ms"], 1)
+            entry["max_ms"] = round(entry["max_ms"], 1)
+
+        # Savings relative to the search-grounded routes' mean latency.
+        grounded = [entry for name, entry in routes.items() if name in (ROUTE_GROUNDED.name, ROUTE_GENERAL.name)]
+        grounded_calls = sum(entry["calls"] for entry in grounded)
+        if grounded_calls:
+            baseline_ms = sum(entry["total_ms"] for entry in grounded) / grounded_calls
+            for entry in routes.values():
+                if entry["search_skipped"]:
+                    entry["est_saved_ms"] = round(max(0.0, baseline_ms - entry["mean_ms"]) * entry["calls"], 1)
+        return {"enabled": GEMINI_ROUTING_ENABLED, "routes": routes}
+
+
+route_stats = RouteStats()
@@ -0,0 +1,249 @@
+"""Replay a recorded /sms request journal against the app with stubbed upstreams.
+
+Usage:
+    python replay_journal.py journal.jsonl --speed 4 --output build-a.json
+    python replay_journal.py journal.jsonl --compare build-a.json
+
+Gemini, ESPN and Twilio media calls are replaced by stubs that sleep for the
+stage timings recorded in the journal, so the latency distribution reflects
+this build's own overhead and queueing on top of the original upstream mix.
+Whichever entry point runs it, replay() drops outbound digest texts, never
+starts the digest scheduler, gives the app its own admission controller and
+Gemini dispatcher, and disables the request journal, subscriptions file and
+warm-state snapshot.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SCRIPT_PATH = Path(__file__).resolve().with_name("sms_gemini.py")
+
+_replay = threading.local()
+
+
+class _StubResponse:
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.usage_metadata = None
+
+
+class _StubChat:
+    def __init__(self, history: Any = None, tenant: Any = None, route: Any = None) -> None:
+        self.history = list(history or [])
+
+    def get_history(self, curated: bool = False) -> Any:
+        return self.history
+
+    def send_message(self, message: Any) -> _StubResponse:
+        _sleep_for_stage("gemini")
+        return _StubResponse("Replay stub reply.")
+
+
+def _sleep_for_stage(stage: str, share: float = 1.0) -> None:
+    record = getattr(_replay, "record", None)
+    scale = getattr(_replay, "upstream_scale", 1.0)
+    if record is None or scale <= 0:
+        return
+    elapsed_ms = record.get("stages_ms", {}).get(stage, 0.0)
+    time.sleep(max(0.0, elapsed_ms * share * scale / 1000.0))
+
+
+def _load_app_module() -> Any:
+    sys.path.insert(0, str(SCRIPT_PATH.parent))
+
+    spec = importlib.util.spec_from_file_location("sms_to_gemini_replay", SCRIPT_PATH)
+    if spec is None or spec.loader is None:
+        raise RuntimeError(f"Unable to load app module from {SCRIPT_PATH}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _isolate_environment() -> None:
+    # The app must not journal the replayed traffic back into a file, nor
+    # load or overwrite the host's subscriptions and warm-state snapshot.
+    os.environ.setdefault("API_KEY", "replay")
+    os.environ["REQUEST_JOURNAL_PATH"] = ""
+    os.environ["SUBSCRIPTIONS_PATH"] = ""
+    os.environ["WARM_STATE_PATH"] = ""
+    # Already imported by the caller, so the environment alone is too late.
+    journal_module = sys.modules.get("request_journal")
+    if journal_module is not None:
+        journal_module.REQUEST_JOURNAL_PATH = ""
+
+
+def _install_stubs(module: Any) -> None:
+    from google.genai.types import Part
+
+    from admission import AdmissionController
+    from gemini_dispatch import GeminiDispatcher
+    from subscriptions import SubscriptionManager
+
+    def fetch_image(media_url: str, tenant: Any = None) -> Any:
+        record = getattr(_replay, "record", None) or {}
+        media_count = max(1, len(record.get("media", [])))
+        _sleep_for_stage("media", share=1.0 / media_count)
+        return Part.from_bytes(data=b"\xff\xd8\xff\xd9", mime_type="image/jpeg")
+
+    def get_scores(leagues: Any, query: str = "", dates: str = "") -> str:
+        _sleep_for_stage("sports")
+        return "\n\n".join(f"{league.upper()}:\n- Replay 0 - Stub 0 (Final)" for league in leagues)
+
+    def send_sms(tenant_name: str, from_number: str, to_number: str, body: str) -> None:
+        # Replayed /subscribe lines must never text anyone for real.
+        return None
+
+    module.create_chat = _StubChat
+    module.fetch_twilio_image = fetch_image
+    module.get_live_sports_scores = get_scores
+    module.send_sms = send_sms
+
+    # A manager built at import may already have loaded subscribers and
+    # started polling; silence and stop it before swapping in an empty one
+    # whose scheduler never starts, so nothing polls ESPN either.
+    module.subscription_manager.send = send_sms
+    module.subscription_manager.stop(timeout=1.0)
+    subscription_manager = SubscriptionManager(module._team_leagues(), send_sms, path="")
+    subscription_manager._ensure_started = lambda: None
+    module.subscription_manager = subscription_manager
+
+    # Fresh limiters, so a replay neither shares nor drains the process-wide ones.
+    admission = AdmissionController()
+    dispatcher = GeminiDispatcher()
+    module.get_admission_controller = lambda: admission
+    module.get_gemini_dispatcher = lambda: dispatcher
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(latencies_ms: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(latencies_ms),
+        "p50_ms": round(_percentile(latencies_ms, 0.50), 2),
+        "p90_ms": round(_percentile(latencies_ms, 0.90), 2),
+        "p99_ms": round(_percentile(latencies_ms, 0.99), 2),
+        "max_ms": round(max(latencies_ms, default=0.0), 2),
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else 0.0,
+    }
+
+
+def replay(
+    records: List[Dict[str, Any]],
+    speed: float = 1.0,
+    rate: Optional[float] = None,
+    concurrency: int = 4,
+    upstream_scale: float = 1.0,
+) -> Dict[str, Any]:
+    _isolate_environment()
+    module = _load_app_module()
+    _install_stubs(module)
+    flask_app = module.app
+
+    latencies_ms: List[float] = []
+    status_counts: Dict[str, int] = {}
+    results_lock = threading.Lock()
+
+    def send(record: Dict[str, Any]) -> None:
+        _replay.record = record
+        _replay.upstream_scale = upstream_scale
+        started_at = time.perf_counter()
+        with flask_app.test_client() as test_client:
+            response = test_client.post("/sms", data=record.get("form", {}))
+        elapsed_ms = (time.perf_counter() - started_at) * 1000.0
+        _replay.record = None
+        with results_lock:
+            latencies_ms.append(elapsed_ms)
+            status_counts[str(response.status_code)] = status_counts.get(str(response.status_code), 0) + 1
+
+    first_ts = records[0].get("ts", 0.0) if records else 0.0
+    replay_started_at = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        for index, record in enumerate(records):
+            if rate:
+                offset = index / rate
+            else:
+                offset = (record.get("ts", first_ts) - first_ts) / max(speed, 1e-6)
+            delay = replay_started_at + offset - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, record)
+
+    return {
+        "requests": len(records),
+        "wall_s": round(time.monotonic() - replay_started_at, 3),
+        "status_counts": status_counts,
+        "latency": summarize(latencies_ms),
+        "stats": module.stats()[0],
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> str:
+    lines = ["metric      baseline     current      delta"]
+    for key in ("p50_ms", "p90_ms", "p99_ms", "max_ms", "mean_ms"):
+        before = baseline["latency"].get(key, 0.0)
+        after = current["latency"].get(key, 0.0)
+        change = f"{(after - before) / before * 100.0:+.1f}%" if before else "n/a"
+        lines.append(f"{key:<10}{before:>10.1f}{after:>12.1f}{change:>11}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("journal", help="Path to a request journal (.jsonl)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier over recorded timing")
+    parser.add_argument("--rate", type=float, default=None, help="Fixed requests/second instead of recorded timing")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent requests (gunicorn threads)")
+    parser.add_argument(
+        "--upstream-scale",
+        type=float,
+        default=1.0,
+        help="Multiplier on recorded upstream latencies; 0 measures app overhead only",
+    )
+    parser.add_argument("--limit", type=int, default=0, help="Replay only the first N records")
+    parser.add_argument("--output", help="Write the summary JSON here")
+    parser.add_argument("--compare", help="Baseline summary JSON to compare against")
+    args = parser.parse_args()
+
+    _isolate_environment()
+
+    from request_journal import read_journal
+
+    records = read_journal(args.journal)
+    if args.limit > 0:
+        records = records[:args.limit]
+    if not records:
+        raise SystemExit(f"No records found in {args.journal}")
+
+    result = replay(
+        records,
+        speed=args.speed,
+        rate=args.rate,
+        concurrency=args.concurrency,
+        upstream_scale=args.upstream_scale,
+    )
+    print(json.dumps(result["latency"], indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(result, output_file, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            print(compare(result, json.load(baseline_file)))
+
+
+if __name__ == "__main__":
+    main()
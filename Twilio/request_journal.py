@@ -0,0 +1,144 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+# ----------------- Configuration -----------------
+
+REQUEST_JOURNAL_PATH = os.getenv("REQUEST_JOURNAL_PATH", "").strip()
+REQUEST_JOURNAL_MAX_BYTES = int(os.getenv("REQUEST_JOURNAL_MAX_BYTES", str(20 * 1024 * 1024)))
+REQUEST_JOURNAL_BACKUPS = int(os.getenv("REQUEST_JOURNAL_BACKUPS", "5"))
+REQUEST_JOURNAL_HASH_NUMBERS = (
+    os.getenv("REQUEST_JOURNAL_HASH_NUMBERS", "true").strip().lower() != "false"
+)
+
+_PHONE_FIELDS = ("From", "To")
+
+_current = threading.local()
+_write_lock = threading.Lock()
+
+
+def journal_enabled() -> bool:
+    return bool(REQUEST_JOURNAL_PATH)
+
+
+def _hash_value(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+def _form_snapshot(form: Mapping[str, str]) -> Dict[str, str]:
+    snapshot = {key: form.get(key, "") for key in form.keys()}
+    if REQUEST_JOURNAL_HASH_NUMBERS:
+        for field in _PHONE_FIELDS:
+            if snapshot.get(field):
+                snapshot[field] = "h:" + _hash_value(snapshot[field])
+    return snapshot
+
+
+def _active_record() -> Optional[Dict[str, Any]]:
+    return getattr(_current, "record", None)
+
+
+@contextmanager
+def journal_request(form: Mapping[str, str]) -> Iterator[Optional[Dict[str, Any]]]:
+    """Collects one webhook's journal record and appends it on exit.
+
+    Stages and annotations recorded by the helpers below while the block
+    runs on this thread land in the record; with no journal path set this
+    yields None and costs nothing beyond the check.
+    """
+    if not journal_enabled():
+        yield None
+        return
+
+    record: Dict[str, Any] = {
+        "ts": round(time.time(), 3),
+        "form": _form_snapshot(form),
+        "media": [],
+        "stages_ms": {},
+    }
+    _current.record = record
+    started_at = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["stages_ms"]["total"] = round((time.perf_counter() - started_at) * 1000.0, 2)
+        _current.record = None
+        _append(record)
+
+
+@contextmanager
+def journal_stage(name: str) -> Iterator[None]:
+    record = _active_record()
+    if record is None:
+        yield
+        return
+
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - started_at) * 1000.0
+        stages = record["stages_ms"]
+        stages[name] = round(stages.get(name, 0.0) + elapsed_ms, 2)
+
+
+def journal_annotate(key: str, value: Any) -> None:
+    record = _active_record()
+    if record is not None:
+        record[key] = value
+
+
+def journal_media(content: bytes, content_type: str = "") -> None:
+    record = _active_record()
+    if record is not None:
+        record["media"].append({
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "bytes": len(content),
+            "type": content_type,
+        })
+
+
+def _rotate() -> None:
+    for index in range(REQUEST_JOURNAL_BACKUPS - 1, 0, -1):
+        source = f"{REQUEST_JOURNAL_PATH}.{index}"
+        if os.path.exists(source):
+            os.replace(source, f"{REQUEST_JOURNAL_PATH}.{index + 1}")
+    if REQUEST_JOURNAL_BACKUPS > 0:
+        os.replace(REQUEST_JOURNAL_PATH, f"{REQUEST_JOURNAL_PATH}.1")
+    else:
+        os.remove(REQUEST_JOURNAL_PATH)
+
+
+def _append(record: Dict[str, Any]) -> None:
+    line = json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+    try:
+        with _write_lock:
+            if (
+                REQUEST_JOURNAL_MAX_BYTES > 0
+                and os.path.exists(REQUEST_JOURNAL_PATH)
+                and os.path.getsize(REQUEST_JOURNAL_PATH) + len(line) > REQUEST_JOURNAL_MAX_BYTES
+            ):
+                _rotate()
+            with open(REQUEST_JOURNAL_PATH, "a", encoding="utf-8") as journal_file:
+                journal_file.write(line)
+    except OSError as exc:
+        logging.error("Failed to append to request journal %s: %s", REQUEST_JOURNAL_PATH, exc)
+
+
+def read_journal(path: str) -> List[Dict[str, Any]]:
+    records: List[Dict[str, Any]] = []
+    with open(path, encoding="utf-8") as journal_file:
+        for line_number, line in enumerate(journal_file, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logging.warning("Skipping malformed journal line %s in %s", line_number, path)
+    return records
@@ -0,0 +1,198 @@
+import os
+import re
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional
+
+# ----------------- Configuration -----------------
+
+# Twilio rejects bodies over 1600 characters and recommends at most 10
+# segments, so the default only trims replies that would not arrive anyway.
+SMS_MAX_SEGMENTS = int(os.getenv("SMS_MAX_SEGMENTS", "10"))
+SMS_STRIP_EMOJI = os.getenv("SMS_STRIP_EMOJI", "true").strip().lower() != "false"
+
+GSM7_BASIC = frozenset(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞ\x1bÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# Extension-table characters take an escape plus the character (2 septets).
+GSM7_EXTENDED = frozenset("^{}\\[~]|€\f")
+
+GSM7_SINGLE_SEGMENT = 160
+GSM7_MULTI_SEGMENT = 153
+UCS2_SINGLE_SEGMENT = 70
+UCS2_MULTI_SEGMENT = 67
+
+ELLIPSIS = "..."
+
+_EXPLICIT_TRANSLITERATIONS: Dict[str, str] = {
+    "‘": "'", "’": "'", "‚": "'", "‛": "'", "′": "'",
+    "“": '"', "”": '"', "„": '"', "‟": '"', "″": '"',
+    "«": '"', "»": '"',
+    "‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-", "―": "-",
+    "−": "-", "•": "-", "·": "-", "●": "-",
+    "…": "...",
+    "\u00a0": " ", "\u2002": " ", "\u2003": " ", "\u2009": " ", "\u202f": " ", "\u3000": " ",
+    "\u200b": "", "\u200c": "", "\u200d": "", "\ufe0f": "", "\ufe0e": "", "\u00ad": "",
+    "×": "x", "÷": "/", "©": "(c)", "®": "(R)", "™": "TM",
+    "°": "deg ", "½": "1/2", "¼": "1/4", "¾": "3/4",
+    "←": "<-", "→": "->", "≤": "<=", "≥": ">=", "≠": "!=",
+    "ç": "c", "\t": " ",
+    # Markdown emphasis from the model reads as noise in a text message.
+    "*": "-",
+}
+
+_EMOJI_RANGES = (
+    (0x1F000, 0x1FAFF),
+    (0x2600, 0x27BF),
+    (0x2B00, 0x2BFF),
+    (0x1F1E6, 0x1F1FF),
+)
+
+
+def _build_translation_table() -> Dict[int, Optional[str]]:
+    table: Dict[int, Optional[str]] = {ord(char): value for char, value in _EXPLICIT_TRANSLITERATIONS.items()}
+
+    # Accented Latin letters outside GSM-7 fall back to their base letter
+    # ("á" -> "a"), but only when the result is entirely GSM-7.
+    for code_point in range(0x00C0, 0x0250):
+        char = chr(code_point)
+        if code_point in table or char in GSM7_BASIC:
+            continue
+        decomposed = "".join(
+            part for part in unicodedata.normalize("NFKD", char) if not unicodedata.combining(part)
+        )
+        if decomposed and all(part in GSM7_BASIC for part in decomposed):
+            table[code_point] = decomposed
+
+    if SMS_STRIP_EMOJI:
+        for start, end in _EMOJI_RANGES:
+            for code_point in range(start, end + 1):
+                table.setdefault(code_point, None)
+    return table
+
+
+_TRANSLATION_TABLE = _build_translation_table()
+
+
+class EncodedSms(NamedTuple):
+    text: str
+    encoding: str
+    segments: int
+    truncated: bool
+
+
+_GSM7_ALL = GSM7_BASIC | GSM7_EXTENDED
+_ASTRAL = re.compile("[\U00010000-\U0010FFFF]")
+
+
+def is_gsm7(text: str) -> bool:
+    return _GSM7_ALL.issuperset(text)
+
+
+def _char_units(char: str, gsm: bool) -> int:
+    if gsm:
+        return 2 if char in GSM7_EXTENDED else 1
+    # UCS-2/UTF-16: characters beyond the BMP are a surrogate pair.
+    return 2 if ord(char) > 0xFFFF else 1
+
+
+def _wide_char_count(text: str, gsm: bool) -> int:
+    if gsm:
+        return sum(text.count(char) for char in GSM7_EXTENDED)
+    return len(_ASTRAL.findall(text))
+
+
+def split_segments(text: str, gsm: Optional[bool] = None) -> List[str]:
+    """Splits text the way carriers do, never breaking a 2-unit character."""
+    if gsm is None:
+        gsm = is_gsm7(text)
+    single_limit = GSM7_SINGLE_SEGMENT if gsm else UCS2_SINGLE_SEGMENT
+    multi_limit = GSM7_MULTI_SEGMENT if gsm else UCS2_MULTI_SEGMENT
+
+    wide_chars = _wide_char_count(text, gsm)
+    if len(text) + wide_chars <= single_limit:
+        return [text] if text else []
+    if not wide_chars:
+        return [text[start:start + multi_limit] for start in range(0, len(text), multi_limit)]
+
+    segments: List[str] = []
+    current: List[str] = []
+    current_units = 0
+    for char in text:
+        units = _char_units(char, gsm)
+        if current_units + units > multi_limit:
+            segments.append("".join(current))
+            current, current_units = [], 0
+        current.append(char)
+        current_units += units
+    if current:
+        segments.append("".join(current))
+    return segments
+
+
+def count_segments(text: str) -> int:
+    return len(split_segments(text))
+
+
+def _truncate_to_budget(text: str, gsm: bool, max_segments: int) -> str:
+    if max_segments == 1:
+        # A lone segment carries no concatenation header.
+        segment_limit = GSM7_SINGLE_SEGMENT if gsm else UCS2_SINGLE_SEGMENT
+    else:
+        segment_limit = GSM7_MULTI_SEGMENT if gsm else UCS2_MULTI_SEGMENT
+    budget = segment_limit * max_segments - len(ELLIPSIS)
+
+    if not _wide_char_count(text, gsm):
+        cut = budget
+    else:
+        used = 0
+        cut = 0
+        for index, char in enumerate(text):
+            used += _char_units(char, gsm)
+            if used > budget:
+                break
+            cut = index + 1
+
+    head = text[:cut]
+    word_break = head.rfind(" ")
+    if word_break > cut // 2:
+        head = head[:word_break]
+    head = head.rstrip(" ,;:-\n") + ELLIPSIS
+
+    # Segment packing can waste a unit at boundaries; trim until it fits.
+    while len(split_segments(head, gsm)) > max_segments and len(head) > len(ELLIPSIS):
+        head = head[:-len(ELLIPSIS) - 1].rstrip() + ELLIPSIS
+    return head
+
+
+def encode_sms(text: str, max_segments: int = SMS_MAX_SEGMENTS, preserve_newlines: bool = False) -> EncodedSms:
+    """Prepares model output for delivery as an SMS.
+
+    Characters with a safe GSM-7 equivalent are transliterated through a
+    precomputed table, whitespace is collapsed, and the result is cut at a
+    word boundary if it would exceed ``max_segments``. With
+    ``preserve_newlines`` only runs within a line are collapsed and
+    non-blank lines stay on their own line, for list-shaped texts such as
+    score digests. Text that still needs UCS-2 afterwards (non-Latin
+    scripts, kept emoji) is left in UCS-2 and budgeted with the smaller
+    UCS-2 segment size.
+    """
+    translated = text.translate(_TRANSLATION_TABLE)
+    if preserve_newlines:
+        lines = (" ".join(line.split()) for line in translated.splitlines())
+        cleaned = "\n".join(line for line in lines if line)
+    else:
+        cleaned = " ".join(translated.split())
+    gsm = is_gsm7(cleaned)
+
+    truncated = False
+    if max_segments > 0 and len(split_segments(cleaned, gsm)) > max_segments:
+        cleaned = _truncate_to_budget(cleaned, gsm, max_segments)
+        truncated = True
+
+    return EncodedSms(
+        text=cleaned,
+        encoding="GSM-7" if gsm else "UCS-2",
+        segments=len(split_segments(cleaned, gsm)),
+        truncated=truncated,
+    )
@@ -1,39 +1,57 @@
-import asyncio
 import difflib
-import io
+import hmac
+import itertools
 import logging
 import os
-import re
-import sys
+import threading
 import time
-from pathlib import Path
+import weakref
 from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-import requests
 from flask import Flask, Response, request
-from PIL import Image
 from twilio.twiml.messaging_response import MessagingResponse
 
-from google import genai
-from google.genai.types import GenerateContentConfig, GoogleSearch, Tool
+from google.genai.types import Content, GenerateContentConfig, Part
 
-MCP_AVAILABLE = False
-ClientSession: Any = None
-StdioServerParameters: Any = None
-stdio_client: Any = None
-
-try:
-    from mcp import ClientSession
-    from mcp.client.stdio import stdio_client
-
-    try:
-        from mcp import StdioServerParameters
-    except Exception:
-        from mcp.client.stdio import StdioServerParameters
-
-    MCP_AVAILABLE = True
-except Exception:  # pragma: no cover - runtime fallback if mcp isn't installed
-    MCP_AVAILABLE = False
+from admission import ADMISSION_BUSY_MESSAGE, get_admission_controller
+from chat_images import compact_image_part, get_image_stats, release_history_images
+from context_cache import (
+    GEMINI_CONTEXT_CACHE,
+    ContextCache,
+    get_context_cache,
+    get_context_cache_stats,
+    is_cache_missing_error,
+)
+from espn_scores import (
+    LEAGUE_TEAM_NAMES,
+    describe_date_range,
+    espn_hedger,
+    export_scoreboards,
+    get_espn_fetch_stats,
+    resolve_date_range,
+    restore_scoreboards,
+    scoreboard_today,
+)
+from gemini_dispatch import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_NORMAL,
+    GeminiBudgetExceeded,
+    get_gemini_dispatcher,
+    is_rate_limit_error,
+)
+from hedging import Hedger
+from http_client import export_redirect_cache, get_http_stats, http_get, http_post, restore_redirect_cache
+from memory_profile import MEMORY_TOP_N, install_memory_reporting, memory_report
+from ngrams import iter_ngrams, normalize_text
+from prompt_router import ROUTE_GENERAL, Route, classify_prompt, route_stats
+from request_journal import journal_annotate, journal_media, journal_request, journal_stage
+from scores_archive import get_scores_archive_stats
+from sms_encoding import encode_sms
+from sports_provider import get_sports_provider
+from subscriptions import SubscriptionManager
+from tenants import Tenant, get_genai_client, load_tenant_registry
+from warm_state import get_warm_state_stats, load_warm_state, register_warm_state, save_warm_state
 
 logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 
@@ -42,14 +60,24 @@ logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "5"))
 INITIAL_RETRY_DELAY = float(os.getenv("INITIAL_RETRY_DELAY", "1"))
 MODEL_ID = os.getenv("GEMINI_MODEL_ID", "gemini-3.flash-preview")
+GEMINI_LIGHT_MODEL_ID = os.getenv("GEMINI_LIGHT_MODEL_ID", "")
 
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
-SPORTS_MCP_SERVER_PATH = os.getenv(
-    "SPORTS_MCP_SERVER_PATH",
-    str(Path(__file__).resolve().with_name("sports_mcp_server.py")),
-)
-SPORTS_MCP_PYTHON = os.getenv("SPORTS_MCP_PYTHON", sys.executable)
+TWILIO_MEDIA_TIMEOUT = float(os.getenv("TWILIO_MEDIA_TIMEOUT", "20"))
+TWILIO_SEND_TIMEOUT = float(os.getenv("TWILIO_SEND_TIMEOUT", "10"))
+TWILIO_MESSAGES_URL = "https://api.twilio.com/2010-04-01/Accounts/{account_sid}/Messages.json"
+SHORT_PROMPT_CHARS = int(os.getenv("SHORT_PROMPT_CHARS", "160"))
+IMAGE_TOKEN_ESTIMATE = int(os.getenv("IMAGE_TOKEN_ESTIMATE", "258"))
+GEMINI_HEDGING = os.getenv("GEMINI_HEDGING", "false").strip().lower() == "true"
+GEMINI_HEDGE_INITIAL_DELAY = float(os.getenv("GEMINI_HEDGE_INITIAL_DELAY", "10"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").strip().lower() != "false"
+GEMINI_CACHE_GLOSSARY = os.getenv("GEMINI_CACHE_GLOSSARY", "true").strip().lower() != "false"
+# How long shutdown waits for in-flight messages; keep it below gunicorn's
+# graceful timeout so the warm state snapshot still fits.
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "20"))
+WARM_STATE_MAX_SESSIONS = int(os.getenv("WARM_STATE_MAX_SESSIONS", "1000"))
 
 LEAGUE_KEYWORDS: Dict[str, List[str]] = {
     "mlb": ["mlb", "baseball"],
@@ -58,39 +86,6 @@ LEAGUE_KEYWORDS: Dict[str, List[str]] = {
     "nfl": ["nfl", "football"],
 }
 
-LEAGUE_TEAM_NAMES: Dict[str, List[str]] = {
-    "mlb": [
-        "diamondbacks", "braves", "orioles", "red sox", "cubs", "white sox",
-        "reds", "guardians", "rockies", "tigers", "astros", "royals", "angels",
-        "dodgers", "marlins", "brewers", "twins", "mets", "yankees", "athletics",
-        "phillies", "pirates", "padres", "giants", "mariners", "cardinals",
-        "rays", "rangers", "blue jays", "nationals",
-    ],
-    "nhl": [
-        "ducks", "utah hockey club", "bruins", "sabres", "flames", "hurricanes",
-        "blackhawks", "avalanche", "blue jackets", "stars", "red wings", "oilers",
-        "panthers", "kings", "wild", "canadiens", "predators", "devils",
-        "islanders", "rangers", "senators", "flyers", "penguins", "kraken",
-        "sharks", "blues", "lightning", "maple leafs", "canucks", "golden knights",
-        "capitals", "jets",
-    ],
-    "nba": [
-        "hawks", "celtics", "nets", "hornets", "bulls", "cavaliers", "mavericks",
-        "nuggets", "pistons", "warriors", "rockets", "pacers", "clippers",
-        "lakers", "grizzlies", "heat", "bucks", "timberwolves", "pelicans",
-        "knicks", "thunder", "magic", "sixers", "76ers", "suns", "trail blazers",
-        "blazers", "kings", "spurs", "raptors", "jazz", "wizards",
-    ],
-    "nfl": [
-        "cardinals", "falcons", "ravens", "bills", "panthers", "bears", "bengals",
-        "browns", "cowboys", "broncos", "lions", "packers", "texans", "colts",
-        "jaguars", "chiefs", "raiders", "chargers", "rams", "dolphins",
-        "vikings", "patriots", "saints", "giants", "jets", "eagles", "steelers",
-        "49ers", "niners", "seahawks", "buccaneers", "bucs", "titans",
-        "commanders",
-    ],
-}
-
 GENERIC_SPORTS_KEYWORDS = [
     "sports scores",
     "sports score",
@@ -113,14 +108,21 @@ GENERIC_SPORTS_KEYWORDS = [
     "lost",
 ]
 
+SPORTS_PREFILTER_ENABLED = os.getenv("SPORTS_PREFILTER_ENABLED", "true").strip().lower() != "false"
+SPORTS_PREFILTER_MIN_SIMILARITY = float(os.getenv("SPORTS_PREFILTER_MIN_SIMILARITY", "0.45"))
+SPORTS_PREFILTER_LOG_EVERY = int(os.getenv("SPORTS_PREFILTER_LOG_EVERY", "100"))
+
 api_key = os.getenv("API_KEY")
 if not api_key:
     raise RuntimeError("Missing required environment variable: API_KEY")
 
-client = genai.Client(api_key=api_key)
-google_search_tool = Tool(google_search=GoogleSearch())
+client = get_genai_client(api_key)
+
+gemini_hedger = Hedger("gemini", initial_delay=GEMINI_HEDGE_INITIAL_DELAY)
 
 chat_sessions: Dict[str, Any] = {}
+# (model, search enabled, context cache name) each live chat was created with.
+_chat_bindings: "weakref.WeakKeyDictionary[Any, Tuple[str, bool, Optional[str]]]" = weakref.WeakKeyDictionary()
 app = Flask(__name__)
 
 SYSTEM_INSTRUCTION = (
@@ -133,51 +135,168 @@ SYSTEM_INSTRUCTION = (
     "Be conversational and friendly while maintaining accuracy and helpfulness."
 )
 
+# Module-level settings form the "default" tenant; TENANTS_FILE can add more,
+# routed by the inbound Twilio number (the webhook's `To` field).
+default_tenant = Tenant(
+    name="default",
+    numbers=[],
+    model_id=MODEL_ID,
+    system_instruction=SYSTEM_INSTRUCTION,
+    tool_names=["google_search"],
+    api_key=api_key,
+    twilio_account_sid=TWILIO_ACCOUNT_SID,
+    twilio_auth_token=TWILIO_AUTH_TOKEN,
+    client=client,
+    light_model_id=GEMINI_LIGHT_MODEL_ID,
+)
+tenant_registry = load_tenant_registry(default_tenant, light_model_id=GEMINI_LIGHT_MODEL_ID)
+
+# Only added to the prompt prefix when context caching is on, where it costs
+# nothing per cached turn and helps the prefix reach the model's minimum
+# cacheable size.
+TEAM_GLOSSARY = "Team names by league, for recognizing sports questions:\n" + "\n".join(
+    f"{league.upper()}: {', '.join(teams)}" for league, teams in LEAGUE_TEAM_NAMES.items()
+)
 
-# ----------------- Helpers -----------------
 
-def create_chat():
-    return client.chats.create(
-        model=MODEL_ID,
-        config=GenerateContentConfig(
-            system_instruction=SYSTEM_INSTRUCTION,
-            temperature=0.2,
-            tools=[google_search_tool],
-        ),
+def send_sms(tenant_name: str, from_number: str, to_number: str, body: str) -> None:
+    tenant = tenant_registry.tenants.get(tenant_name, default_tenant)
+    if not tenant.twilio_account_sid or not tenant.twilio_auth_token:
+        raise RuntimeError(f"Twilio credentials are not set for tenant {tenant.name}")
+
+    response = http_post(
+        TWILIO_MESSAGES_URL.format(account_sid=tenant.twilio_account_sid),
+        timeout=TWILIO_SEND_TIMEOUT,
+        # Digests carry one game per line, so keep the line breaks.
+        data={"From": from_number, "To": to_number, "Body": normalize_response(body, preserve_newlines=True)},
+        auth=(tenant.twilio_account_sid, tenant.twilio_auth_token),
     )
+    response.raise_for_status()
+
+
+def _team_leagues() -> Dict[str, List[str]]:
+    team_leagues: Dict[str, List[str]] = {}
+    for league, teams in LEAGUE_TEAM_NAMES.items():
+        for team in teams:
+            team_leagues.setdefault(team, []).append(league)
+    return team_leagues
 
 
-def get_or_create_chat(sender: str):
-    if sender not in chat_sessions:
-        chat_sessions[sender] = create_chat()
-        logging.info("Created new chat session for %s", sender)
-    return chat_sessions[sender]
+subscription_manager = SubscriptionManager(_team_leagues(), send_sms)
+install_memory_reporting(lambda: chat_sessions)
 
 
-def normalize_response(text: str) -> str:
-    cleaned = text.replace("*", "-").strip()
-    return " ".join(cleaned.split())
+# ----------------- Helpers -----------------
+
+def _system_prefix(tenant: Tenant) -> str:
+    # Cached and inline turns share one prefix, so falling back to inline
+    # config never changes what the model is told.
+    if GEMINI_CONTEXT_CACHE and GEMINI_CACHE_GLOSSARY:
+        return f"{tenant.system_instruction}\n\n{TEAM_GLOSSARY}"
+    return tenant.system_instruction
+
+
+def _context_cache_for(tenant: Tenant) -> Optional[ContextCache]:
+    return get_context_cache(tenant.name, tenant.client, tenant.model_id, _system_prefix(tenant), tenant.tools)
+
+
+def _chat_binding(tenant: Tenant, route: Route) -> Tuple[str, bool, Optional[str]]:
+    model_id = tenant.light_model_id if route.light_model else tenant.model_id
+    use_search = route.use_search and bool(tenant.tools)
+    cache_name = None
+    # The context cache holds the full tool config for the primary model,
+    # so only turns that keep search on that model can use it.
+    if use_search and model_id == tenant.model_id:
+        context_cache = _context_cache_for(tenant)
+        cache_name = context_cache.cached_content() if context_cache is not None else None
+    return model_id, use_search, cache_name
+
+
+def create_chat(
+    history: Optional[List[Any]] = None,
+    tenant: Optional[Tenant] = None,
+    route: Route = ROUTE_GENERAL,
+):
+    tenant = tenant or default_tenant
+    binding = _chat_binding(tenant, route)
+    model_id, use_search, cache_name = binding
+
+    if cache_name:
+        config = GenerateContentConfig(cached_content=cache_name, temperature=tenant.temperature)
+    else:
+        config = GenerateContentConfig(
+            system_instruction=_system_prefix(tenant),
+            temperature=tenant.temperature,
+            tools=tenant.tools if use_search else None,
+        )
+    chat = tenant.client.chats.create(model=model_id, config=config, history=history)
+    _chat_bindings[chat] = binding
+    return chat
+
+
+def get_or_create_chat(sender: str, tenant: Optional[Tenant] = None, route: Route = ROUTE_GENERAL):
+    tenant = tenant or default_tenant
+    session_key = tenant.session_key(sender)
+    chat = chat_sessions.get(session_key)
+    if chat is None:
+        chat = chat_sessions[session_key] = create_chat(tenant=tenant, route=route)
+        logging.info("Created new chat session for %s", session_key)
+        return chat
+
+    # Chats are cheap local objects, so when this turn's route needs another
+    # model or tool set, or the context cache was replaced, the history moves
+    # onto a freshly configured chat.
+    binding = _chat_binding(tenant, route)
+    if chat in _chat_bindings and _chat_bindings[chat] != binding:
+        chat = chat_sessions[session_key] = create_chat(
+            history=chat.get_history(curated=True), tenant=tenant, route=route
+        )
+    return chat
 
 
-def _normalize_text(text: str) -> str:
-    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9\s]", " ", text.lower())).strip()
+_sms_output_lock = threading.Lock()
+_sms_output_stats = {"replies": 0, "segments": 0, "ucs2_replies": 0, "truncated_replies": 0}
 
 
-def _build_ngrams(text: str, max_words: int = 3) -> List[str]:
-    normalized = _normalize_text(text)
-    tokens = [token for token in normalized.split() if token]
-    ngrams: List[str] = []
-    for n in range(1, max_words + 1):
-        for start in range(0, max(0, len(tokens) - n + 1)):
-            ngram = " ".join(tokens[start:start + n])
-            if len(ngram) >= 3:
-                ngrams.append(ngram)
-    return ngrams
+def normalize_response(text: str, preserve_newlines: bool = False) -> str:
+    encoded = encode_sms(text, preserve_newlines=preserve_newlines)
+    with _sms_output_lock:
+        _sms_output_stats["replies"] += 1
+        _sms_output_stats["segments"] += encoded.segments
+        _sms_output_stats["ucs2_replies"] += encoded.encoding == "UCS-2"
+        _sms_output_stats["truncated_replies"] += encoded.truncated
+    logging.debug(
+        "Encoded reply as %s in %s segment(s)%s",
+        encoded.encoding,
+        encoded.segments,
+        " (truncated)" if encoded.truncated else "",
+    )
+    return encoded.text
 
 
-def _contains_exact_or_fuzzy_match(ngrams: Sequence[str], terms: Sequence[str], cutoff: float = 0.84) -> bool:
-    normalized_terms = [_normalize_text(term) for term in terms if term]
+def get_sms_output_stats() -> Dict[str, int]:
+    with _sms_output_lock:
+        return dict(_sms_output_stats)
 
+
+def _normalize_terms(terms: Sequence[str]) -> List[str]:
+    return [normalize_text(term) for term in terms if term]
+
+
+# Matched against every message, so normalized once instead of per call.
+_LEAGUE_KEYWORD_TERMS = {league: _normalize_terms(terms) for league, terms in LEAGUE_KEYWORDS.items()}
+_LEAGUE_TEAM_TERMS = {league: _normalize_terms(terms) for league, terms in LEAGUE_TEAM_NAMES.items()}
+_GENERIC_SPORTS_TERMS = _normalize_terms(GENERIC_SPORTS_KEYWORDS)
+# Generic keywords ("tonight", "game", "lost") are ordinary words too, so
+# only league and team names count as verbatim sports evidence.
+_EXACT_SPORTS_TERMS = frozenset(itertools.chain(*_LEAGUE_KEYWORD_TERMS.values(), *_LEAGUE_TEAM_TERMS.values()))
+
+
+def _contains_exact_or_fuzzy_match(
+    ngrams: Sequence[str],
+    normalized_terms: Sequence[str],
+    cutoff: float = 0.84,
+) -> bool:
     for ngram in ngrams:
         for term in normalized_terms:
             if ngram == term or ngram in term or term in ngram:
@@ -187,8 +306,90 @@ def _contains_exact_or_fuzzy_match(ngrams: Sequence[str], terms: Sequence[str],
     return False
 
 
+def _word_trigrams(word: str) -> List[str]:
+    padded = f" {word} "
+    return [padded[index:index + 3] for index in range(len(padded) - 2)]
+
+
+def _build_sports_trigram_index() -> Tuple[Dict[str, List[int]], List[int]]:
+    # Every word of every league, team and generic sports term, indexed by its
+    # padded character trigrams so a message token can be scored against the
+    # whole vocabulary with a handful of dict lookups.
+    vocabulary = set()
+    for terms in (*LEAGUE_KEYWORDS.values(), *LEAGUE_TEAM_NAMES.values(), GENERIC_SPORTS_KEYWORDS):
+        for term in terms:
+            vocabulary.update(normalize_text(term).split())
+
+    index: Dict[str, List[int]] = {}
+    trigram_counts: List[int] = []
+    for word_id, word in enumerate(sorted(vocabulary)):
+        trigrams = set(_word_trigrams(word))
+        trigram_counts.append(len(trigrams))
+        for trigram in trigrams:
+            index.setdefault(trigram, []).append(word_id)
+    return index, trigram_counts
+
+
+_SPORTS_TRIGRAM_INDEX, _SPORTS_WORD_TRIGRAM_COUNTS = _build_sports_trigram_index()
+
+_prefilter_lock = threading.Lock()
+_prefilter_stats = {"checked": 0, "passed": 0, "rejected": 0}
+
+
+def _record_prefilter_result(passed: bool) -> None:
+    with _prefilter_lock:
+        _prefilter_stats["checked"] += 1
+        _prefilter_stats["passed" if passed else "rejected"] += 1
+        checked = _prefilter_stats["checked"]
+        passed_count = _prefilter_stats["passed"]
+        rejected_count = _prefilter_stats["rejected"]
+
+    if SPORTS_PREFILTER_LOG_EVERY > 0 and checked % SPORTS_PREFILTER_LOG_EVERY == 0:
+        logging.info(
+            "Sports prefilter: %s checked | hit rate %.1f%% | reject rate %.1f%%",
+            checked,
+            100.0 * passed_count / checked,
+            100.0 * rejected_count / checked,
+        )
+
+
+def get_sports_prefilter_stats() -> Dict[str, int]:
+    with _prefilter_lock:
+        return dict(_prefilter_stats)
+
+
+def is_plausible_sports_text(text: str) -> bool:
+    """Cheap trigram check run before the n-gram/fuzzy league detection.
+
+    A message passes when at least one of its words shares enough padded
+    character trigrams (Dice coefficient) with a word from the sports
+    vocabulary, which keeps near-miss spellings like "yankes" on the fuzzy
+    path while plain small talk is rejected without building any n-grams.
+    """
+    for token in set(normalize_text(text).split()):
+        trigrams = set(_word_trigrams(token))
+        shared_counts: Dict[int, int] = {}
+        for trigram in trigrams:
+            for word_id in _SPORTS_TRIGRAM_INDEX.get(trigram, ()):
+                shared_counts[word_id] = shared_counts.get(word_id, 0) + 1
+
+        for word_id, shared in shared_counts.items():
+            total = len(trigrams) + _SPORTS_WORD_TRIGRAM_COUNTS[word_id]
+            if 2.0 * shared / total >= SPORTS_PREFILTER_MIN_SIMILARITY:
+                return True
+    return False
+
+
 def detect_requested_leagues_and_team_intent(text: str) -> Tuple[List[str], bool]:
-    ngrams = _build_ngrams(text, max_words=3)
+    if SPORTS_PREFILTER_ENABLED:
+        plausible = is_plausible_sports_text(text)
+        _record_prefilter_result(plausible)
+        if not plausible:
+            logging.debug("Sports prefilter rejected message without fuzzy matching")
+            return [], False
+
+    # Reused for every league below, so materialized once.
+    ngrams = list(iter_ngrams(text, max_words=3))
     if not ngrams:
         return [], False
 
@@ -196,8 +397,8 @@ def detect_requested_leagues_and_team_intent(text: str) -> Tuple[List[str], bool
     team_intent = False
 
     for league in ("mlb", "nhl", "nba", "nfl"):
-        league_terms = LEAGUE_KEYWORDS[league]
-        team_terms = LEAGUE_TEAM_NAMES[league]
+        league_terms = _LEAGUE_KEYWORD_TERMS[league]
+        team_terms = _LEAGUE_TEAM_TERMS[league]
 
         has_league_match = _contains_exact_or_fuzzy_match(ngrams, league_terms, cutoff=0.82)
         has_team_match = _contains_exact_or_fuzzy_match(ngrams, team_terms, cutoff=0.84)
@@ -216,7 +417,7 @@ def detect_requested_leagues_and_team_intent(text: str) -> Tuple[List[str], bool
 
     has_generic_sports_intent = _contains_exact_or_fuzzy_match(
         ngrams,
-        GENERIC_SPORTS_KEYWORDS,
+        _GENERIC_SPORTS_TERMS,
         cutoff=0.83,
     )
     if has_generic_sports_intent:
@@ -225,96 +426,42 @@ def detect_requested_leagues_and_team_intent(text: str) -> Tuple[List[str], bool
     return [], False
 
 
-def _extract_mcp_text(tool_result: Any) -> str:
-    if getattr(tool_result, "isError", False):
-        return "The sports MCP server reported an error."
-
-    text_chunks: List[str] = []
-    for item in getattr(tool_result, "content", []) or []:
-        text = getattr(item, "text", None)
-        if text is None and isinstance(item, dict):
-            text = item.get("text")
-        if text:
-            text_chunks.append(str(text))
-
-    if not text_chunks:
-        return "No score data was returned by the sports MCP server."
-
-    return "\n".join(text_chunks).strip()
+def has_exact_sports_term(text: str) -> bool:
+    """True when a league or team name appears verbatim, not just fuzzily."""
+    return any(ngram in _EXACT_SPORTS_TERMS for ngram in iter_ngrams(text, max_words=3))
 
 
-async def _get_live_sports_scores_from_mcp_async(leagues: Sequence[str], query: str = "") -> str:
-    if (
-        not MCP_AVAILABLE
-        or ClientSession is None
-        or StdioServerParameters is None
-        or stdio_client is None
-    ):
-        raise RuntimeError("Sports MCP support is unavailable because the `mcp` package is not installed.")
-
-    if not os.path.isfile(SPORTS_MCP_SERVER_PATH):
-        raise FileNotFoundError(f"Sports MCP server not found: {SPORTS_MCP_SERVER_PATH}")
-
-    server_parameters = StdioServerParameters(
-        command=SPORTS_MCP_PYTHON,
-        args=[SPORTS_MCP_SERVER_PATH],
-    )
+def get_live_sports_scores(leagues: Sequence[str], query: str = "", dates: str = "") -> str:
+    return get_sports_provider().get_scores(leagues, query=query, dates=dates)
 
-    leagues_arg = ",".join(leagues) if leagues else "all"
 
-    async with stdio_client(server_parameters) as (read_stream, write_stream):
-        async with ClientSession(read_stream, write_stream) as session:
-            await session.initialize()
-            tool_result = await session.call_tool(
-                "get_live_scores",
-                {"leagues": leagues_arg, "query": query},
-            )
-
-    return _extract_mcp_text(tool_result)
-
-
-def get_live_sports_scores_from_mcp(leagues: Sequence[str], query: str = "") -> str:
-    try:
-        return asyncio.run(_get_live_sports_scores_from_mcp_async(leagues, query=query))
-    except Exception as exc:
-        logging.error("Failed to fetch sports scores from MCP: %s", exc)
-        raise
-
-
-def get_live_sports_scores(leagues: Sequence[str], query: str = "") -> str:
-    try:
-        return get_live_sports_scores_from_mcp(leagues, query=query)
-    except Exception:
-        return (
-            "Unable to retrieve live scores right now because the sports MCP service is unavailable."
-        )
-
-
-def fetch_twilio_image(media_url: str) -> Optional[Image.Image]:
-    if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN:
+def fetch_twilio_image(media_url: str, tenant: Optional[Tenant] = None) -> Optional[Part]:
+    tenant = tenant or default_tenant
+    if not tenant.twilio_account_sid or not tenant.twilio_auth_token:
         logging.warning(
-            "TWILIO_ACCOUNT_SID or TWILIO_AUTH_TOKEN not set; skipping media download"
+            "TWILIO_ACCOUNT_SID or TWILIO_AUTH_TOKEN not set for tenant %s; skipping media download",
+            tenant.name,
         )
         return None
 
     try:
-        response = requests.get(
+        response = http_get(
             media_url,
-            auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
-            timeout=20,
+            timeout=TWILIO_MEDIA_TIMEOUT,
+            auth=(tenant.twilio_account_sid, tenant.twilio_auth_token),
+            cache_redirects=True,
         )
         response.raise_for_status()
+        journal_media(response.content, response.headers.get("Content-Type", ""))
 
-        image = Image.open(io.BytesIO(response.content))
-        image.load()  # Detach from the underlying byte stream.
-        return image
+        return compact_image_part(response.content)
     except Exception as exc:
         logging.error("Failed to download media from Twilio URL %s: %s", media_url, exc)
         return None
 
 
-def extract_images_from_twilio(form) -> List[Image.Image]:
-    images: List[Image.Image] = []
+def extract_images_from_twilio(form, tenant: Optional[Tenant] = None) -> List[Part]:
+    images: List[Part] = []
 
     try:
         num_media = int(form.get("NumMedia", "0"))
@@ -331,19 +478,91 @@ def extract_images_from_twilio(form) -> List[Image.Image]:
             logging.info("Skipping non-image media (%s): %s", media_content_type, media_url)
             continue
 
-        image = fetch_twilio_image(media_url)
+        image = fetch_twilio_image(media_url, tenant=tenant)
         if image is not None:
             images.append(image)
 
     return images
 
 
-def generate_response(sender: str, incoming_text: str, images: List[Image.Image]) -> str:
+def _dispatch_priority(incoming_text: str, images: Sequence[Part]) -> int:
+    if images:
+        return PRIORITY_BULK
+    if len(incoming_text) <= SHORT_PROMPT_CHARS:
+        return PRIORITY_INTERACTIVE
+    return PRIORITY_NORMAL
+
+
+def _estimate_tokens(prompt: str, images: Sequence[Part]) -> int:
+    # Roughly four characters per token plus Gemini's flat per-image cost;
+    # the dispatcher corrects the budget with real usage after each call.
+    return len(prompt) // 4 + IMAGE_TOKEN_ESTIMATE * len(images)
+
+
+def _send_chat_message(
+    tenant: Tenant,
+    session_key: str,
+    chat: Any,
+    message_contents: Any,
+    route: Route,
+    priority: int,
+    estimated_tokens: int,
+) -> Any:
+    # Runs inside the primary's dispatcher slot and is timed apart from
+    # dispatcher queueing so journals record pure upstream time.
+    with journal_stage("gemini"):
+        if not GEMINI_HEDGING:
+            return chat.send_message(message_contents)
+
+        settled = threading.Event()
+
+        def send_hedge() -> Tuple[Any, Any]:
+            # The hedge runs on a twin chat built from the pre-turn history, so a
+            # duplicate send never appends a second turn to the live session; if
+            # the twin wins it simply becomes the sender's session.
+            twin = create_chat(history=chat.get_history(curated=True), tenant=tenant, route=route)
+
+            def send_twin() -> Any:
+                if settled.is_set():
+                    raise RuntimeError("Gemini hedge no longer needed")
+                return twin.send_message(message_contents)
+
+            # A hedge is a second upstream call, so it queues for its own slot
+            # and is charged against RPM/TPM like any other request.
+            return twin, get_gemini_dispatcher().call(send_twin, priority=priority, estimated_tokens=estimated_tokens)
+
+        def hedge_has_headroom() -> bool:
+            # Under quota pressure a hedge would only queue behind other
+            # texts in the saturated buckets, adding load instead of cutting
+            # the tail.
+            return get_gemini_dispatcher().has_headroom(estimated_tokens)
+
+        try:
+            winner, model_response = gemini_hedger.run(
+                lambda: (chat, chat.send_message(message_contents)),
+                send_hedge,
+                should_hedge=hedge_has_headroom,
+            )
+        finally:
+            settled.set()
+        if winner is not chat:
+            chat_sessions[session_key] = winner
+        return model_response
+
+
+def generate_response(
+    sender: str,
+    incoming_text: str,
+    images: List[Part],
+    tenant: Optional[Tenant] = None,
+) -> str:
     delay = INITIAL_RETRY_DELAY
+    tenant = tenant or default_tenant
+    session_key = tenant.session_key(sender)
 
     if incoming_text.strip().lower() == "/new":
-        chat_sessions[sender] = create_chat()
-        logging.info("Started a new session for %s", sender)
+        chat_sessions[session_key] = create_chat(tenant=tenant)
+        logging.info("Started a new session for %s", session_key)
         return "New session started for you!"
 
     prompt = incoming_text.strip()
@@ -353,30 +572,76 @@ def generate_response(sender: str, incoming_text: str, images: List[Image.Image]
             "Describe what you see and provide a helpful response."
         )
 
-    requested_leagues, has_team_intent = detect_requested_leagues_and_team_intent(prompt)
+    with journal_stage("intent"):
+        requested_leagues, has_team_intent = detect_requested_leagues_and_team_intent(prompt)
+    journal_annotate("intent", {"leagues": requested_leagues, "team": has_team_intent})
     if requested_leagues:
         team_query = prompt if has_team_intent else ""
-        live_scores = get_live_sports_scores(requested_leagues, query=team_query)
+        date_range = resolve_date_range(prompt)
+        dates = ""
+        scores_label = "current"
+        if date_range is not None and date_range != (scoreboard_today(),) * 2:
+            dates = f"{date_range[0].isoformat()}..{date_range[1].isoformat()}"
+            scores_label = describe_date_range(*date_range)
+            journal_annotate("dates", dates)
+        tenant.record("sports_lookups")
+        with journal_stage("sports"):
+            live_scores = get_live_sports_scores(requested_leagues, query=team_query, dates=dates)
         requested_league_labels = ", ".join(league.upper() for league in requested_leagues)
+        scores_heading = (
+            f"current {requested_league_labels} scores"
+            if not dates
+            else f"{requested_league_labels} scores for {scores_label}"
+        )
         prompt += (
-            f"\n\nHere are the current {requested_league_labels} scores "
-            "from ESPN via the sports MCP server:\n"
+            f"\n\nHere are the {scores_heading} "
+            "from ESPN:\n"
             f"{live_scores}"
         )
 
     message_contents: Any = [*images, prompt] if images else prompt
+    dispatcher = get_gemini_dispatcher()
+    priority = _dispatch_priority(incoming_text, images)
+    estimated_tokens = _estimate_tokens(prompt, images)
+    context_cache = _context_cache_for(tenant)
+    route = classify_prompt(
+        incoming_text.strip(),
+        has_images=bool(images),
+        has_scores=bool(requested_leagues),
+        exact_sports=bool(requested_leagues) and has_exact_sports_term(incoming_text),
+    )
+    journal_annotate("route", route.name)
+    chat: Any = None
 
     for attempt in range(MAX_RETRIES):
         try:
-            chat = get_or_create_chat(sender)
-            model_response = chat.send_message(message_contents)
-            response_text = (model_response.text or "").strip()
+            chat = get_or_create_chat(sender, tenant=tenant, route=route)
+            started_at = time.perf_counter()
+            with journal_stage("gemini_total"):
+                model_response = dispatcher.call(
+                    lambda: _send_chat_message(
+                        tenant, session_key, chat, message_contents, route, priority, estimated_tokens
+                    ),
+                    priority=priority,
+                    estimated_tokens=estimated_tokens,
+                )
+            elapsed_ms = (time.perf_counter() - started_at) * 1000.0
+            tenant.record("gemini_ms", elapsed_ms)
+            route_stats.record(route, elapsed_ms, model_response)
+            if context_cache is not None:
+                context_cache.record_usage(model_response)
+            if images:
+                # The turn is in history whether or not the reply has text;
+                # either way the image bytes must not stay there.
+                release_history_images(chat_sessions.get(session_key, chat))
 
+            response_text = (model_response.text or "").strip()
             if not response_text:
                 return "I could not generate a response right now. Please try again."
 
             final_text = normalize_response(response_text)
-            logging.info("From: %s | Prompt: %s | Response: %s", sender, prompt, final_text)
+            tenant.record("replies")
+            logging.info("From: %s | Prompt: %s | Response: %s", session_key, prompt, final_text)
             return final_text
 
         except Exception as exc:
@@ -386,8 +651,23 @@ def generate_response(sender: str, incoming_text: str, images: List[Image.Image]
                 MAX_RETRIES,
                 exc,
             )
+            tenant.record("errors")
+
+            if isinstance(exc, GeminiBudgetExceeded):
+                # Out of quota for this webhook's time budget; shed like admission does.
+                return ADMISSION_BUSY_MESSAGE
+
+            if context_cache is not None and chat is not None and is_cache_missing_error(exc):
+                # Expired or deleted underneath us; the retry rebinds the chat.
+                context_cache.invalidate(_chat_bindings.get(chat, ("", False, None))[2])
+                continue
+
+            if is_rate_limit_error(exc):
+                # The dispatcher has already paused the shared queue, so the
+                # retry simply waits its turn there.
+                continue
 
-            if "503" in str(exc) or "rate limit" in str(exc).lower():
+            if "503" in str(exc):
                 logging.info("Retrying in %s seconds", delay)
                 time.sleep(delay)
                 delay *= 2
@@ -398,6 +678,104 @@ def generate_response(sender: str, incoming_text: str, images: List[Image.Image]
     return "I ran into an error processing that message. Please try again in a moment."
 
 
+# ----------------- Warm state and shutdown -----------------
+
+def _export_sessions() -> List[Dict[str, Any]]:
+    entries = []
+    # Newest sessions last, as chat_sessions keeps insertion order.
+    for session_key, chat in list(chat_sessions.items())[-WARM_STATE_MAX_SESSIONS:]:
+        history = chat.get_history(curated=True)
+        if history:
+            entries.append(
+                {
+                    "key": session_key,
+                    "history": [content.model_dump(mode="json", exclude_none=True) for content in history],
+                }
+            )
+    return entries
+
+
+def _session_tenant(session_key: str) -> Tenant:
+    for name, tenant in tenant_registry.tenants.items():
+        if name != default_tenant.name and session_key.startswith(f"{name}:"):
+            return tenant
+    return default_tenant
+
+
+def _restore_sessions(entries: List[Dict[str, Any]]) -> int:
+    restored = 0
+    for entry in entries:
+        if entry["key"] in chat_sessions:
+            continue
+        history = [Content.model_validate(content) for content in entry["history"]]
+        chat_sessions[entry["key"]] = create_chat(history=history, tenant=_session_tenant(entry["key"]))
+        restored += 1
+    return restored
+
+
+def _export_scores_cache() -> List[Dict[str, Any]]:
+    cache = get_sports_provider().cache
+    return cache.export() if cache is not None else []
+
+
+def _restore_scores_cache(entries: List[Dict[str, Any]]) -> int:
+    cache = get_sports_provider().cache
+    return cache.restore(entries) if cache is not None else 0
+
+
+# The team-intent index is left out: it is rebuilt from constants at import
+# in well under a millisecond, faster than reading it back would be.
+register_warm_state("sessions", _export_sessions, _restore_sessions)
+register_warm_state("scoreboards", export_scoreboards, restore_scoreboards)
+register_warm_state("scores_cache", _export_scores_cache, _restore_scores_cache)
+register_warm_state("media_redirects", export_redirect_cache, restore_redirect_cache)
+
+_startup_lock = threading.Lock()
+_startup_done = False
+_shutdown_lock = threading.Lock()
+_shutdown_done = False
+
+
+def startup() -> None:
+    """Restores the warm-state snapshot once the worker is serving.
+
+    Kept out of module import: restoring sessions creates chats, which can
+    bind the context cache with a Gemini call, and that must not happen
+    during a gunicorn preload, a test import or a journal replay.
+    """
+    global _startup_done
+    with _startup_lock:
+        if _startup_done:
+            return
+        load_warm_state()
+        _startup_done = True
+
+
+def shutdown(timeout: float = DRAIN_TIMEOUT) -> None:
+    """Drains the worker and snapshots its warm state before it exits.
+
+    New webhooks are shed immediately, in-flight messages (counted whether
+    or not ADMISSION_ENABLED is set) get up to ``timeout`` seconds to
+    finish, then the digest scheduler stops, warm state is written and MCP
+    server children are closed. Later calls wait for the first one and
+    return.
+    """
+    global _shutdown_done
+    with _shutdown_lock:
+        if _shutdown_done:
+            return
+        started_at = time.monotonic()
+        admission = get_admission_controller()
+        admission.begin_drain()
+        if not admission.wait_for_drain(timeout):
+            logging.warning("Drain deadline passed with %s message(s) still in flight", admission.in_flight())
+        subscription_manager.stop(timeout=max(1.0, timeout - (time.monotonic() - started_at)))
+        save_warm_state()
+        get_sports_provider().close()
+        _shutdown_done = True
+        logging.info("Shutdown finished in %.1fs", time.monotonic() - started_at)
+
+
 # ----------------- Twilio Routes -----------------
 
 @app.route("/health", methods=["GET"])
@@ -405,16 +783,75 @@ def health_check():
     return {"status": "ok"}, 200
 
 
+@app.route("/stats", methods=["GET"])
+def stats():
+    return {
+        "admission": get_admission_controller().stats(),
+        "context_cache": get_context_cache_stats(),
+        "espn": get_espn_fetch_stats(),
+        "gemini": get_gemini_dispatcher().stats(),
+        "gemini_routes": route_stats.stats(),
+        "hedging": {"gemini": gemini_hedger.stats(), "espn": espn_hedger.stats()},
+        "http": get_http_stats(),
+        "images": get_image_stats(),
+        "scores_archive": get_scores_archive_stats(),
+        "sms_output": get_sms_output_stats(),
+        "sports_prefilter": get_sports_prefilter_stats(),
+        "sports_provider": get_sports_provider().stats(),
+        "subscriptions": subscription_manager.stats(),
+        "tenants": tenant_registry.stats(),
+        "warm_state": get_warm_state_stats(),
+    }, 200
+
+
+@app.route("/admin/memory", methods=["GET"])
+def admin_memory():
+    # Hidden unless ADMIN_TOKEN is set; the report includes allocation sites.
+    supplied = request.headers.get("X-Admin-Token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(supplied, ADMIN_TOKEN):
+        return {"error": "not found"}, 404
+    top_n = request.args.get("top", type=int) or MEMORY_TOP_N
+    return memory_report(chat_sessions, top_n=top_n), 200
+
+
+def _handle_incoming_message(sender: str, incoming_text: str, tenant: Tenant) -> str:
+    tenant.record("messages")
+    subscription_reply = subscription_manager.handle_command(
+        tenant.name, sender, request.form.get("To", ""), incoming_text
+    )
+    if subscription_reply is not None:
+        return subscription_reply
+
+    with journal_stage("media"):
+        images = extract_images_from_twilio(request.form, tenant=tenant)
+    tenant.record("images", len(images))
+
+    if not incoming_text and not images:
+        return "Send a text question or an image to get started."
+    return generate_response(sender, incoming_text, images, tenant=tenant)
+
+
 @app.route("/sms", methods=["POST"])
 def twilio_sms_webhook():
     sender = request.form.get("From", "unknown")
     incoming_text = (request.form.get("Body") or "").strip()
-    images = extract_images_from_twilio(request.form)
-
-    if not incoming_text and not images:
-        response_text = "Send a text question or an image to get started."
-    else:
-        response_text = generate_response(sender, incoming_text, images)
+    tenant = tenant_registry.resolve(request.form.get("To", ""))
+
+    with journal_request(request.form):
+        journal_annotate("tenant", tenant.name)
+        if ADMISSION_ENABLED:
+            with journal_stage("admission"):
+                admission = get_admission_controller().admit(sender)
+        else:
+            # No limits, but still counted so shutdown can drain it.
+            admission = get_admission_controller().track()
+        journal_annotate("outcome", admission.reason)
+        if not admission.admitted:
+            twiml = MessagingResponse()
+            twiml.message(ADMISSION_BUSY_MESSAGE)
+            return Response(str(twiml), mimetype="application/xml")
+        with admission:
+            response_text = _handle_incoming_message(sender, incoming_text, tenant)
 
     twiml = MessagingResponse()
     twiml.message(response_text)
@@ -425,6 +862,7 @@ def twilio_sms_webhook():
 # ----------------- Entrypoint -----------------
 
 if __name__ == "__main__":
+    startup()
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "5000"))
     app.run(host=host, port=port)
@@ -0,0 +1,346 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+from espn_scores import (
+    LEAGUE_ALIASES,
+    LEAGUE_CONFIG,
+    extract_event_team_terms,
+    fetch_scoreboard_snapshot,
+    format_event,
+)
+from ngrams import normalize_text
+
+# ----------------- Configuration -----------------
+
+SUBSCRIPTIONS_PATH = os.getenv("SUBSCRIPTIONS_PATH", "").strip()
+SUBSCRIPTIONS_MAX_TOPICS = int(os.getenv("SUBSCRIPTIONS_MAX_TOPICS", "10"))
+DIGEST_POLL_INTERVAL = float(os.getenv("DIGEST_POLL_INTERVAL", "60"))
+DIGEST_SEND_WORKERS = int(os.getenv("DIGEST_SEND_WORKERS", "4"))
+
+SUBSCRIBE_COMMAND = "/subscribe"
+UNSUBSCRIBE_COMMAND = "/unsubscribe"
+LIST_COMMAND = "/subscriptions"
+
+# Nicknames that differ from every name ESPN gives the team.
+TEAM_ALIASES = {
+    "sixers": "76ers",
+    "blazers": "trail blazers",
+    "niners": "49ers",
+    "bucs": "buccaneers",
+}
+
+# (tenant name, subscriber number)
+SubscriberKey = Tuple[str, str]
+SendFunction = Callable[[str, str, str, str], None]
+
+
+def _canonical_topic(topic: str) -> str:
+    # Team topics are stored under a name ESPN uses, so matching is exact.
+    return TEAM_ALIASES.get(topic, topic)
+
+
+def _split_topics(text: str) -> List[str]:
+    parts = re.split(r",|;|\band\b|&", text.lower())
+    return [_canonical_topic(normalize_text(part)) for part in parts if normalize_text(part)]
+
+
+def _event_signature(event: Dict[str, Any]) -> Optional[Tuple[str, ...]]:
+    # Scores plus the coarse game state, so clock ticks alone never notify.
+    competitions = event.get("competitions", [])
+    if not competitions:
+        return None
+    competition = competitions[0]
+    scores = tuple(
+        f"{competitor.get('homeAway', '')}:{competitor.get('score', '')}"
+        for competitor in competition.get("competitors", [])
+    )
+    state = competition.get("status", {}).get("type", {}).get("state") or event.get("status", {}).get(
+        "type", {}
+    ).get("state", "")
+    return (*sorted(scores), state)
+
+
+class SubscriptionManager:
+    """Team and league subscriptions plus the digest scheduler that serves them.
+
+    A background thread polls only the leagues someone follows. When an
+    event's score or game state changes, its digest line is formatted once
+    and every subscriber following that league or team gets one message per
+    poll covering all of their changed games, sent in parallel through
+    ``send``. The first poll of an event only records its state.
+    """
+
+    def __init__(
+        self,
+        team_leagues: Mapping[str, Sequence[str]],
+        send: SendFunction,
+        path: str = SUBSCRIPTIONS_PATH,
+        poll_interval: float = DIGEST_POLL_INTERVAL,
+        send_workers: int = DIGEST_SEND_WORKERS,
+    ) -> None:
+        self.team_leagues = {team: list(leagues) for team, leagues in team_leagues.items()}
+        self.send = send
+        self.path = path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        # subscriber -> (reply-from number, topics)
+        self._subscribers: Dict[SubscriberKey, Tuple[str, Set[str]]] = {}
+        self._event_state: Dict[str, Tuple[str, ...]] = {}
+        self._league_digests: Dict[str, str] = {}
+        self._send_pool = ThreadPoolExecutor(max_workers=max(1, send_workers), thread_name_prefix="digest-send")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            "polls": 0,
+            "poll_errors": 0,
+            "events_changed": 0,
+            "digests_built": 0,
+            "messages_sent": 0,
+            "send_failures": 0,
+            "last_poll_ms": 0.0,
+        }
+        self._load()
+
+    # ----------------- Topics and persistence -----------------
+
+    def _topic_leagues(self, topic: str) -> List[str]:
+        if topic in LEAGUE_CONFIG:
+            return [topic]
+        if topic in LEAGUE_ALIASES:
+            return [LEAGUE_ALIASES[topic]]
+        return self.team_leagues.get(topic, [])
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as subscriptions_file:
+                entries = json.load(subscriptions_file)
+        except (OSError, ValueError) as exc:
+            logging.error("Could not load subscriptions from %s: %s", self.path, exc)
+            return
+        for entry in entries:
+            key = (entry["tenant"], entry["number"])
+            self._subscribers[key] = (
+                entry.get("from", ""),
+                {_canonical_topic(topic) for topic in entry.get("topics", [])},
+            )
+        logging.info("Loaded %s subscriber(s) from %s", len(self._subscribers), self.path)
+        if self._subscribers:
+            self._ensure_started()
+
+    def _save_locked(self) -> None:
+        if not self.path:
+            return
+        entries = [
+            {"tenant": tenant, "number": number, "from": from_number, "topics": sorted(topics)}
+            for (tenant, number), (from_number, topics) in self._subscribers.items()
+        ]
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as subscriptions_file:
+                json.dump(entries, subscriptions_file)
+            os.replace(temp_path, self.path)
+        except OSError as exc:
+            logging.error("Could not save subscriptions to %s: %s", self.path, exc)
+
+    # ----------------- SMS commands -----------------
+
+    def handle_command(self, tenant: str, sender: str, from_number: str, text: str) -> Optional[str]:
+        """Returns the reply for a subscription command, or None for other messages."""
+        command, _, argument = text.strip().partition(" ")
+        command = command.lower()
+        if command == SUBSCRIBE_COMMAND:
+            return self.subscribe(tenant, sender, from_number, argument)
+        if command == UNSUBSCRIBE_COMMAND:
+            return self.unsubscribe(tenant, sender, argument)
+        if command == LIST_COMMAND:
+            topics = self.topics_for(tenant, sender)
+            if not topics:
+                return f"You have no subscriptions. Text {SUBSCRIBE_COMMAND} knicks, nfl to follow teams or leagues."
+            return f"You follow: {', '.join(topics)}. Text {UNSUBSCRIBE_COMMAND} all to stop."
+        return None
+
+    def subscribe(self, tenant: str, sender: str, from_number: str, argument: str) -> str:
+        topics = _split_topics(argument)
+        if not topics:
+            return f"Text {SUBSCRIBE_COMMAND} followed by teams or leagues, e.g. {SUBSCRIBE_COMMAND} knicks, nfl."
+
+        known = [topic for topic in topics if self._topic_leagues(topic)]
+        unknown = [topic for topic in topics if not self._topic_leagues(topic)]
+        if not known:
+            return f"Sorry, I don't recognize {', '.join(unknown)}. Try a team name or mlb, nhl, nba, nfl."
+
+        with self._lock:
+            _, current = self._subscribers.get((tenant, sender), (from_number, set()))
+            updated = current | set(known)
+            if len(updated) > SUBSCRIPTIONS_MAX_TOPICS:
+                return f"You can follow up to {SUBSCRIPTIONS_MAX_TOPICS} teams or leagues."
+            self._subscribers[(tenant, sender)] = (from_number, updated)
+            self._save_locked()
+        self._ensure_started()
+
+        reply = f"Subscribed to {', '.join(known)}. You'll get a text when the score changes."
+        if unknown:
+            reply += f" (Skipped unknown: {', '.join(unknown)}.)"
+        return reply + f" Text {UNSUBSCRIBE_COMMAND} all to stop."
+
+    def unsubscribe(self, tenant: str, sender: str, argument: str) -> str:
+        topics = _split_topics(argument)
+        with self._lock:
+            entry = self._subscribers.get((tenant, sender))
+            if entry is None:
+                return "You have no subscriptions."
+            from_number, current = entry
+            remaining = set() if not topics or "all" in topics else current - set(topics)
+            if remaining:
+                self._subscribers[(tenant, sender)] = (from_number, remaining)
+            else:
+                del self._subscribers[(tenant, sender)]
+            self._save_locked()
+
+        if remaining:
+            return f"Updated. You still follow: {', '.join(sorted(remaining))}."
+        return "Unsubscribed. You won't get score updates anymore."
+
+    def topics_for(self, tenant: str, sender: str) -> List[str]:
+        with self._lock:
+            entry = self._subscribers.get((tenant, sender))
+        return sorted(entry[1]) if entry else []
+
+    # ----------------- Scheduler -----------------
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="digest-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._send_pool.shutdown(wait=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as exc:
+                logging.exception("Digest poll failed: %s", exc)
+            self._stop.wait(self.poll_interval)
+
+    def poll_once(self) -> int:
+        """Runs one poll and returns the number of messages queued."""
+        started_at = time.perf_counter()
+        with self._lock:
+            subscribers = {key: (from_number, set(topics)) for key, (from_number, topics) in self._subscribers.items()}
+        leagues = sorted({league for _, topics in subscribers.values() for topic in topics for league in self._topic_leagues(topic)})
+
+        # subscriber -> digest lines, each line formatted once per event.
+        pending: Dict[SubscriberKey, List[str]] = {}
+        for league in leagues:
+            try:
+                snapshot = fetch_scoreboard_snapshot(league)
+            except Exception as exc:
+                with self._lock:
+                    self._stats["poll_errors"] += 1
+                logging.warning("Digest poll for %s failed: %s", league, exc)
+                continue
+            # An identical scoreboard cannot contain a changed event.
+            if self._league_digests.get(league) == snapshot.digest:
+                continue
+            self._league_digests[league] = snapshot.digest
+            events = snapshot.payload.get("events", [])
+            self._forget_finished_events(league, {f"{league}:{event.get('id', '')}" for event in events})
+            for event in events:
+                line = self._changed_event_line(league, event)
+                if line is None:
+                    continue
+                for key, (_, topics) in subscribers.items():
+                    if self._follows(topics, league, event):
+                        pending.setdefault(key, []).append(line)
+
+        for key, lines in pending.items():
+            tenant, number = key
+            body = "Score update:\n" + "\n".join(lines)
+            self._send_pool.submit(self._deliver, tenant, subscribers[key][0], number, body)
+
+        with self._lock:
+            self._stats["polls"] += 1
+            self._stats["last_poll_ms"] = round((time.perf_counter() - started_at) * 1000.0, 1)
+        return len(pending)
+
+    def _forget_finished_events(self, league: str, current_ids: Set[str]) -> None:
+        # Yesterday's games drop off the scoreboard; drop their state too.
+        with self._lock:
+            for event_id in [key for key in self._event_state if key.startswith(f"{league}:")]:
+                if event_id not in current_ids:
+                    del self._event_state[event_id]
+
+    def _changed_event_line(self, league: str, event: Dict[str, Any]) -> Optional[str]:
+        event_id = f"{league}:{event.get('id', '')}"
+        signature = _event_signature(event)
+        if signature is None:
+            return None
+        with self._lock:
+            previous = self._event_state.get(event_id)
+            self._event_state[event_id] = signature
+        if previous is None or previous == signature:
+            return None
+
+        formatted = format_event(event)
+        if not formatted:
+            return None
+        with self._lock:
+            self._stats["events_changed"] += 1
+            self._stats["digests_built"] += 1
+        return f"{LEAGUE_CONFIG[league]['label']}: {formatted}"
+
+    def _follows(self, topics: Set[str], league: str, event: Dict[str, Any]) -> bool:
+        team_names: Optional[Set[str]] = None
+        for topic in topics:
+            if topic == league or LEAGUE_ALIASES.get(topic) == league:
+                return True
+            if league not in self.team_leagues.get(topic, []):
+                continue
+            # Exact names only: fuzzy matching would let "red sox" pick up
+            # both the Reds and the White Sox.
+            if team_names is None:
+                team_names = set(extract_event_team_terms(event))
+            if topic in team_names:
+                return True
+        return False
+
+    def _deliver(self, tenant: str, from_number: str, to_number: str, body: str) -> None:
+        try:
+            self.send(tenant, from_number, to_number, body)
+        except Exception as exc:
+            with self._lock:
+                self._stats["send_failures"] += 1
+            logging.error("Digest send to %s failed: %s", to_number, exc)
+            return
+        with self._lock:
+            self._stats["messages_sent"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["subscribers"] = len(self._subscribers)
+            stats["topics"] = sorted({topic for _, topics in self._subscribers.values() for topic in topics})
+            stats["tracked_events"] = len(self._event_state)
+            stats["running"] = self._thread is not None and self._thread.is_alive()
+        # Each delivered digest replaces what used to be an ESPN fetch plus a
+        # Gemini call for a "scores" text.
+        stats["fanout_ratio"] = (
+            round(stats["messages_sent"] / stats["digests_built"], 2) if stats["digests_built"] else 0.0
+        )
+        return stats
@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List, Sequence
+
+from google import genai
+from google.genai.types import GoogleSearch, Tool
+
+# ----------------- Configuration -----------------
+
+# JSON list of tenants; see DEPLOYMENT.md for the format.
+TENANTS_FILE = os.getenv("TENANTS_FILE", "").strip()
+
+TOOL_FACTORIES = {
+    "google_search": lambda: Tool(google_search=GoogleSearch()),
+}
+
+_client_lock = threading.Lock()
+_clients: Dict[str, Any] = {}
+
+
+def get_genai_client(api_key: str) -> Any:
+    # Tenants sharing an API key share one client and its connection pool.
+    with _client_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = genai.Client(api_key=api_key)
+            _clients[api_key] = client
+        return client
+
+
+def normalize_number(number: str) -> str:
+    digits = re.sub(r"\D", "", number or "")
+    return f"+{digits}" if digits else ""
+
+
+def build_tools(tool_names: Sequence[str]) -> List[Any]:
+    tools: List[Any] = []
+    for name in tool_names:
+        factory = TOOL_FACTORIES.get(name)
+        if factory is None:
+            logging.warning("Ignoring unknown tenant tool %r", name)
+            continue
+        tools.append(factory())
+    return tools
+
+
+class Tenant:
+    def __init__(
+        self,
+        name: str,
+        numbers: Sequence[str],
+        model_id: str,
+        system_instruction: str,
+        tool_names: Sequence[str],
+        api_key: str,
+        twilio_account_sid: str = "",
+        twilio_auth_token: str = "",
+        temperature: float = 0.2,
+        client: Any = None,
+        light_model_id: str = "",
+    ) -> None:
+        self.name = name
+        self.numbers = [normalize_number(number) for number in numbers if normalize_number(number)]
+        self.model_id = model_id
+        # Model for turns routed as light; empty means always use model_id.
+        self.light_model_id = light_model_id or model_id
+        self.system_instruction = system_instruction
+        self.tool_names = list(tool_names)
+        self.tools = build_tools(self.tool_names)
+        self.api_key = api_key
+        self.twilio_account_sid = twilio_account_sid
+        self.twilio_auth_token = twilio_auth_token
+        self.temperature = temperature
+        self._client = client
+        self._metrics_lock = threading.Lock()
+        self._metrics: Dict[str, float] = {
+            "messages": 0,
+            "replies": 0,
+            "errors": 0,
+            "sports_lookups": 0,
+            "images": 0,
+            "gemini_ms": 0.0,
+        }
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            self._client = get_genai_client(self.api_key)
+        return self._client
+
+    def session_key(self, sender: str) -> str:
+        # The default tenant keeps bare sender keys so existing sessions and
+        # snapshots stay valid; other tenants get their own namespace.
+        return sender if self.name == "default" else f"{self.name}:{sender}"
+
+    def record(self, metric: str, amount: float = 1) -> None:
+        with self._metrics_lock:
+            self._metrics[metric] = self._metrics.get(metric, 0) + amount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            metrics: Dict[str, Any] = dict(self._metrics)
+        metrics["gemini_ms"] = round(metrics["gemini_ms"], 1)
+        metrics["model"] = self.model_id
+        metrics["numbers"] = self.numbers
+        return metrics
+
+
+class TenantRegistry:
+    def __init__(self, default_tenant: Tenant, tenants: Sequence[Tenant] = ()) -> None:
+        self.default_tenant = default_tenant
+        self.tenants: Dict[str, Tenant] = {default_tenant.name: default_tenant}
+        self._by_number: Dict[str, Tenant] = {}
+        for tenant in tenants:
+            self.tenants[tenant.name] = tenant
+            for number in tenant.numbers:
+                if number in self._by_number:
+                    logging.warning("Number %s is claimed by several tenants; using %s", number, tenant.name)
+                self._by_number[number] = tenant
+
+    def resolve(self, to_number: str) -> Tenant:
+        return self._by_number.get(normalize_number(to_number), self.default_tenant)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: tenant.stats() for name, tenant in self.tenants.items()}
+
+
+def _secret(entry: Dict[str, Any], field: str, fallback: str) -> str:
+    # Secrets may be given inline or, preferably, as the name of an env var.
+    if entry.get(f"{field}_env"):
+        return os.getenv(entry[f"{field}_env"], "")
+    return entry.get(field) or fallback
+
+
+def load_tenant_registry(
+    default_tenant: Tenant,
+    path: str = TENANTS_FILE,
+    light_model_id: str = "",
+) -> TenantRegistry:
+    if not path:
+        return TenantRegistry(default_tenant)
+
+    with open(path, encoding="utf-8") as tenants_file:
+        entries = json.load(tenants_file)
+
+    tenants: List[Tenant] = []
+    for entry in entries:
+        name = str(entry.get("name", "")).strip()
+        if not name or name == default_tenant.name:
+            raise ValueError(f"Each tenant in {path} needs a unique name other than 'default'")
+        tenants.append(
+            Tenant(
+                name=name,
+                numbers=entry.get("numbers", []),
+                model_id=entry.get("model") or default_tenant.model_id,
+                system_instruction=entry.get("system_instruction") or default_tenant.system_instruction,
+                tool_names=entry.get("tools", default_tenant.tool_names),
+                api_key=_secret(entry, "api_key", default_tenant.api_key),
+                twilio_account_sid=_secret(entry, "twilio_account_sid", default_tenant.twilio_account_sid),
+                twilio_auth_token=_secret(entry, "twilio_auth_token", default_tenant.twilio_auth_token),
+                temperature=float(entry.get("temperature", default_tenant.temperature)),
+                # The raw setting, not default_tenant.light_model_id: that one has
+                # already fallen back to the default model, so a tenant with its own
+                # model would send light turns there. Tenant falls back to model_id.
+                light_model_id=entry.get("light_model") or light_model_id,
+            )
+        )
+
+    logging.info("Loaded %s tenant(s) from %s", len(tenants), path)
+    return TenantRegistry(default_tenant, tenants)
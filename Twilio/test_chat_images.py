@@ -0,0 +1,34 @@
+import os
+from types import SimpleNamespace
+
+os.environ.setdefault("API_KEY", "test")
+
+import chat_images  # noqa: E402
+import sms_gemini  # noqa: E402
+from chat_images import get_image_stats  # noqa: E402
+
+
+class EmptyReplyChat:
+    def __init__(self):
+        self.history = []
+
+    def get_history(self, curated=False):
+        return self.history
+
+    def send_message(self, message):
+        self.history.append(SimpleNamespace(role="user", parts=list(message)))
+        return SimpleNamespace(text="", usage_metadata=None)
+
+
+def test_empty_reply_still_releases_image_bytes(monkeypatch):
+    chat = EmptyReplyChat()
+    monkeypatch.setattr(sms_gemini, "get_or_create_chat", lambda sender, tenant=None, route=None: chat)
+    monkeypatch.setattr(chat_images, "Part", lambda text: SimpleNamespace(text=text, inline_data=None))
+    image = SimpleNamespace(inline_data=SimpleNamespace(data=b"\xff\xd8" + b"\x00" * 2048, mime_type="image/jpeg"))
+    released_before = get_image_stats()["released_images"]
+
+    reply = sms_gemini.generate_response("+15551230000", "what is this?", [image])
+
+    assert reply.startswith("I could not generate a response")
+    assert chat.history[0].parts[0].inline_data is None
+    assert get_image_stats()["released_images"] == released_before + 1
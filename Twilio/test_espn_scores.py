@@ -0,0 +1,36 @@
+from datetime import date
+
+import pytest
+
+from espn_scores import resolve_date_range
+
+TODAY = date(2024, 6, 15)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("nba scores 2024-05-01", (date(2024, 5, 1), date(2024, 5, 1))),
+        ("mlb 2024-05-01..2024-05-03", (date(2024, 5, 1), date(2024, 5, 3))),
+        ("knicks score on 5/1", (date(2024, 5, 1), date(2024, 5, 1))),
+        ("yankees sunday 6/9", (date(2024, 6, 9), date(2024, 6, 9))),
+        ("mets 5/1/23", (date(2023, 5, 1), date(2023, 5, 1))),
+    ],
+)
+def test_explicit_dates_resolve(text, expected):
+    assert resolve_date_range(text, today=TODAY) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "my order 20240501 never arrived",
+        "call me at 555 20240501",
+        "tracking 12345678",
+        "I'm 3/4 done",
+        "we're 2/3 of the way there",
+        "they won 10/7",
+    ],
+)
+def test_numbers_and_fractions_are_not_dates(text):
+    assert resolve_date_range(text, today=TODAY) is None
@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("API_KEY", "test")
+
+import sms_gemini  # noqa: E402
+from gemini_dispatch import PRIORITY_INTERACTIVE, GeminiDispatcher  # noqa: E402
+from hedging import Hedger  # noqa: E402
+from prompt_router import ROUTE_GENERAL  # noqa: E402
+
+
+class SlowChat:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def get_history(self, curated=False):
+        return []
+
+    def send_message(self, message):
+        time.sleep(self.delay)
+        return SimpleNamespace(text="primary", usage_metadata=None)
+
+
+@pytest.fixture
+def hedged_send(monkeypatch):
+    hedger = Hedger("gemini-test", initial_delay=0.01)
+    twins = []
+
+    def create_chat(**kwargs):
+        twin = SlowChat(0.0)
+        twins.append(twin)
+        return twin
+
+    monkeypatch.setattr(sms_gemini, "GEMINI_HEDGING", True)
+    monkeypatch.setattr(sms_gemini, "gemini_hedger", hedger)
+    monkeypatch.setattr(sms_gemini, "create_chat", create_chat)
+
+    def send(dispatcher):
+        monkeypatch.setattr(sms_gemini, "get_gemini_dispatcher", lambda: dispatcher)
+        return sms_gemini._send_chat_message(
+            sms_gemini.default_tenant,
+            "default:hedge-test",
+            SlowChat(0.2),
+            ["hello"],
+            ROUTE_GENERAL,
+            PRIORITY_INTERACTIVE,
+            100,
+        )
+
+    return SimpleNamespace(send=send, hedger=hedger, twins=twins)
+
+
+def test_hedge_is_sent_when_dispatcher_has_headroom(hedged_send):
+    hedged_send.send(GeminiDispatcher(rpm=600, tpm=100000, max_concurrent=2))
+
+    assert len(hedged_send.twins) == 1
+    assert hedged_send.hedger.stats()["hedged"] == 1
+
+
+def test_no_hedge_while_dispatcher_queue_is_non_empty(hedged_send):
+    dispatcher = GeminiDispatcher(rpm=600, tpm=100000, max_concurrent=1, max_queue_wait=5)
+    release = threading.Event()
+    holder = threading.Thread(target=dispatcher.call, args=(release.wait,))
+    waiter = threading.Thread(target=dispatcher.call, args=(lambda: None,))
+    holder.start()
+    while dispatcher.stats()["active"] == 0:
+        time.sleep(0.005)
+    waiter.start()
+    while dispatcher.stats()["waiting"] == 0:
+        time.sleep(0.005)
+
+    try:
+        response = hedged_send.send(dispatcher)
+        assert dispatcher.stats()["waiting"] == 1
+    finally:
+        release.set()
+        holder.join()
+        waiter.join()
+
+    assert response.text == "primary"
+    assert hedged_send.twins == []
+    stats = hedged_send.hedger.stats()
+    assert stats["hedged"] == 0
+    assert stats["skipped_by_caller"] == 1
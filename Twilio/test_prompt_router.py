@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+os.environ.setdefault("API_KEY", "test")
+
+import sms_gemini  # noqa: E402
+from prompt_router import ROUTE_GENERAL, ROUTE_GROUNDED, ROUTE_SCORES, classify_prompt  # noqa: E402
+
+
+def route_for(text: str):
+    leagues, _ = sms_gemini.detect_requested_leagues_and_team_intent(text)
+    return classify_prompt(
+        text,
+        has_scores=bool(leagues),
+        exact_sports=bool(leagues) and sms_gemini.has_exact_sports_term(text),
+    )
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "what is the capital of australia",
+        "what is the population of texas",
+        "write me a poem about the sunset",
+        "who plays in the super bowl",
+    ],
+)
+def test_fuzzy_only_sports_match_keeps_search(text):
+    route = route_for(text)
+    assert route is ROUTE_GENERAL
+    assert route.use_search
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["knicks score", "lakers", "nba scores yesterday", "how did the yankees do last night"],
+)
+def test_exact_sports_match_uses_scoreboard(text):
+    assert route_for(text) is ROUTE_SCORES
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "what's the latest on the hurricane",
+        "what happened today",
+        "what day is it today",
+        "what is on tv tonight",
+        "any good movies playing tonight",
+        "I lost my keys",
+    ],
+)
+def test_everyday_prompts_keep_search(text):
+    route = route_for(text)
+    assert route is not ROUTE_SCORES
+    assert route.use_search
+
+
+def test_covered_date_words_are_not_sports_evidence():
+    assert classify_prompt("how did they do last night", has_scores=True) is ROUTE_GROUNDED
+
+
+def test_uncovered_time_terms_stay_grounded():
+    assert classify_prompt("lakers trade news today", has_scores=True, exact_sports=True) is ROUTE_GROUNDED
+
+
+def test_no_scoreboard_never_routes_to_scores():
+    assert classify_prompt("lakers", exact_sports=True) is ROUTE_GENERAL
@@ -0,0 +1,141 @@
+import os
+
+os.environ.setdefault("API_KEY", "test")
+
+import sms_gemini  # noqa: E402
+import subscriptions  # noqa: E402
+from espn_scores import ScoreboardSnapshot  # noqa: E402
+from subscriptions import SubscriptionManager  # noqa: E402
+
+TEAM_LEAGUES = {
+    "red sox": ["mlb"],
+    "reds": ["mlb"],
+    "white sox": ["mlb"],
+    "sixers": ["nba"],
+    "76ers": ["nba"],
+}
+
+
+def make_event(event_id, home, away, home_score, away_score):
+    def competitor(side, names, score):
+        name, display_name, abbreviation = names
+        return {
+            "homeAway": side,
+            "score": str(score),
+            "team": {
+                "name": name,
+                "shortDisplayName": name,
+                "displayName": display_name,
+                "abbreviation": abbreviation,
+            },
+        }
+
+    return {
+        "id": event_id,
+        "competitions": [
+            {
+                "competitors": [competitor("home", home, home_score), competitor("away", away, away_score)],
+                "status": {"type": {"state": "in", "shortDetail": "Top 5th"}},
+            }
+        ],
+    }
+
+
+RED_SOX = ("Red Sox", "Boston Red Sox", "BOS")
+REDS = ("Reds", "Cincinnati Reds", "CIN")
+WHITE_SOX = ("White Sox", "Chicago White Sox", "CHW")
+CUBS = ("Cubs", "Chicago Cubs", "CHC")
+YANKEES = ("Yankees", "New York Yankees", "NYY")
+GUARDIANS = ("Guardians", "Cleveland Guardians", "CLE")
+
+
+def scoreboard(runs):
+    return {
+        "events": [
+            make_event("1", REDS, CUBS, runs, 0),
+            make_event("2", WHITE_SOX, GUARDIANS, runs, 0),
+            make_event("3", RED_SOX, YANKEES, runs, 0),
+        ]
+    }
+
+
+def make_manager(monkeypatch, sent):
+    manager = SubscriptionManager(TEAM_LEAGUES, lambda *message: sent.append(message), path="")
+    # Polls are driven by the test, not the background scheduler.
+    monkeypatch.setattr(manager, "_ensure_started", lambda: None)
+    return manager
+
+
+def test_team_subscription_ignores_similarly_named_teams(monkeypatch):
+    sent = []
+    manager = make_manager(monkeypatch, sent)
+    manager.subscribe("default", "+15551230000", "+15550000000", "red sox")
+
+    for runs in (0, 1):
+        payload = scoreboard(runs)
+        monkeypatch.setattr(
+            subscriptions, "fetch_scoreboard_snapshot", lambda league: ScoreboardSnapshot(payload, str(runs))
+        )
+        manager.poll_once()
+    manager.stop()
+
+    assert len(sent) == 1
+    body = sent[0][3]
+    assert "Red Sox 1" in body
+    assert "Reds" not in body
+    assert "White Sox" not in body
+
+
+def test_digest_sent_to_twilio_keeps_one_game_per_line(monkeypatch):
+    posted = []
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+    def fake_post(url, timeout, data=None, auth=None):
+        posted.append(data)
+        return Response()
+
+    monkeypatch.setattr(sms_gemini, "http_post", fake_post)
+    monkeypatch.setattr(sms_gemini.default_tenant, "twilio_account_sid", "AC123")
+    monkeypatch.setattr(sms_gemini.default_tenant, "twilio_auth_token", "token")
+    manager = SubscriptionManager(TEAM_LEAGUES, sms_gemini.send_sms, path="")
+    monkeypatch.setattr(manager, "_ensure_started", lambda: None)
+    manager.subscribe("default", "+15551230000", "+15550000000", "mlb")
+
+    for runs in (0, 1):
+        payload = scoreboard(runs)
+        monkeypatch.setattr(
+            subscriptions, "fetch_scoreboard_snapshot", lambda league: ScoreboardSnapshot(payload, str(runs))
+        )
+        manager.poll_once()
+    manager.stop()
+
+    assert len(posted) == 1
+    lines = posted[0]["Body"].split("\n")
+    assert lines[0] == "Score update:"
+    assert len(lines) == 4
+    assert all(line.startswith("MLB: ") for line in lines[1:])
+
+
+def test_follows_matches_exact_team_names_only():
+    manager = SubscriptionManager(TEAM_LEAGUES, lambda *message: None, path="")
+    reds = make_event("1", REDS, CUBS, 1, 0)
+    white_sox = make_event("2", WHITE_SOX, GUARDIANS, 1, 0)
+    red_sox = make_event("3", RED_SOX, YANKEES, 1, 0)
+
+    assert manager._follows({"red sox"}, "mlb", red_sox)
+    assert not manager._follows({"red sox"}, "mlb", reds)
+    assert not manager._follows({"red sox"}, "mlb", white_sox)
+    assert manager._follows({"reds"}, "mlb", reds)
+    assert not manager._follows({"reds"}, "mlb", red_sox)
+    assert manager._follows({"mlb"}, "mlb", white_sox)
+
+
+def test_subscribe_stores_canonical_team_name(monkeypatch):
+    manager = make_manager(monkeypatch, [])
+    manager.subscribe("default", "+15551230000", "+15550000000", "sixers")
+    assert manager.topics_for("default", "+15551230000") == ["76ers"]
+    manager.unsubscribe("default", "+15551230000", "sixers")
+    assert manager.topics_for("default", "+15551230000") == []
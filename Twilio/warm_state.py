@@ -0,0 +1,112 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+# ----------------- Configuration -----------------
+
+# Empty disables snapshots. On Render, point this at a persistent disk so a
+# new deploy's worker finds the previous one's state.
+WARM_STATE_PATH = os.getenv("WARM_STATE_PATH", "").strip()
+# Older snapshots are ignored: their sessions and scoreboards are not worth reviving.
+WARM_STATE_MAX_AGE = float(os.getenv("WARM_STATE_MAX_AGE", "3600"))
+WARM_STATE_VERSION = 1
+
+# Returns JSON-serializable state.
+StateExporter = Callable[[], Any]
+# Applies exported state and returns how many entries it restored.
+StateRestorer = Callable[[Any], int]
+
+_sections_lock = threading.Lock()
+_sections: Dict[str, Tuple[StateExporter, StateRestorer]] = {}
+_stats_lock = threading.Lock()
+_stats: Dict[str, Any] = {"saved": {}, "loaded": {}}
+
+
+def register_warm_state(name: str, export: StateExporter, restore: StateRestorer) -> None:
+    with _sections_lock:
+        _sections[name] = (export, restore)
+
+
+def save_warm_state(path: str = WARM_STATE_PATH) -> Dict[str, Any]:
+    """Writes every registered section to ``path`` (gzipped JSON, replaced atomically)."""
+    if not path:
+        return {}
+    started_at = time.perf_counter()
+    with _sections_lock:
+        sections = dict(_sections)
+
+    snapshot: Dict[str, Any] = {"version": WARM_STATE_VERSION, "saved_at": time.time(), "sections": {}}
+    for name, (export, _) in sections.items():
+        try:
+            snapshot["sections"][name] = export()
+        except Exception as exc:
+            logging.error("Could not export warm state section %s: %s", name, exc)
+
+    temp_path = f"{path}.tmp"
+    try:
+        with gzip.open(temp_path, "wt", encoding="utf-8", compresslevel=5) as state_file:
+            json.dump(snapshot, state_file, separators=(",", ":"))
+        os.replace(temp_path, path)
+    except (OSError, TypeError, ValueError) as exc:
+        logging.error("Could not save warm state to %s: %s", path, exc)
+        return {}
+
+    summary = {
+        "path": path,
+        "bytes": os.path.getsize(path),
+        "sections": {name: len(data) if hasattr(data, "__len__") else 1 for name, data in snapshot["sections"].items()},
+        "save_ms": round((time.perf_counter() - started_at) * 1000.0, 1),
+    }
+    with _stats_lock:
+        _stats["saved"] = summary
+    logging.info("Saved warm state to %s: %s", path, summary)
+    return summary
+
+
+def load_warm_state(path: str = WARM_STATE_PATH, max_age: float = WARM_STATE_MAX_AGE) -> Dict[str, Any]:
+    """Restores registered sections from a snapshot written by save_warm_state."""
+    if not path or not os.path.exists(path):
+        return {}
+    started_at = time.perf_counter()
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as state_file:
+            snapshot = json.load(state_file)
+    except (OSError, ValueError, EOFError) as exc:
+        logging.error("Could not load warm state from %s: %s", path, exc)
+        return {}
+
+    age = time.time() - float(snapshot.get("saved_at", 0))
+    if snapshot.get("version") != WARM_STATE_VERSION or age > max_age:
+        logging.info("Ignoring warm state in %s (version %s, %.0fs old)", path, snapshot.get("version"), age)
+        return {}
+
+    with _sections_lock:
+        sections = dict(_sections)
+    restored: Dict[str, int] = {}
+    for name, data in snapshot.get("sections", {}).items():
+        if name not in sections:
+            continue
+        try:
+            restored[name] = sections[name][1](data)
+        except Exception as exc:
+            logging.error("Could not restore warm state section %s: %s", name, exc)
+
+    summary = {
+        "path": path,
+        "age_s": round(age, 1),
+        "sections": restored,
+        "load_ms": round((time.perf_counter() - started_at) * 1000.0, 1),
+    }
+    with _stats_lock:
+        _stats["loaded"] = summary
+    logging.info("Restored warm state from %s: %s", path, summary)
+    return summary
+
+
+def get_warm_state_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        return {"enabled": bool(WARM_STATE_PATH), **_stats}